@@ -0,0 +1,251 @@
+import os
+import ssl
+import hashlib
+import sqlite3
+import asyncio
+import aiohttp
+import Writer as writer
+from typing import Optional, Tuple
+
+class AssetFetcher:
+	def __init__(self, Directory: str = 'assets', Concurrency: int = 50, PerHost: int = 4, Timeout: float = 15,
+				MaxBytes: int = 5 * 1024 * 1024, BatchSize: int = 500, Refresh: bool = False):
+		"""
+		Download stage for the logos and favicons found by `Fetcher`. Every distinct `logo_url`/`favicon_url`
+		of the `domains` table is downloaded once, however many domains point at it, through one shared
+		connection pool. The bytes are stored on disk under their SHA-256, so identical images served from
+		different URLs take space only once, and the outcome of every URL goes into the `assets` table.
+
+		:Parameter: Directory where the files are stored, as `<Directory>/<hash[:2]>/<hash>`.
+
+		:Parameter: Concurrency number of downloads in flight at the same time.
+
+		:Parameter: PerHost maximum connections to the same host.
+
+		:Parameter: Timeout seconds a single download may take.
+
+		:Parameter: MaxBytes bigger files are not stored and recorded as `TOO_LARGE`.
+
+		:Parameter: BatchSize rows per transaction of the result writer.
+
+		:Parameter: Refresh download URLs that are already in `assets` again.
+		"""
+		self._Directory: str = Directory
+		self._Concurrency: int = max(1, Concurrency)
+		self._PerHost: int = max(1, PerHost)
+		self._Timeout: float = Timeout
+		self._MaxBytes: int = MaxBytes
+		self._BatchSize: int = BatchSize
+		self._Refresh: bool = Refresh
+		self._DbPath: str = None
+		self._SuccessCounter: int = 0
+		self._FailedCounter: int = 0
+		self._StoredCounter: int = 0
+
+	def EntryPoint(self, DbPath: str) -> bool:
+		"""
+		Download the assets referenced by the database.
+
+		:Parameter: DbPath path to the database filled by `Crawler` and `Fetcher`.
+
+		:Returns: True once every URL was tried.
+		"""
+		self._DbPath = DbPath
+		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		InitTable(conn)
+		conn.commit()
+		conn.close()
+		return asyncio.run(self._FetchAssets())
+
+	async def _FetchAssets(self) -> bool:
+		"""
+		Feed the pending URLs to `_Concurrency` workers sharing one session, and queue their results for the writer.
+		"""
+		self._SuccessCounter = 0
+		self._FailedCounter = 0
+		self._StoredCounter = 0
+		Writer = writer.ResultWriter(self._DbPath, BatchSize=self._BatchSize).Start()
+
+		ssl_context = ssl.create_default_context()
+		ssl_context.check_hostname = False
+		ssl_context.verify_mode = ssl.CERT_NONE
+
+		# many logos live on a handful of CDNs, so connections are kept alive and capped per host
+		connector = aiohttp.TCPConnector(
+			limit=self._Concurrency,
+			limit_per_host=self._PerHost,
+			ttl_dns_cache=300,
+			ssl=ssl_context
+		)
+		timeout = aiohttp.ClientTimeout(total=self._Timeout, connect=10)
+		headers = {
+			'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+			'Accept': 'image/avif,image/webp,image/svg+xml,image/*,*/*;q=0.8',
+			'Accept-Language': 'en-US,en;q=0.5',
+			'Connection': 'keep-alive',
+		}
+
+		Queue: asyncio.Queue = asyncio.Queue(maxsize=self._Concurrency * 2)
+
+		async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+			Workers = [
+				asyncio.create_task(self._AssetWorker(session, Queue, Writer))
+				for _ in range(self._Concurrency)
+			]
+			try:
+				for Url in self._PendingUrls():
+					await Queue.put(Url)
+				for _ in Workers:
+					await Queue.put(None)
+				await asyncio.gather(*Workers)
+			finally:
+				for Worker in Workers:
+					Worker.cancel()
+
+		Writer.Close()
+		print(f"\nCompleted downloading {self._SuccessCounter + self._FailedCounter} assets")
+		print(f"\n✅ Successfully downloaded: {self._SuccessCounter} ({self._StoredCounter} new files)")
+		print(f"\n❌ Failed to download: {self._FailedCounter}")
+		return True
+
+	def _PendingUrls(self):
+		"""
+		Generator over the distinct logo and favicon URLs that still have to be downloaded. Inline SVGs
+		(`svg-asset://`) and data URLs are already stored and are left out.
+
+		:Returns: iterator of URLs.
+		"""
+		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		# WAL, so the writer thread can commit while this cursor is still open
+		conn.execute('PRAGMA journal_mode=WAL')
+		Skip = '' if self._Refresh else 'WHERE url NOT IN (SELECT url FROM assets)'
+		try:
+			Cursor = conn.execute(f'''
+				SELECT url FROM (
+					SELECT logo_url AS url FROM domains WHERE logo_url LIKE 'http%'
+					UNION
+					SELECT favicon_url FROM domains WHERE favicon_url LIKE 'http%'
+				) {Skip}
+			''')
+			while True:
+				Rows = Cursor.fetchmany(500)
+				if not Rows:
+					return
+				for row in Rows:
+					yield row[0]
+		finally:
+			conn.close()
+
+	async def _AssetWorker(self, session: aiohttp.ClientSession, Queue: asyncio.Queue, Writer: writer.ResultWriter) -> None:
+		"""
+		Worker that keeps taking URLs out of the queue until it receives the `None` sentinel.
+
+		:Parameter: session - aiohttp session shared between all workers
+
+		:Parameter: Queue - bounded queue fed by `_FetchAssets`
+
+		:Parameter: Writer - writer stage where the results are queued
+		"""
+		while True:
+			Url = await Queue.get()
+			try:
+				if Url is None:
+					return
+				Status, ContentType, Size, Hash, ErrorType = await self._Download(session, Url)
+				await Writer.SubmitAsync('''
+					INSERT OR REPLACE INTO assets (url, status, content_type, size, sha256, fetched_at, error_type)
+					VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+				''', (Url, Status, ContentType, Size, Hash, ErrorType))
+				if Hash is not None:
+					self._SuccessCounter += 1
+				else:
+					self._FailedCounter += 1
+					print(f"❌ {Url}: Failed ({ErrorType or Status})")
+			except Exception as e:
+				self._FailedCounter += 1
+				print(f"❌ {Url}: Failed ({e})")
+			finally:
+				Queue.task_done()
+
+	async def _Download(self, session: aiohttp.ClientSession, Url: str) -> Tuple[int, Optional[str], Optional[int], Optional[str], Optional[str]]:
+		"""
+		Download one URL and store its bytes.
+
+		:Parameter: session - aiohttp session to use for the request
+
+		:Parameter: Url - absolute URL of the image
+
+		:Returns: `(status, content_type, size, sha256, error_type)`. The status is 0 for network errors and
+		-1 for unresolvable hosts, `sha256` is only set when the file was stored.
+		"""
+		try:
+			async with session.get(Url, allow_redirects=True) as response:
+				ContentType = response.headers.get('Content-Type', '').split(';')[0].strip().lower() or None
+				if response.status != 200:
+					return response.status, ContentType, None, None, 'HTTP_ERROR'
+				if response.content_length is not None and response.content_length > self._MaxBytes:
+					return response.status, ContentType, response.content_length, None, 'TOO_LARGE'
+				Hasher = hashlib.sha256()
+				Body = bytearray()
+				async for Chunk in response.content.iter_chunked(65536):
+					Hasher.update(Chunk)
+					Body += Chunk
+					if len(Body) > self._MaxBytes:
+						return response.status, ContentType, None, None, 'TOO_LARGE'
+				Hash = Hasher.hexdigest()
+				if await asyncio.to_thread(self._Store, Hash, Body):
+					self._StoredCounter += 1
+				return response.status, ContentType, len(Body), Hash, None
+		except aiohttp.ClientConnectorError as e:
+			if "No address associated with hostname" in str(e) or "Name or service not known" in str(e):
+				return -1, None, None, None, 'DNS_RESOLUTION_FAILED'
+			return 0, None, None, None, 'CONNECTION_FAILED'
+		except asyncio.TimeoutError:
+			return 0, None, None, None, 'TIMEOUT'
+		except aiohttp.ClientError:
+			return 0, None, None, None, 'CONNECTION_FAILED'
+
+	def _Store(self, Hash: str, Body: bytes) -> bool:
+		"""
+		Write the bytes to `<Directory>/<hash[:2]>/<hash>` unless that file is already there. The file is
+		written under a temporary name first, so an interrupted run never leaves a truncated asset behind.
+
+		:Returns: True if a new file was written.
+		"""
+		Path = AssetPath(Hash, self._Directory)
+		if os.path.exists(Path):
+			return False
+		os.makedirs(os.path.dirname(Path), exist_ok=True)
+		Temporary = f'{Path}.{os.getpid()}.{id(Body)}.tmp'
+		with open(Temporary, 'wb') as OutFile:
+			OutFile.write(Body)
+		os.replace(Temporary, Path)
+		return True
+
+def InitTable(conn: sqlite3.Connection) -> None:
+	"""
+	Create the `assets` table if it does not exist yet.
+
+	:Parameter: conn open connection to the database.
+	"""
+	conn.execute('''
+		CREATE TABLE IF NOT EXISTS assets (
+			url TEXT PRIMARY KEY,
+			status INTEGER,
+			content_type TEXT,
+			size INTEGER,
+			sha256 TEXT,
+			fetched_at DATETIME,
+			error_type TEXT
+		)
+	''')
+
+def AssetPath(Hash: str, Directory: str = 'assets') -> str:
+	"""
+	:Parameter: Hash SHA-256 of the file, as stored in `assets.sha256`.
+
+	:Parameter: Directory asset directory given to `AssetFetcher`.
+
+	:Returns: path of the stored file.
+	"""
+	return os.path.join(Directory, Hash[:2], Hash)
@@ -0,0 +1,60 @@
+import json
+import zlib
+import sqlite3
+from typing import Dict, List
+
+"""
+Cache of the logo candidates every page produced: the `<svg>` and `<img>` tags with their context and the
+`<link>` tags, as returned by `Fetcher._FindAllTags`. Entries are keyed by the hash of the page
+(`domains.html_hash`) and by `ExtractorVersion`. Every Fetcher run reads them instead of parsing a page it
+has seen before, so only new or changed pages are parsed, and scoring rules can be tuned and rows rescored
+without touching the pages at all.
+"""
+
+# Bump whenever the output of `Fetcher._FindAllTags` changes (tags looked for, context width, ...).
+# Entries of other versions are ignored and the pages are parsed again.
+ExtractorVersion: int = 1
+
+def InitTable(conn: sqlite3.Connection) -> None:
+	"""
+	Create the `candidates` table if it does not exist yet, together with the `domains.extracted_at` and
+	`domains.extractor_version` columns that record when and by which version a row was last extracted,
+	and the index the incremental Fetcher finds its rows through.
+
+	:Parameter: conn open connection to the database.
+	"""
+	conn.execute('''
+		CREATE TABLE IF NOT EXISTS candidates (
+			html_hash TEXT,
+			extractor_version INTEGER,
+			payload BLOB,
+			PRIMARY KEY (html_hash, extractor_version)
+		)
+	''')
+	Columns = {row[1] for row in conn.execute('PRAGMA table_info(domains)')}
+	if not Columns:
+		return
+	for Column, Type in (('extracted_at', 'DATETIME'), ('extractor_version', 'INTEGER')):
+		if Column not in Columns:
+			conn.execute(f'ALTER TABLE domains ADD COLUMN {Column} {Type}')
+	conn.execute('''
+		CREATE INDEX IF NOT EXISTS idx_domains_extraction
+		ON domains (fetch_status, extractor_version, extracted_at, fetch_timestamp)
+	''')
+
+def Pack(AllTags: Dict[str, List]) -> bytes:
+	"""
+	:Parameter: AllTags candidates as returned by `Fetcher._FindAllTags`.
+
+	:Returns: the candidates as compressed JSON.
+	"""
+	Raw = json.dumps(AllTags, ensure_ascii=False, separators=(',', ':')).encode('utf-8', errors='surrogatepass')
+	return zlib.compress(Raw)
+
+def Unpack(Payload: bytes) -> Dict[str, List]:
+	"""
+	:Parameter: Payload candidates stored by `Pack`.
+
+	:Returns: AllTags dictionary in the shape of `Fetcher._FindAllTags`.
+	"""
+	return json.loads(zlib.decompress(Payload).decode('utf-8', errors='surrogatepass'))
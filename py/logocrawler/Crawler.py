@@ -1,16 +1,72 @@
 import os
-import csv
+import re
+import time
 import sqlite3
+import itertools
 import aiohttp
 import ssl
 import asyncio
+from urllib.parse import urlsplit
+import Robots as robots
+import Writer as writer
+import HtmlStore as htmlstore
+import CandidateStore as candidatestore
+import Politeness as politeness
+import Resolver as resolver
+import Seeds as seeds
+import Metrics as metrics
 
 class Crawler:
-	def __init__(self):
-		self._Entries: list[str] = []
+	# end of the region where logos live, and the charset declaration for bodies without one in the headers
+	_HeadEndPattern = re.compile(rb'</(?:header|nav)\s*>')
+	_MetaCharsetPattern = re.compile(rb'<meta[^>]+charset=["\']?([a-zA-Z0-9_-]+)', re.IGNORECASE)
+
+	def __init__(self, Concurrency: int = 50, RaceVariants: bool = True, BatchSize: int = 500,
+				FreshFor: float = None, MaxBodyBytes: int = 512 * 1024, HostRate: float = 1.0, IpRate: float = 10.0,
+				MaxRetries: int = 3, DnsTtl: float = 3600.0, DnsNegativeTtl: float = 3600.0, SeedDedup: str = 'bloom',
+				SeedCapacity: int = 10_000_000, DbPath: str = 'logos.db', Shard: tuple[int, int] = None):
+		# domains to crawl, read lazily from the seed file by `SeedReader` so a long list is never held in memory.
+		# Repeated hosts are dropped through a Bloom filter sized for `SeedCapacity` hosts, or a set with 'exact'
+		self._Seeds = ()
+		self._SeedDedup: str = SeedDedup
+		self._SeedCapacity: int = SeedCapacity
+		self._SeedCounter: int = 0
+		# `(index, count)` when this crawler only takes the domains of one shard of the seed list, see `Shards`
+		self._Shard: tuple[int, int] = Shard
 		# database should be around 200mb, so it does not fit into a git repo
 		# leave the database somewhere else for easier access
-		self._DbPath: str = 'logos.db'
+		self._DbPath: str = DbPath
+		# number of domains that are in-flight at the same time. Setting it to 1
+		# gives back the old one-domain-at-a-time behaviour
+		self._Concurrency: int = max(1, Concurrency)
+		# race the https/http/www variants instead of trying them one by one. The stagger is
+		# how long an attempt gets before the next variant is started next to it
+		self._RaceVariants: bool = RaceVariants
+		self._StaggerDelay: float = 0.25
+		# product token looked up in the robots.txt user-agent groups
+		self._RobotsAgent: str = 'logocrawler'
+		self._Robots: robots.RobotsCache = None
+		# rows per transaction of the result writer
+		self._BatchSize: int = BatchSize
+		# resume mode: domains fetched successfully less than `FreshFor` seconds ago are skipped.
+		# None crawls everything again
+		self._FreshFor: float = FreshFor
+		# the index page is streamed and cut off after `MaxBodyBytes`, or a bit after the end of the
+		# header/nav region since that is where logos and favicons live. 0 reads the whole body
+		self._MaxBodyBytes: int = MaxBodyBytes
+		# requests per second to a single host and to a single IP address, see `PolitenessScheduler`. Domains
+		# answering 429/503 are tried again after their backoff, up to `MaxRetries` times
+		self._HostRate: float = HostRate
+		self._IpRate: float = IpRate
+		self._MaxRetries: int = MaxRetries
+		self._Politeness: politeness.PolitenessScheduler = None
+		# seconds the `dns_cache` keeps the addresses of a host and the hosts that do not exist
+		self._DnsTtl: float = DnsTtl
+		self._DnsNegativeTtl: float = DnsNegativeTtl
+		self._Dns: resolver.DnsCache = None
+		self._SuccessCounter: int = 0
+		self._FailedCounter: int = 0
+		self._SkippedCounter: int = 0
 		self._InitDb()
 
 	def _InitDb(self):
@@ -32,12 +88,52 @@ class Crawler:
 				fetch_status INTEGER,
 				error_type TEXT,
 				extraction_method TEXT,
-				confidence_score REAL
+				confidence_score REAL,
+				etag TEXT,
+				last_modified TEXT,
+				html_hash TEXT,
+				extracted_at DATETIME,
+				extractor_version INTEGER,
+				size_signal REAL,
+				adjusted_at DATETIME
 			)
 		''')
+		htmlstore.InitTable(conn)
+		self._MigrateDb(conn)
+		candidatestore.InitTable(conn)
+		# covers the lookups of `_PendingDomains`, so they never have to touch the (large) table rows. It replaces
+		# idx_domains_freshness, which lacked the validators and left every lookup reading the row anyway. Without
+		# statistics the planner prefers the autoindex of `domain`, so the lookup names this index explicitly
+		conn.execute('DROP INDEX IF EXISTS idx_domains_freshness')
+		conn.execute('''
+			CREATE INDEX IF NOT EXISTS idx_domains_resume
+			ON domains (domain, fetch_status, fetch_timestamp, final_url, etag, last_modified)
+		''')
 		conn.commit()
 		conn.close()
 
+	def _MigrateDb(self, conn: sqlite3.Connection) -> None:
+		"""
+		Add the columns that were introduced after the first release to databases created by older versions.
+
+		:Parameter: conn open connection to the database.
+
+		:Returns: None
+		"""
+		Columns = {
+			'etag': 'TEXT',
+			'last_modified': 'TEXT',
+			'html_hash': 'TEXT',
+			'extracted_at': 'DATETIME',
+			'extractor_version': 'INTEGER',
+			'size_signal': 'REAL',
+			'adjusted_at': 'DATETIME',
+		}
+		Existing = {row[1] for row in conn.execute('PRAGMA table_info(domains)')}
+		for Column, Type in Columns.items():
+			if Column not in Existing:
+				conn.execute(f'ALTER TABLE domains ADD COLUMN {Column} {Type}')
+
 	def EntryPoint(self, Domains, mode) -> bool:
 		"""
 		Entrypoint should be the only public function to avoid confusion. We will work
@@ -58,7 +154,8 @@ class Crawler:
 
 	async def _CheckRobotsTxt(self, session: aiohttp.ClientSession, domain: str) -> bool:
 		"""
-		Check if crawling is allowed according to robots.txt
+		Check if crawling is allowed according to robots.txt. The parsed rules are cached per host in
+		`RobotsCache`, so robots.txt is only downloaded again once the cached copy expired.
 		
 		:Parameter: session - aiohttp session to use for the request
 
@@ -67,25 +164,80 @@ class Crawler:
 		:Returns: True if crawling is allowed, False otherwise
 		"""
 		try:
-			async with session.get(f'https://{domain}/robots.txt') as response:
-				if response.status == 200:
-					content = await response.text()
-					return 'Disallow: /' not in content
-		except:
+			Rules = await self._Robots.Get(domain)
+		except sqlite3.Error:
+			# the cache only saves a download, without it robots.txt is simply fetched again
+			Rules = None
+		if Rules is None:
+			Rules = await self._FetchRobotsTxt(session, domain)
+		if Rules is None:
 			# If robots.txt is inaccessible, assume crawling is allowed
-			pass
-		return True
+			return True
+		self._Politeness.SetCrawlDelay(domain, Rules.CrawlDelay(self._RobotsAgent))
+		return Rules.IsAllowed('/', self._RobotsAgent)
+
+	async def _FetchRobotsTxt(self, session: aiohttp.ClientSession, domain: str):
+		"""
+		Download and parse robots.txt of a domain and put the result into the cache.
+
+		:Parameter: session - aiohttp session to use for the request
 
+		:Parameter: domain - domain to fetch robots.txt for
+
+		:Returns: RobotsRules, or None if the file could not be retrieved (nothing is cached in that case)
+		"""
+		for scheme in ('https', 'http'):
+			try:
+				url = f'{scheme}://{domain}/robots.txt'
+				if await self._Politeness.Acquire(url) is not None:
+					return None
+				async with session.get(url) as response:
+					self._Politeness.Report(url, response.status, response.headers.get('Retry-After'))
+					if response.status == 200:
+						Rules = robots.RobotsRules.Parse(await response.text(errors='replace'))
+					elif 400 <= response.status < 500:
+						# no robots.txt (or no access to it) means there are no restrictions
+						Rules = robots.RobotsRules()
+					else:
+						return None
+			except:
+				continue
+			try:
+				await self._Robots.Put(domain, Rules)
+			except Exception:
+				pass # a failing cache must not cost the domain its crawl result
+			return Rules
+		return None
 
 	async def _StoreRequests(self) -> bool:
 		"""
 		Fetch the index.htm file from all listed domains and insert them into the database. Takes no arguments.
+		Domains are resolved first, then handed to `_Concurrency` workers through the politeness scheduler, so results
+		land in the database in whatever order the hosts answer, and hosts that have to wait do not hold up the others.
+		Domains that do not resolve never reach the fetch workers.
 		"""
 		# counters
-		SuccessCounter: int = 0
-		FailedCounter: int = 0
+		self._SuccessCounter = 0
+		self._FailedCounter = 0
+		self._SkippedCounter = 0
+		self._SeedCounter = 0
 
-		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		# results go through a writer thread, so SQLite never blocks the event loop
+		Writer = writer.ResultWriter(self._DbPath, BatchSize=self._BatchSize).Start()
+		self._Robots = robots.RobotsCache(self._DbPath, Writer)
+		self._Dns = resolver.DnsCache(
+			self._DbPath,
+			Writer,
+			PositiveTtl=self._DnsTtl,
+			NegativeTtl=self._DnsNegativeTtl,
+			Concurrency=min(256, self._Concurrency * 2)
+		)
+		self._Politeness = politeness.PolitenessScheduler(
+			HostRate=self._HostRate,
+			IpRate=self._IpRate,
+			MaxPending=self._Concurrency * 2,
+			Resolve=self._Dns.Addresses
+		)
 
 		# AI helped me here to get a more 'human-like' header and ssl connection
 		ssl_context = ssl.create_default_context()
@@ -96,7 +248,8 @@ class Crawler:
 			limit=100,
 			limit_per_host=1,
 			ttl_dns_cache=300,
-			ssl_context=ssl_context
+			ssl_context=ssl_context,
+			resolver=resolver.CachedResolver(self._Dns)
 		)
 		
 		# the parameters of the timeout should probably be defined from other variables inherited from the parent process
@@ -119,61 +272,259 @@ class Crawler:
 			max_line_size=16384,
 			max_field_size=16384
 		) as session:
-			for domain in self._Entries:
-
-				# Check if robots.txt exists first
-				# this should be taking SucessUrl instead of domain
-				RobotsAllowed = await self._CheckRobotsTxt(session, domain)
-
-				# Fallback method to differentiate between http and https
-				SuccessUrl, StatusCode, HtmlContent = await self._FetchWithFallback(session, domain)
-
-				if SuccessUrl and HtmlContent:
-					conn.execute('''
-					INSERT OR REPLACE INTO domains (
-						domain, html_body, robots_txt, fetch_status, final_url
-					) VALUES (?, ?, ?, ?, ?)
-				''', (domain, HtmlContent, 1 if RobotsAllowed else 0, StatusCode, SuccessUrl))
-					SuccessCounter += 1
-					RobotsStatus = "✅" if RobotsAllowed else "☑️"
-					print(f"{RobotsStatus} {domain} -> {SuccessUrl}: Success")
-				elif StatusCode == -1:
-					conn.execute('''
-					INSERT OR REPLACE INTO domains (
-						domain, fetch_status, error_type
-					) VALUES (?, ?, ?)
-				''', (domain, StatusCode, "DNS_RESOLUTION_FAILED"))
-					FailedCounter += 1
+			# DNS stage in front of the fetch workers, bounded so it never runs too far ahead of them
+			Resolving: asyncio.Queue = asyncio.Queue(maxsize=self._Concurrency * 2)
+			metrics.QueueDepth.Track(Resolving.qsize, queue='resolve')
+			metrics.QueueDepth.Track(self._Politeness.Pending, queue='scheduler')
+			metrics.QueueDepth.Track(Writer.Pending, queue='writer')
+			Resolvers = [
+				asyncio.create_task(self._ResolveWorker(Resolving, Writer))
+				for _ in range(self._Concurrency)
+			]
+			Workers = [
+				asyncio.create_task(self._CrawlWorker(session, Writer))
+				for _ in range(self._Concurrency)
+			]
+			try:
+				for Item in self._PendingDomains():
+					await Resolving.put(Item)
+				# one sentinel per resolver so every one of them leaves its loop
+				for _ in Resolvers:
+					await Resolving.put(None)
+				await asyncio.gather(*Resolvers)
+				await self._Politeness.Finish()
+				await asyncio.gather(*Workers)
+			finally:
+				for Task in Resolvers + Workers:
+					Task.cancel()
+				for Queue in ('resolve', 'scheduler', 'writer'):
+					metrics.QueueDepth.Track(None, queue=Queue)
+		
+		self._Dns.Close()
+		Writer.Close()
+		self._Robots.Close()
+		print(f"\nCompleted fetching {self._SeedCounter - self._SkippedCounter} domains")
+		if isinstance(self._Seeds, seeds.SeedReader) and (self._Seeds.Duplicates or self._Seeds.Invalid):
+			print(f"\n♻️  Seeds dropped: {self._Seeds.Duplicates} duplicates, {self._Seeds.Invalid} invalid")
+		print(f"\n✅ Successfully fetched: {self._SuccessCounter}")
+		print(f"\n❌ Failed to fetch: {self._FailedCounter}")
+		if self._FreshFor is not None:
+			print(f"\n⏭️  Skipped (still fresh): {self._SkippedCounter}")
+		print(f"\n🌐 DNS lookups: {self._Dns.Lookups} ({self._Dns.Hits} answered from the cache)")
+		if self._Politeness.Throttled:
+			print(f"\n🐢 Answers asking to slow down (429/503): {self._Politeness.Throttled}")
+		return True
+
+	def _PendingDomains(self):
+		"""
+		Generator over the entries that still need to be crawled. The entries are looked up in the database in
+		chunks to pick up the validators (`ETag`/`Last-Modified`) of earlier crawls. In resume mode the ones that
+		were fetched successfully within the freshness window are skipped, failures and stale rows get queued again.
+
+		:Returns: iterator of `(domain, Known)` tuples where `Known` is `(final_url, etag, last_modified)` or None
+		"""
+		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		ChunkSize: int = 500
+		Window: str = f'-{int(self._FreshFor or 0)} seconds'
+		Seeds = iter(self._Seeds)
+		try:
+			while True:
+				Chunk = list(itertools.islice(Seeds, ChunkSize))
+				if not Chunk:
+					return
+				self._SeedCounter += len(Chunk)
+				Placeholders = ', '.join('?' * len(Chunk))
+				Rows = conn.execute(f'''
+					SELECT domain, final_url, etag, last_modified,
+						fetch_status IN (200, 304) AND fetch_timestamp >= datetime('now', ?)
+					FROM domains INDEXED BY idx_domains_resume
+					WHERE domain IN ({Placeholders})
+				''', (Window, *Chunk))
+				Known = {row[0]: row[1:] for row in Rows}
+				for domain in Chunk:
+					Row = Known.get(domain)
+					if self._FreshFor is not None and Row is not None and Row[3]:
+						self._SkippedCounter += 1
+						continue
+					if Row is not None and Row[0] and (Row[1] or Row[2]):
+						yield domain, Row[:3]
+					else:
+						yield domain, None
+		finally:
+			conn.close()
+
+	async def _ResolveWorker(self, Queue: asyncio.Queue, Writer: writer.ResultWriter) -> None:
+		"""
+		Worker of the DNS stage. Domains that resolve go on to the politeness scheduler, the ones that do not exist
+		are stored as `DNS_RESOLUTION_FAILED` right away. When the lookup itself failed the fetch gets to decide.
+
+		:Parameter: Queue - bounded queue fed by `_StoreRequests`
+
+		:Parameter: Writer - writer stage where the dead domains are queued
+
+		:Returns: None
+		"""
+		while True:
+			Item = await Queue.get()
+			domain = Item[0] if Item is not None else None
+			try:
+				if Item is None:
+					return
+				if await self._Dns.DomainExists(domain) is False:
+					await self._StoreResult(Writer, domain, -1, ErrorType="DNS_RESOLUTION_FAILED")
+					self._FailedCounter += 1
 					print(f"💀 {domain} does not exist")
 				else:
-					conn.execute('''
-				  	INSERT OR REPLACE INTO domains (
-				  		domain, fetch_status
-				  ) VALUES (?, ?)
-				''', (domain, StatusCode or 0))
-					FailedCounter += 1
-					print(f"❌ {domain}: Failed (Status : {StatusCode or 'Network Error'})")
-
-				# This was only necessary because there was more than one request in previous implementations
-				# The sleep was a wait to avoid rate limiting
-				# await asyncio.sleep(0.1)
-		
-		conn.commit()
-		conn.close()
-		print(f"\nCompleted fetching {len(self._Entries)} domains")
-		print(f"\n✅ Successfully fetched: {SuccessCounter}")
-		print(f"\n❌ Failed to fetch: {FailedCounter}")
+					await self._Politeness.Put(Item, domain)
+			except Exception as e:
+				self._FailedCounter += 1
+				print(f"❌ {domain}: Failed ({e})")
+			finally:
+				Queue.task_done()
+
+	async def _CrawlWorker(self, session: aiohttp.ClientSession, Writer: writer.ResultWriter) -> None:
+		"""
+		Worker that keeps taking domains from the politeness scheduler until it runs dry.
+
+		:Parameter: session - aiohttp session shared between all workers
+
+		:Parameter: Writer - writer stage where the results are queued
+
+		:Returns: None
+		"""
+		while True:
+			Entry = await self._Politeness.Get()
+			if Entry is None:
+				return
+			Item, Attempt = Entry
+			domain = Item[0]
+			try:
+				if not await self._CrawlDomain(session, domain, Writer, Item[1], Final=Attempt >= self._MaxRetries):
+					# the host asked us to slow down, the domain comes back once its backoff is over
+					self._Politeness.Retry(Item, domain, Attempt + 1)
+			except Exception as e:
+				self._FailedCounter += 1
+				print(f"❌ {domain}: Failed ({e})")
+			finally:
+				await self._Politeness.TaskDone()
+
+	async def _CrawlDomain(self, session: aiohttp.ClientSession, domain: str, Writer: writer.ResultWriter, Known=None,
+						Final: bool = True) -> bool:
+		"""
+		Fetch a single domain and store the outcome into the `domains` table.
+
+		:Parameter: session - aiohttp session to use for the request
+
+		:Parameter: domain - domain to be crawled
+
+		:Parameter: Writer - writer stage where the result is queued
+
+		:Parameter: Known - `(final_url, etag, last_modified)` of an earlier crawl, or None
+
+		:Parameter: Final - last attempt, a 429/503 is stored as failure instead of being tried again
+
+		:Returns: False if the host answered 429/503 and the domain should be tried again, True otherwise
+		"""
+		# robots.txt is checked next to the index page fetch instead of before it
+		RobotsAllowed, (SuccessUrl, StatusCode, HtmlContent, Validators) = await asyncio.gather(
+			self._CheckRobotsTxt(session, domain),
+			self._FetchPage(session, domain, Known)
+		)
+
+		if StatusCode in (429, 503) and not Final:
+			print(f"🐢 {domain}: Status {StatusCode}, trying again later")
+			return False
+		if StatusCode == 304:
+			# unchanged since the last crawl: keep the stored HTML (and whatever Fetcher extracted from it)
+			await Writer.SubmitAsync('''
+				UPDATE domains
+				SET fetch_status = 304, fetch_timestamp = CURRENT_TIMESTAMP, robots_txt = ?, error_type = NULL
+				WHERE domain = ?
+			''', (1 if RobotsAllowed else 0, domain))
+			self._SuccessCounter += 1
+			print(f"♻️  {domain} -> {SuccessUrl}: Not modified")
+		elif SuccessUrl and HtmlContent:
+			await self._StoreResult(Writer, domain, StatusCode, HtmlContent, 1 if RobotsAllowed else 0, SuccessUrl, Validators=Validators)
+			self._SuccessCounter += 1
+			RobotsStatus = "✅" if RobotsAllowed else "☑️"
+			print(f"{RobotsStatus} {domain} -> {SuccessUrl}: Success")
+		elif StatusCode == -1:
+			await self._StoreResult(Writer, domain, StatusCode, ErrorType="DNS_RESOLUTION_FAILED")
+			self._FailedCounter += 1
+			print(f"💀 {domain} does not exist")
+		else:
+			await self._StoreResult(Writer, domain, StatusCode or 0)
+			self._FailedCounter += 1
+			print(f"❌ {domain}: Failed (Status : {StatusCode or 'Network Error'})")
 		return True
 
+	async def _StoreResult(self, Writer: writer.ResultWriter, domain: str, StatusCode: int, HtmlContent: str = None,
+						RobotsTxt: int = None, FinalUrl: str = None, ErrorType: str = None, Validators=None) -> None:
+		"""
+		Queue the outcome of a domain for the writer. Successes and failures share the same statement so they
+		end up in the same `executemany` batch. The page itself goes compressed into `html_blobs`.
+
+		:Parameter: Writer - writer stage where the result is queued
+
+		:Parameter: domain - crawled domain
+
+		:Parameter: StatusCode - HTTP status, 0 for network errors or -1 for unresolvable hosts
+
+		:Returns: None
+		"""
+		ETag, LastModified = Validators or (None, None)
+		HtmlHash = None
+		if HtmlContent is not None:
+			# compression happens off the event loop; identical pages end up in the same blob
+			HtmlHash, Size, Body = await asyncio.to_thread(htmlstore.Pack, HtmlContent)
+			await Writer.SubmitAsync('''
+				INSERT OR IGNORE INTO html_blobs (hash, codec, size, body) VALUES (?, ?, ?, ?)
+			''', (HtmlHash, htmlstore.Codec, Size, Body))
+		await Writer.SubmitAsync('''
+			INSERT OR REPLACE INTO domains (
+				domain, robots_txt, fetch_status, final_url, error_type, etag, last_modified, html_hash
+			) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+		''', (domain, RobotsTxt, StatusCode, FinalUrl, ErrorType, ETag, LastModified, HtmlHash))
+
+	async def _FetchPage(self, session: aiohttp.ClientSession, domain: str, Known=None):
+		"""
+		Fetch the index page of a domain. If an earlier crawl left validators behind, a conditional request is sent
+		to the URL that worked last time first. Only when that does not give a 304 or a 200 the usual fallback over
+		the URL variants kicks in.
+
+		:Parameter: session - aiohttp session to use for the request
+
+		:Parameter: domain - domain to be crawled
+
+		:Parameter: Known - `(final_url, etag, last_modified)` of an earlier crawl, or None
+
+		:Returns: same as `_FetchWithFallback`, with status 304 when the page did not change
+		"""
+		if Known is not None:
+			FinalUrl, ETag, LastModified = Known
+			Headers = {}
+			if ETag:
+				Headers['If-None-Match'] = ETag
+			if LastModified:
+				Headers['If-Modified-Since'] = LastModified
+			Result = await self._FetchVariant(session, FinalUrl, Headers)
+			if Result[1] in (200, 304, 429, 503):
+				return Result
+		return await self._FetchWithFallback(session, domain)
+
 	async def _FetchWithFallback(self, session: aiohttp.ClientSession, domain: str):
 		"""
-		Try multiple URL variants for a domain.
+		Try multiple URL variants for a domain. By default the variants are raced "happy-eyeballs" style: they
+		are started one after the other with a short stagger (or right away when the previous attempt already
+		failed), the first 200 wins and the remaining attempts get cancelled. If more than one variant finished
+		successfully at the same time the preference order of `urls_to_try` decides.
 
 		:Parameters: session information about contained session with given domain
 
 		:Parameters: domain basic URL of the informed domain
 
-		:Returns: Multiple first return value is the final url, second is the HTML status code, and the last is the index.html
+		:Returns: Multiple first return value is the final url, second is the HTML status code, third is the index.html and
+		the last the `(etag, last_modified)` validators of the response
 		"""
 		urls_to_try = [
 			f'https://{domain}',
@@ -181,23 +532,161 @@ class Crawler:
 			f'https://www.{domain}',
 			f'http://www.{domain}'
 		]
-		
+
+		if not self._RaceVariants:
+			return await self._FetchSerially(session, urls_to_try)
+
+		Attempts: list[asyncio.Task] = []
+		Results: list = [None] * len(urls_to_try)
+		Pending: set = set()
+		try:
+			while True:
+				# a new variant is started after every stagger delay, or straight away when an attempt failed
+				if len(Attempts) < len(urls_to_try):
+					Attempt = asyncio.create_task(self._FetchVariant(session, urls_to_try[len(Attempts)]))
+					Attempts.append(Attempt)
+					Pending.add(Attempt)
+				elif not Pending:
+					break
+
+				Delay = self._StaggerDelay if len(Attempts) < len(urls_to_try) else None
+				Done, Pending = await asyncio.wait(Pending, timeout=Delay, return_when=asyncio.FIRST_COMPLETED)
+
+				for Attempt in Done:
+					Results[Attempts.index(Attempt)] = Attempt.result()
+				for Result in Results:
+					if Result is not None and Result[1] == 200:
+						return Result
+		finally:
+			for Attempt in Pending:
+				Attempt.cancel()
+			if Pending:
+				await asyncio.gather(*Pending, return_exceptions=True)
+
+		if any(Result is not None and Result[1] == -1 for Result in Results):
+			return None, -1, None, None
+		return _Throttled(Results)
+
+	async def _FetchSerially(self, session: aiohttp.ClientSession, urls_to_try: list[str]):
+		"""
+		Original fallback: try the URL variants one after the other until one of them answers with 200.
+
+		:Parameters: session information about contained session with given domain
+
+		:Parameters: urls_to_try list of URL variants in order of preference
+
+		:Returns: Same as `_FetchWithFallback`
+		"""
+		Results = []
 		for url in urls_to_try:
-			try:
-				async with session.get(url, allow_redirects=True) as response:
-					if response.status == 200:
+			Result = await self._FetchVariant(session, url)
+			if Result[1] in (200, -1):
+				return Result
+			Results.append(Result)
+		return _Throttled(Results)
+
+	async def _FetchVariant(self, session: aiohttp.ClientSession, url: str, Headers: dict = None):
+		"""
+		Single attempt on one of the URL variants of a domain.
+
+		:Parameters: session information about contained session with given domain
+
+		:Parameters: url the full URL variant to request
+
+		:Parameters: Headers extra request headers, used for the conditional `If-None-Match`/`If-Modified-Since` requests
+
+		:Returns: (url, 200, html, validators) on success, (url, 304, None, validators) when the page did not change,
+		(None, 429/503, None, None) when the host asked us to slow down, (None, -1, None, None) if the hostname
+		does not resolve and (None, 0, None, None) otherwise
+		"""
+		# HTTP status for the metrics, or 'cancelled' when the variant lost the race in `_FetchWithFallback`
+		Status = 0
+		Started: float = None
+		try:
+			Throttled = await self._Politeness.Acquire(url)
+			if Throttled is not None:
+				return None, Throttled, None, None
+			Started = time.monotonic()
+			metrics.RequestsInFlight.Inc()
+			async with session.get(url, allow_redirects=True, headers=Headers) as response:
+				Status = response.status
+				self._Politeness.Report(url, response.status, response.headers.get('Retry-After'))
+				if response.status in (429, 503):
+					return None, response.status, None, None
+				Validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+				if response.status == 200:
+					if self._MaxBodyBytes:
+						html = await self._ReadHead(response)
+					else:
 						html = await response.text()
-						return url, response.status, html
-			except aiohttp.ClientConnectorError as e:
-				if "No address associated with hostname" in str(e):
-					return None, -1, None
-				continue
-			except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError):
-				continue # trying to minimize the output, therefore no printing here
-			except Exception as e:
-				continue # trying to minimize the output, therefore no printing here
-		
-		return None, 0, None	
+					metrics.DownloadedBytes.Inc(response.content.total_bytes)
+					return url, response.status, html, Validators
+				if response.status == 304:
+					return url, response.status, None, Validators
+		except asyncio.CancelledError:
+			Status = 'cancelled'
+			raise
+		except aiohttp.ClientConnectorError as e:
+			Status = 0
+			if "No address associated with hostname" in str(e):
+				Status = -1
+				return None, -1, None, None
+		except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError):
+			Status = 0 # trying to minimize the output, therefore no printing here
+		except Exception as e:
+			Status = 0 # trying to minimize the output, therefore no printing here
+		finally:
+			if Started is not None:
+				metrics.RequestsInFlight.Dec()
+				# a cancelled request never finished, its time says nothing about the latency of the variant
+				if Status != 'cancelled':
+					metrics.FetchSeconds.Observe(time.monotonic() - Started, variant=_VariantOf(url))
+				metrics.Responses.Inc(status=Status)
+		return None, 0, None, None
+
+	async def _ReadHead(self, response: aiohttp.ClientResponse) -> str:
+		"""
+		Stream the body of a response in chunks and stop early. Reading ends at `_MaxBodyBytes`, or a few
+		kilobytes after the first closing `</header>`/`</nav>` tag so the context around the logo is kept.
+		If the body was cut short the connection is closed instead of being drained.
+
+		:Parameter: response response whose body has not been read yet
+
+		:Returns: the (possibly truncated) body decoded as text
+		"""
+		Chunks: list[bytes] = []
+		Size: int = 0
+		Limit: int = self._MaxBodyBytes
+		# keep the end of the previous chunk around, markers can be split between two chunks
+		Tail: bytes = b''
+		Truncated: bool = False
+
+		async for Chunk in response.content.iter_chunked(16384):
+			Chunks.append(Chunk)
+			Window = (Tail + Chunk).lower()
+			if Limit == self._MaxBodyBytes:
+				Match = self._HeadEndPattern.search(Window)
+				if Match:
+					End = Size - len(Tail) + Match.end()
+					Limit = min(Limit, End + 4096)
+			Size += len(Chunk)
+			Tail = Chunk[-16:]
+			if Size >= Limit:
+				Truncated = not response.content.at_eof()
+				break
+
+		Body = b''.join(Chunks)
+		if Truncated:
+			response.close()
+
+		Charset = response.charset
+		if not Charset:
+			MetaCharset = self._MetaCharsetPattern.search(Body[:4096])
+			Charset = MetaCharset.group(1).decode('ascii') if MetaCharset else 'utf-8'
+		try:
+			return Body.decode(Charset, errors='replace')
+		except LookupError:
+			return Body.decode('utf-8', errors='replace')
 
 	def _CsvEntry(self, Domains) -> None:
 		"""
@@ -210,27 +699,13 @@ class Crawler:
 		"""
 		try:
 			path = self._FindCsv(Domains)
-			self._Entries = self._OpenCsv(path)
+			if not os.path.isfile(path):
+				raise FileNotFoundError(f"{Domains}: no such file")
+			# the file is only read while crawling, see `_PendingDomains`
+			self._Seeds = seeds.SeedReader(path, Dedup=self._SeedDedup, Capacity=self._SeedCapacity, Shard=self._Shard)
 		except Exception as e:
 			print(f"Error: {e}")
 	
-	def _OpenCsv(self, CsvPath) -> list[str]:
-		"""
-		Function to open and list out the domains, leaving blank spaces for later use when
-		we retrieve the logos and favicons.
-
-		:Parameters: `CsvPath` the absolute path to the csv file.
-
-		:Returns: `Data` 
-		"""
-		with open(CsvPath, 'r') as CsvFile:
-			Reader = csv.reader(CsvFile)
-			Data = []
-			for rows in Reader:
-				if rows:
-					Data.append(rows[0].strip())
-		return Data
-	
 	def _FindCsv(self, CsvFileName) -> str:
 		"""
 		Function dedicated to fetching the file named by user in argv[1].
@@ -250,5 +725,24 @@ class Crawler:
 		return CsvFilePath
 	
 	def _SingleEntry(self, Domain) -> None:
-		self._Entries = [Domain]
+		self._Seeds = [seeds.NormaliseDomain(Domain) or Domain.strip()]
+
+def _VariantOf(Url: str) -> str:
+	"""
+	:Returns: URL variant of a request for the metrics: `https`, `http`, `https_www` or `http_www`.
+	"""
+	Parts = urlsplit(Url)
+	return Parts.scheme + ('_www' if (Parts.hostname or '').startswith('www.') else '')
+
+def _Throttled(Results: list):
+	"""
+	Outcome of a domain none of whose URL variants answered with 200.
+
+	:Parameter: Results results of `_FetchVariant` for the variants that were tried.
 
+	:Returns: (None, 429/503, None, None) if one of the variants asked us to slow down, (None, 0, None, None) otherwise
+	"""
+	for Result in Results:
+		if Result is not None and Result[1] in (429, 503):
+			return None, Result[1], None, None
+	return None, 0, None, None
@@ -1,27 +1,205 @@
 import Crawler as crawler
 import Fetcher as fetcher
+import HtmlStore as htmlstore
+import Scoring as scoring
+import CandidateStore as candidatestore
+import Exporter as exporter
+import AssetFetcher as assetfetcher
+import ImageProbe as imageprobe
+import Pipeline as pipeline
+import Shards as shards
+import Metrics as metrics
+import os
 import sys
+import sqlite3
+
+def ParseOptions(Args: list[str]) -> dict:
+	"""
+	Collects the optional `--name=value` flags that can follow the positional arguments.
+	Flags given without a value are stored as True.
+
+	:Parameter: `Args` list of arguments after the positional ones.
+
+	:Returns: `Options` dictionary with the flag names (dashes become underscores) as keys.
+	"""
+	Options = {}
+	for arg in Args:
+		if not arg.startswith('--'):
+			continue
+		key, _, value = arg[2:].partition('=')
+		Options[key.replace('-', '_')] = value if value else True
+	return Options
+
+def BuildCrawler(Options: dict, Class: type = crawler.Crawler, **Extra) -> crawler.Crawler:
+	"""
+	Creates the `Crawler` with the settings given through the optional flags.
+
+	:Parameter: `Options` dictionary returned by `ParseOptions`.
+
+	:Parameter: `Class` `Crawler` or a subclass of it, like `Pipeline`.
+
+	:Parameter: `Extra` settings of the subclass.
+
+	:Returns: configured `Crawler` instance.
+	"""
+	return Class(**Extra, **CrawlerSettings(Options))
+
+def CrawlerSettings(Options: dict) -> dict:
+	"""
+	:Parameter: `Options` dictionary returned by `ParseOptions`.
+
+	:Returns: keyword arguments of `Crawler` for the optional flags.
+	"""
+	# --resume skips domains fetched within the last week, --resume=HOURS picks another window
+	Resume = Options.get('resume')
+	FreshFor = None if Resume is None else 3600 * (168 if Resume is True else float(Resume))
+	return dict(
+		Concurrency=int(Options.get('concurrency', 50)),
+		RaceVariants=not Options.get('no_race', False),
+		BatchSize=int(Options.get('batch_size', 500)),
+		FreshFor=FreshFor,
+		MaxBodyBytes=int(Options.get('max_body_kb', 512)) * 1024,
+		HostRate=float(Options.get('host_rate', 1.0)),
+		IpRate=float(Options.get('ip_rate', 10.0)),
+		MaxRetries=int(Options.get('max_retries', 3)),
+		DnsTtl=float(Options.get('dns_ttl', 3600)),
+		DnsNegativeTtl=float(Options.get('dns_negative_ttl', 3600)),
+		SeedDedup=Options.get('dedup', 'bloom'),
+		SeedCapacity=int(Options.get('seed_capacity', 10_000_000))
+	)
 
 def main():
-	
-	if len(sys.argv) == 3 and sys.argv[2] == 'crawl':
+	Options = ParseOptions(sys.argv[1:])
+	Positional = [arg for arg in sys.argv if not arg.startswith('--')]
+
+	# live metrics: --metrics-port serves them on localhost, --metrics-file appends JSON snapshots every --metrics-interval seconds
+	Reporter = metrics.Reporter(
+		Port=int(Options['metrics_port']) if 'metrics_port' in Options else None,
+		SnapshotPath=Options.get('metrics_file'),
+		Interval=float(Options.get('metrics_interval', 10))
+	).Start()
+	try:
+		return RunMode(Options, Positional, Reporter)
+	finally:
+		Reporter.Close()
+
+def RunMode(Options: dict, Positional: list[str], Reporter: metrics.Reporter) -> int:
+	"""
+	Runs the mode picked by the positional arguments.
+
+	:Parameter: `Options` dictionary returned by `ParseOptions`.
+
+	:Parameter: `Positional` command line arguments that are not flags.
+
+	:Parameter: `Reporter` metrics reporter of this process, the shards get their own.
+
+	:Returns: exit code.
+	"""
+	if len(Positional) == 3 and Positional[2] == 'crawl' and 'shards' in Options:
+		# every shard of the domain list is crawled by its own process into its own database, then they are merged
+		shards.CrawlShards(Positional[1], int(Options['shards']), Settings=CrawlerSettings(Options), Reporter=Reporter)
+	elif len(Positional) == 3 and Positional[2] == 'crawl' and 'shard' in Options:
+		# one shard only, for crawls spread over several machines. `merge` brings the shard databases together
+		try:
+			Index, Count = shards.ParseShard(Options['shard'])
+		except ValueError as e:
+			print(f'Error: {e}')
+			return 1
+		CrawlerInstance = BuildCrawler(Options, DbPath=shards.ShardPath('logos.db', Index, Count), Shard=(Index, Count))
+		CrawlerInstance.EntryPoint(Positional[1], 1)
+	elif len(Positional) == 3 and Positional[2] == 'crawl':
 		# regular crawling bot operation where he looks for domains in csv
-		CrawlerInstance = crawler.Crawler()
+		CrawlerInstance = BuildCrawler(Options)
 		domain: str = ''
-		CrawlerInstance.EntryPoint(sys.argv[1], 1)
-	elif len(sys.argv) == 2:
+		CrawlerInstance.EntryPoint(Positional[1], 1)
+	elif len(Positional) == 3 and Positional[2] == 'pipeline':
+		# crawl and extract in one pass, the pages go straight from the crawler to the extraction processes
+		PipelineInstance = BuildCrawler(
+			Options,
+			pipeline.Pipeline,
+			Workers=int(Options.get('workers', os.cpu_count() or 1)),
+			RulesPath=Options.get('rules', scoring.DefaultRulesPath),
+			StoreHtml=bool(Options.get('store_html', False)),
+			ExportFormat=Options.get('format', 'csv'),
+			ExportCompress=bool(Options.get('gzip', False)),
+			ExportInlineSvg=bool(Options.get('inline_svg', False))
+		)
+		PipelineInstance.EntryPoint(Positional[1], 1)
+	elif len(Positional) == 2:
 		# manual input of individual domains. Who knows
 		domain = input("Provide a domain: ")
 		if domain == '':
 			return 1
+		CrawlerInstance = BuildCrawler(Options)
 		CrawlerInstance.EntryPoint(domain, 2)
-	elif len(sys.argv) == 3 and sys.argv[2] == 'fetch':
-		# fetcher works with pre-existing db generated from crawler
-		FetcherInstance = fetcher.Fetcher()
-		FetcherInstance.EntryPoint(sys.argv[1])
+	elif len(Positional) == 3 and Positional[2] in ('fetch', 'rescore'):
+		# fetcher works with pre-existing db generated from crawler, rescore only scores the cached candidates again
+		FetcherInstance = fetcher.Fetcher(
+			Workers=int(Options.get('workers', os.cpu_count() or 1)),
+			RulesPath=Options.get('rules', scoring.DefaultRulesPath),
+			Rescore=Positional[2] == 'rescore',
+			Incremental=bool(Options.get('incremental', False)),
+			BatchSize=int(Options.get('batch_size', 500)),
+			ExportFormat=Options.get('format', 'csv'),
+			ExportCompress=bool(Options.get('gzip', False)),
+			ExportInlineSvg=bool(Options.get('inline_svg', False))
+		)
+		FetcherInstance.EntryPoint(Positional[1])
+	elif len(Positional) == 3 and Positional[2] == 'export':
+		# exports the results without running the fetcher, --since-last only takes what changed since the previous export
+		conn = sqlite3.connect(Positional[1])
+		candidatestore.InitTable(conn)
+		imageprobe.InitTable(conn)
+		try:
+			Exporter = exporter.Exporter(
+				conn,
+				Format=Options.get('format', 'csv'),
+				Compress=bool(Options.get('gzip', False)),
+				InlineSvg=bool(Options.get('inline_svg', False))
+			)
+			Exporter.Export(SinceLast=bool(Options.get('since_last', False)))
+		except ValueError as e:
+			print(f'Export failed: {e}')
+		conn.close()
+	elif len(Positional) == 3 and Positional[2] == 'assets':
+		# downloads the logos and favicons found by the fetcher into a content-addressed directory
+		AssetFetcherInstance = assetfetcher.AssetFetcher(
+			Directory=Options.get('asset_dir', 'assets'),
+			Concurrency=int(Options.get('concurrency', 50)),
+			PerHost=int(Options.get('per_host', 4)),
+			BatchSize=int(Options.get('batch_size', 500)),
+			Refresh=bool(Options.get('refresh', False))
+		)
+		AssetFetcherInstance.EntryPoint(Positional[1])
+	elif len(Positional) == 3 and Positional[2] == 'probe':
+		# reads the format and size of the logos from their first bytes and picks the logos again with them
+		ProberInstance = imageprobe.ImageProber(
+			Concurrency=int(Options.get('concurrency', 50)),
+			PerHost=int(Options.get('per_host', 4)),
+			ProbeBytes=int(Options.get('probe_bytes', 1024)),
+			BatchSize=int(Options.get('batch_size', 500)),
+			Refresh=bool(Options.get('refresh', False)),
+			Fetcher=fetcher.Fetcher(RulesPath=Options.get('rules', scoring.DefaultRulesPath))
+		)
+		ProberInstance.EntryPoint(Positional[1])
+	elif len(Positional) == 3 and Positional[2] == 'merge':
+		# folds the shard databases found next to the given database into it
+		Count = int(Options['shards']) if 'shards' in Options else None
+		Paths = shards.FindShards(Positional[1], Count)
+		if not Paths and Count is not None:
+			print(f'No shard databases of a {Count} shard crawl found next to {Positional[1]}')
+		elif not Paths:
+			print(f'No complete set of shard databases found next to {Positional[1]}, pick one with --shards=N')
+		else:
+			if Count is not None and len(Paths) < Count:
+				print(f'Only {len(Paths)} of {Count} shard databases found, merging those')
+			shards.Merge(Positional[1], Paths)
+	elif len(Positional) == 3 and Positional[2] == 'compact':
+		# moves pages stored by older versions into the compressed blob store
+		Moved = htmlstore.Compact(Positional[1])
+		print(f'Compacted {Moved} pages')
 
 	return 0
 
 if __name__ == "__main__":
-	main() 
-	
\ No newline at end of file
+	main()
@@ -0,0 +1,185 @@
+import os
+import csv
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+from typing import Optional, List
+import SvgStore as svgstore
+
+# Parquet is optional: only needed for --format=parquet
+try:
+	import pyarrow
+	import pyarrow.parquet
+except ImportError:
+	pyarrow = None
+
+class Exporter:
+	# columns of every export, in this order
+	Columns: List[str] = ['domain', 'logo_url', 'extraction_method', 'confidence_score', 'robots_txt']
+	Formats: List[str] = ['csv', 'jsonl', 'parquet']
+
+	def __init__(self, conn: sqlite3.Connection, Format: str = 'csv', Compress: bool = False, ChunkSize: int = 1000,
+				 InlineSvg: bool = False):
+		"""
+		Streams the results in the `domains` table into a CSV, JSON Lines or Parquet file. Rows are read from
+		the cursor `ChunkSize` at a time and written right away, so memory use does not grow with the table.
+
+		:Parameter: conn open connection to the database.
+
+		:Parameter: Format one of `csv`, `jsonl` or `parquet`.
+
+		:Parameter: Compress gzip the output. Parquet files use gzip as their internal compression instead.
+
+		:Parameter: ChunkSize rows fetched from the cursor (and Parquet row group size).
+
+		:Parameter: InlineSvg write SVG logos as data URLs instead of their `svg-asset://` references.
+		"""
+		if Format not in self.Formats:
+			raise ValueError(f'Unknown export format {Format}, expected one of {", ".join(self.Formats)}')
+		if Format == 'parquet' and pyarrow is None:
+			raise ValueError('Parquet export needs pyarrow, install it or pick another format')
+		self._conn: sqlite3.Connection = conn
+		self._Format: str = Format
+		self._Compress: bool = Compress
+		self._ChunkSize: int = max(1, ChunkSize)
+		self._InlineSvg: bool = InlineSvg
+		self._conn.execute('''
+			CREATE TABLE IF NOT EXISTS exports (
+				id INTEGER PRIMARY KEY,
+				format TEXT,
+				path TEXT,
+				started_at DATETIME,
+				rows INTEGER
+			)
+		''')
+		svgstore.InitTable(self._conn)
+		self._conn.commit()
+
+	def Export(self, Directory: str = 'data', Name: str = 'websites_logos', SinceLast: bool = False) -> Optional[str]:
+		"""
+		Write the export file and record it in the `exports` table.
+
+		:Parameter: Directory where the file goes, created if needed.
+
+		:Parameter: Name prefix of the file name, followed by a timestamp and the extension.
+
+		:Parameter: SinceLast only export the rows fetched, extracted or adjusted since the previous export started.
+		Rows changed within the same second as that start can show up in both exports.
+
+		:Returns: path of the written file, or None if the export failed.
+		"""
+		try:
+			StartedAt = self._conn.execute('SELECT CURRENT_TIMESTAMP').fetchone()[0]
+			Cursor = self._Query(SinceLast)
+			Timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+			if not os.path.exists(Directory):
+				os.makedirs(Directory)
+			Extension = self._Format + ('.gz' if self._Compress and self._Format != 'parquet' else '')
+			Path = os.path.join(Directory, f'{Name}_{Timestamp}.{Extension}')
+
+			if self._Format == 'parquet':
+				Rows = self._WriteParquet(Cursor, Path)
+			else:
+				Opener = gzip.open if self._Compress else open
+				with Opener(Path, 'wt', newline='', encoding='utf-8') as OutFile:
+					if self._Format == 'csv':
+						Rows = self._WriteCsv(Cursor, OutFile)
+					else:
+						Rows = self._WriteJsonl(Cursor, OutFile)
+
+			self._conn.execute(
+				'INSERT INTO exports (format, path, started_at, rows) VALUES (?, ?, ?, ?)',
+				(self._Format, Path, StartedAt, Rows)
+			)
+			self._conn.commit()
+			print(f"Successfully exported {Rows} rows to {Path}")
+			return Path
+		except Exception as e:
+			print(f"Export failed: {str(e)}")
+			return None
+
+	def _Query(self, SinceLast: bool) -> sqlite3.Cursor:
+		"""
+		:Parameter: SinceLast only select the rows changed since the start of the previous export: fetched, extracted
+		or rescored (`extracted_at`), or adjusted by the probe stage (`adjusted_at`).
+
+		:Returns: cursor over the rows to export.
+		"""
+		Columns = ', '.join(f'd.{Column}' for Column in self.Columns)
+		if self._InlineSvg:
+			# the referenced SVG comes along as an extra column and is turned into a data URL in `_Chunks`
+			Query = f'''
+				SELECT {Columns}, a.svg FROM domains d
+				LEFT JOIN svg_assets a ON d.logo_url LIKE '{svgstore.Scheme}%' AND a.hash = substr(d.logo_url, {len(svgstore.Scheme) + 1})
+			'''
+		else:
+			Query = f'SELECT {Columns} FROM domains d'
+		Since = None
+		if SinceLast:
+			Since = self._conn.execute('SELECT MAX(started_at) FROM exports').fetchone()[0]
+		if Since is None:
+			return self._conn.execute(Query)
+		return self._conn.execute(
+			Query + ' WHERE d.fetch_timestamp >= ? OR d.extracted_at >= ? OR d.adjusted_at >= ?', (Since, Since, Since)
+		)
+
+	def _Chunks(self, Cursor: sqlite3.Cursor):
+		"""
+		Yield the rows of the cursor in lists of `_ChunkSize`, with SVG references already inlined
+		if asked for.
+		"""
+		while True:
+			Rows = Cursor.fetchmany(self._ChunkSize)
+			if not Rows:
+				return
+			if self._InlineSvg:
+				# logo_url is the second column
+				Rows = [
+					(Row[0], svgstore.DataUrl(Row[-1]), *Row[2:-1]) if Row[-1] is not None else Row[:-1]
+					for Row in Rows
+				]
+			yield Rows
+
+	def _WriteCsv(self, Cursor: sqlite3.Cursor, OutFile) -> int:
+		"""
+		:Returns: number of rows written.
+		"""
+		Writer = csv.writer(OutFile)
+		Writer.writerow(self.Columns)
+		Rows = 0
+		for Chunk in self._Chunks(Cursor):
+			Writer.writerows(Chunk)
+			Rows += len(Chunk)
+		return Rows
+
+	def _WriteJsonl(self, Cursor: sqlite3.Cursor, OutFile) -> int:
+		"""
+		:Returns: number of rows written.
+		"""
+		Rows = 0
+		for Chunk in self._Chunks(Cursor):
+			OutFile.writelines(json.dumps(dict(zip(self.Columns, Row)), ensure_ascii=False) + '\n' for Row in Chunk)
+			Rows += len(Chunk)
+		return Rows
+
+	def _WriteParquet(self, Cursor: sqlite3.Cursor, Path: str) -> int:
+		"""
+		Every chunk becomes its own row group, so only one chunk is held in memory.
+
+		:Returns: number of rows written.
+		"""
+		Schema = pyarrow.schema([
+			('domain', pyarrow.string()),
+			('logo_url', pyarrow.string()),
+			('extraction_method', pyarrow.string()),
+			('confidence_score', pyarrow.float64()),
+			('robots_txt', pyarrow.int64()),
+		])
+		Rows = 0
+		with pyarrow.parquet.ParquetWriter(Path, Schema, compression='gzip' if self._Compress else 'snappy') as Writer:
+			for Chunk in self._Chunks(Cursor):
+				Columns = [list(Column) for Column in zip(*Chunk)]
+				Writer.write_table(pyarrow.Table.from_arrays(Columns, schema=Schema))
+				Rows += len(Chunk)
+		return Rows
@@ -1,17 +1,56 @@
 import os
-import base64
 import re
-import csv
+import time
 import sqlite3
 from urllib.parse import urljoin, urlparse
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Dict
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import HtmlStore as htmlstore
+import CandidateStore as candidatestore
+import Exporter as exporter
+import SvgStore as svgstore
+import ImageProbe as imageprobe
+import Scoring as scoring
+import Metrics as metrics
 
 class Fetcher:
-	def __init__(self):
+	# tokens looked for by _FindAllTags
+	_TagStartPattern = re.compile(r'<(svg|img|link)\b', re.IGNORECASE)
+	_SvgEndPattern = re.compile(r'</svg\s*>', re.IGNORECASE)
+	# name="value", name='value' and name=value attributes. A quoted value only ends at its own quote, so one of
+	# the groups is filled and the others are empty
+	_AttributePattern = re.compile(r'([^\s=<>/"\']+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+
+	def __init__(self, Workers: int = 1, ChunkSize: int = 256, RulesPath: str = scoring.DefaultRulesPath,
+				 Rescore: bool = False, Incremental: bool = False, BatchSize: int = 500,
+				 ExportFormat: str = 'csv', ExportCompress: bool = False, ExportInlineSvg: bool = False):
 		self._conn: Optional[sqlite3.Connection] = None
 		self._LogPath = None
 		self._LogFile = None
+		# extraction processes. With a single worker everything runs in this process like before
+		self._Workers: int = max(1, Workers)
+		# rows read from the cursor and handed to the pool at once
+		self._ChunkSize: int = ChunkSize
+		# logo indicators read from the rules file and compiled once, recompiled when the file changes
+		self._RulesPath: str = RulesPath
+		self._Rules: scoring.ScoringRules = scoring.ScoringRules(RulesPath)
+		# rescore-only runs score the cached candidates of every row instead of parsing the pages again
+		self._Rescore: bool = Rescore
+		# incremental runs skip the rows that were extracted after their last fetch by the current extractor
+		self._Incremental: bool = Incremental
+		# results are collected here and written with executemany, one committed transaction per batch
+		self._BatchSize: int = max(1, BatchSize)
+		self._PendingResults: List[tuple] = []
+		self._PendingCandidates: List[tuple] = []
+		self._PendingHashes: List[tuple] = []
+		self._PendingAssets: List[tuple] = []
+		self._Written: int = 0
+		# format of the export written at the end of the run, see `Exporter`
+		self._ExportFormat: str = ExportFormat
+		self._ExportCompress: bool = ExportCompress
+		self._ExportInlineSvg: bool = ExportInlineSvg
 
 	def _StartLog(self) -> None:
 		"""
@@ -65,11 +104,18 @@ class Fetcher:
 			return False
 		try:
 			self._conn = sqlite3.connect(DbPath)
+			htmlstore.InitTable(self._conn)
+			candidatestore.InitTable(self._conn)
+			svgstore.InitTable(self._conn)
+			imageprobe.InitTable(self._conn)
 			# Making the concious choice of not checking integrity of connection 
 			# and if database is locked.
 			Cursor = self._FetchRows()
-			self._ProcessRows(Cursor)
-			self._UnloadDatabaseToCsv()
+			if self._Workers > 1:
+				self._ProcessRowsParallel(Cursor)
+			else:
+				self._ProcessRows(Cursor)
+			self._UnloadDatabase()
 			self._conn.close()
 			return True
 		except sqlite3.OperationalError as e:
@@ -84,11 +130,49 @@ class Fetcher:
 		Method to fetch data from our database. Specifically we are looking to query 
 		for successful requests where the `fetch_status` was 200. In those cases we are
 		going to store the results in a pointer SQLite3 `cursor` and return to `EntryPoint`.
+		Rows answered with 304 (not modified) keep their earlier extraction and are only
+		picked up if nothing was extracted from them yet. When rescoring, every row with a
+		page is picked up again.
+
+		In incremental mode only the rows that changed since their last extraction are picked
+		up: 200 rows fetched again after it, and rows never extracted or extracted by another
+		extractor version. `idx_domains_extraction` answers this without a full table scan.
+
+		Pages whose candidates are already cached for the current extractor version are not
+		read at all, otherwise the compressed page comes along and is only decompressed in
+		`_LoadCandidates`. Rows with neither cached candidates nor a stored page, crawled by
+		the pipeline without `--store-html`, are left out.
 
 		:Returns: cursor pointer to the SQLite3 query results 
 		"""
-		query = "SELECT id, domain, html_body, final_url FROM domains WHERE fetch_status == 200"
-		cursor: sqlite3.Cursor = self._conn.execute(query)
+		Params: tuple = (candidatestore.ExtractorVersion,)
+		# the unary + keeps the other modes on a plain table scan: through idx_domains_extraction
+		# they would meet the rows they already extracted again (see below)
+		if self._Rescore:
+			Where = '+d.fetch_status IN (200, 304)'
+		elif self._Incremental:
+			# a 304 bumps fetch_timestamp without changing the page, so it only counts for 200 rows.
+			# The ids are collected up front: extracting a row moves it inside the index, and a lazy
+			# scan of that index would run into it a second time
+			Where = """
+				d.id IN (
+					SELECT id FROM domains
+					WHERE (fetch_status = 200 AND (extractor_version IS NOT ? OR extracted_at IS NULL OR extracted_at < fetch_timestamp))
+					OR (fetch_status = 304 AND (extractor_version IS NOT ? OR extracted_at IS NULL))
+				)
+			"""
+			Params += (candidatestore.ExtractorVersion, candidatestore.ExtractorVersion)
+		else:
+			Where = '+d.fetch_status == 200 OR (+d.fetch_status == 304 AND d.extraction_method IS NULL)'
+		query = f"""
+			SELECT d.id, d.domain, CASE WHEN c.payload IS NULL THEN d.html_body END, d.final_url,
+				d.html_hash, b.codec, CASE WHEN c.payload IS NULL THEN b.body END, c.payload
+			FROM domains d
+			LEFT JOIN candidates c ON c.html_hash = d.html_hash AND c.extractor_version = ?
+			LEFT JOIN html_blobs b ON b.hash = d.html_hash
+			WHERE ({Where}) AND (c.payload IS NOT NULL OR d.html_body IS NOT NULL OR b.body IS NOT NULL)
+		"""
+		cursor: sqlite3.Cursor = self._conn.execute(query, Params)
 		return cursor
 	
 	def _ProcessRows(self, Cursor: sqlite3.Cursor):
@@ -101,29 +185,104 @@ class Fetcher:
 
 		:Returns: None
 		"""
-		row: Tuple[int, str, str, str]
+		row: Tuple[int, str, str, str, str, str, bytes, bytes]
 		processed: int = 0
 		error: int = 0
+		cached: int = 0
 
 		try:
 			for row in Cursor:
-				RowId, Domain, HtmlBody, FinalUrl = row
+				RowId, Domain, HtmlBody, FinalUrl = row[:4]
 				print(f'[{RowId}] Attempting to extract logo for {Domain}')
 				try:
-					if self._ScanHtml(RowId, HtmlBody, FinalUrl):
+					Started = time.perf_counter()
+					AllTags, HtmlHash, Payload = self._LoadCandidates(row)
+					Extracted = self._ScoreCandidates(AllTags, FinalUrl)
+					metrics.ExtractionSeconds.Observe(time.perf_counter() - Started)
+					if Payload is not None:
+						self._StoreCandidates(RowId, HtmlHash, Payload)
+					else:
+						cached += 1
+					if self._StoreExtraction(RowId, *Extracted):
 						processed += 1
+						metrics.Extractions.Inc(result='logo')
 						print(f'[{RowId}] 🟢 extracted logo of {Domain}')
 					else:
 						error += 1
+						metrics.Extractions.Inc(result='no_logo')
 						print(f'[{RowId}] 🔴 Failed to extract logo for {Domain}')
 				except Exception as e:
 					error += 1
+					metrics.Extractions.Inc(result='error')
 					log = f'[{RowId}] 🔴 Error processing {Domain}: {e}'
 					self._WriteLog(log)
 					continue
 
-			self._conn.commit()
-			print(f'\nTransaction completed: {processed} processed, {error} errors')
+			self._FlushResults()
+			print(f'\nTransaction completed: {processed} processed, {error} errors, {cached} from candidate cache')
+		except sqlite3.DatabaseError as e:
+			self._conn.rollback()
+			self._WriteLog(f'Transaction rolled back on database error: {e}')
+		except Exception as e:
+			self._conn.rollback()
+			self._WriteLog(f'Transaction rolled back on unknown error: {e}')
+
+	def _ProcessRowsParallel(self, Cursor: sqlite3.Cursor):
+		"""
+		Process pool variant of `_ProcessRows`. Rows are read from the cursor in chunks of `_ChunkSize` and
+		extracted by `_Workers` processes, while this process stays the single writer and applies the results in
+		the order of the cursor. The next chunk is already being extracted while the previous one is written, so
+		the result is the same as the sequential path.
+
+		:Parameter: Cursor sqlite3.Cursor type that points to the database.
+
+		:Returns: None
+		"""
+		processed: int = 0
+		error: int = 0
+		cached: int = 0
+		InFlight: deque = deque()
+
+		def Apply(Results) -> None:
+			nonlocal processed, error, cached
+			for RowId, Domain, HtmlHash, Payload, Extracted, Error, Seconds in Results:
+				print(f'[{RowId}] Attempting to extract logo for {Domain}')
+				metrics.ExtractionSeconds.Observe(Seconds)
+				try:
+					if Error is not None:
+						raise Exception(Error)
+					if Payload is not None:
+						self._StoreCandidates(RowId, HtmlHash, Payload)
+					else:
+						cached += 1
+					if self._StoreExtraction(RowId, *Extracted):
+						processed += 1
+						metrics.Extractions.Inc(result='logo')
+						print(f'[{RowId}] 🟢 extracted logo of {Domain}')
+					else:
+						error += 1
+						metrics.Extractions.Inc(result='no_logo')
+						print(f'[{RowId}] 🔴 Failed to extract logo for {Domain}')
+				except Exception as e:
+					error += 1
+					metrics.Extractions.Inc(result='error')
+					self._WriteLog(f'[{RowId}] 🔴 Error processing {Domain}: {e}')
+
+		try:
+			with ProcessPoolExecutor(max_workers=self._Workers, initializer=_InitWorker, initargs=(self._RulesPath, self._Rescore)) as Pool:
+				while True:
+					Rows = Cursor.fetchmany(self._ChunkSize)
+					if not Rows:
+						break
+					InFlight.append(Pool.map(_ExtractRow, Rows, chunksize=max(1, len(Rows) // (self._Workers * 4))))
+					# keep at most two chunks around: one being extracted, one being written
+					if len(InFlight) > 1:
+						Apply(InFlight.popleft())
+				while InFlight:
+					Apply(InFlight.popleft())
+
+			self._FlushResults()
+			print(f'\nTransaction completed: {processed} processed, {error} errors, {cached} from candidate cache')
 		except sqlite3.DatabaseError as e:
 			self._conn.rollback()
 			self._WriteLog(f'Transaction rolled back on database error: {e}')
@@ -142,26 +301,128 @@ class Fetcher:
 
 		:Returns: None if no method was applicable, we return None
 		"""
-		Favicon: str
+		Favicon, PossibleLogoSvg, PossibleLogoImg = self._ExtractLogo(HtmlBody, Domain)
+		return self._StoreExtraction(RowId, Favicon, PossibleLogoSvg, PossibleLogoImg)
 
-		# Find favicon as a temporary fallback alternative
-		Favicon = self._FaviconExtraction(HtmlBody, Domain)
-		if Favicon is not None:
-			self._InsertFavicon(RowId, Favicon, 'FAVICON_LINK')
+	def _ExtractLogo(self, HtmlBody: str, Domain: str) -> Tuple[Optional[str], Optional[Tuple[str, float]], Optional[Tuple[str, float]]]:
+		"""
+		CPU-heavy half of `_ScanHtml`: runs every extraction method on the page without touching the database,
+		so it can also run inside the worker processes of `_ProcessRowsParallel`.
 
-		PossibleLogo: Tuple[str, float] = []
+		:Parameter: HtmlBody the index.html of given domain from the database.
+
+		:Parameter: Domain string containing the landing page/homepage of given domain.
+
+		:Returns: Favicon URL, best SVG candidate and best IMG candidate (each of them can be None)
+		"""
+		# a single pass over the page collects the candidates of every method
+		return self._ScoreCandidates(self._FindAllTags(HtmlBody), Domain)
+
+	def _ScoreCandidates(self, AllTags: Dict[str, List], Domain: str) -> Tuple[Optional[str], Optional[Tuple[str, float]], Optional[Tuple[str, float]]]:
+		"""
+		Scoring half of `_ExtractLogo`: picks the favicon and the best SVG and IMG out of the candidates of a page.
+
+		:Parameter: AllTags candidates as returned by `_FindAllTags` or read from the candidate cache.
+
+		:Parameter: Domain string containing the landing page/homepage of given domain.
+
+		:Returns: Favicon URL, best SVG candidate and best IMG candidate (each of them can be None)
+		"""
+		# Find favicon as a temporary fallback alternative
+		Favicon = self._FaviconExtraction(AllTags['link'], Domain)
 
 		# 28th of May CURRENT ISSUE: SVGs got scored and any minimum match would be enough
 		# Need to score them all together and fetch the highest scoring
 
-		PossibleLogoSvg = self._SvgMethod(HtmlBody, Domain)
-		PossibleLogoImg = self._ImgMethod(HtmlBody, Domain)
+		PossibleLogoSvg = self._SvgMethod(AllTags['svg'], Domain)
+		PossibleLogoImg = self._ImgMethod(AllTags['img'], Domain)
+		return Favicon, PossibleLogoSvg, PossibleLogoImg
+
+	def _LoadCandidates(self, Row: tuple) -> Tuple[Dict[str, List], str, Optional[bytes]]:
+		"""
+		Get the candidates of a row: from the candidate cache when the page was seen before by the same
+		extractor version, otherwise by parsing the page.
+
+		:Parameter: Row a row as returned by `_FetchRows`.
+
+		:Returns: (AllTags, HtmlHash, Payload) where Payload are the packed candidates that still have to be
+		cached, or None on a cache hit.
+		"""
+		RowId, Domain, HtmlBody, FinalUrl, HtmlHash, Codec, Blob, Cached = Row
+		if Cached is not None:
+			return candidatestore.Unpack(Cached), HtmlHash, None
+		# rows crawled by older versions still carry the plain html_body, and no hash
+		if HtmlBody is None and Blob is not None:
+			HtmlBody = htmlstore.Unpack(Codec, Blob)
+		if HtmlHash is None:
+			HtmlHash = htmlstore.HashHtml(HtmlBody)
+		AllTags = self._FindAllTags(HtmlBody)
+		return AllTags, HtmlHash, candidatestore.Pack(AllTags)
+
+	def _StoreCandidates(self, RowId: int, HtmlHash: str, Payload: bytes) -> None:
+		"""
+		Cache the candidates of a page, so later runs can skip parsing it.
+
+		:Parameter: RowId integer representing which row of the database the HTML body is from.
+
+		:Parameter: HtmlHash hash of the page the candidates come from.
+
+		:Parameter: Payload candidates packed by `CandidateStore.Pack`.
+		"""
+		self._PendingCandidates.append((HtmlHash, candidatestore.ExtractorVersion, Payload))
+		# rows of older versions get their hash here, so the next run finds their candidates.
+		# `compact` later stores the page under the same hash
+		self._PendingHashes.append((HtmlHash, RowId))
+
+	def _StoreExtraction(self, RowId: int, Favicon: Optional[str], PossibleLogoSvg, PossibleLogoImg) -> bool:
+		"""
+		Database half of `_ScanHtml`: picks the winning logo candidate and queues a single update of the row with
+		the logo, the favicon and the extraction stamp. The update is written by `_FlushResults`. A row without
+		logo loses the logo of an earlier extraction and keeps only its favicon.
+
+		:Parameter: RowId integer representing which row of the database the HTML body is from.
+
+		:Parameter: Favicon URL returned by `_FaviconExtraction`.
+
+		:Parameter: PossibleLogoSvg candidate returned by `_SvgMethod`.
+
+		:Parameter: PossibleLogoImg candidate returned by `_ImgMethod`.
+
+		:Returns: True if a logo was found, False otherwise.
+		"""
+		if Favicon is not None:
+			print(f'[{RowId}] 🟡 Favicon extracted')
 
-		AllResults = [PossibleLogoSvg, PossibleLogoImg]
-		
 		print(f'SVG SCORE: {PossibleLogoSvg[1] if PossibleLogoSvg is not None else "None"}')
 		print(f'IMG SCORE: {PossibleLogoImg[1] if PossibleLogoImg is not None else "None"}')
 
+		Favicon, LogoUrl, Method, Confidence, Asset = self._PickLogo(Favicon, PossibleLogoSvg, PossibleLogoImg)
+		if Asset is not None:
+			self._PendingAssets.append(Asset)
+		self._QueueResult(RowId, Favicon, LogoUrl, Method, Confidence)
+		if LogoUrl is None:
+			print(f'[{RowId}] No logo candidates found')
+			return False
+		return True
+
+	def _PickLogo(self, Favicon: Optional[str], PossibleLogoSvg, PossibleLogoImg) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[float], Optional[tuple]]:
+		"""
+		Pick the winning logo candidate, without touching the database. Also used by the crawl pipeline, whose
+		worker processes extract the pages as they come in, see `Pipeline`.
+
+		:Parameter: Favicon URL returned by `_FaviconExtraction`.
+
+		:Parameter: PossibleLogoSvg candidate returned by `_SvgMethod`.
+
+		:Parameter: PossibleLogoImg candidate returned by `_ImgMethod`.
+
+		:Returns: (Favicon, LogoUrl, Method, Confidence, Asset) with the values written to the row, and the
+		`(hash, size, svg)` row of `svg_assets` when the winner is an inline SVG, None otherwise.
+		"""
+		PossibleLogo: Tuple[str, float] = []
+
+		AllResults = [PossibleLogoSvg, PossibleLogoImg]
+
 		for result in AllResults:
 			if result is not None:
 				if isinstance(result, list):
@@ -170,9 +431,8 @@ class Fetcher:
 					PossibleLogo.append(result)
 
 		if not PossibleLogo:
-			print(f'[{RowId}] No logo candidates found')
-			return False
-		
+			return Favicon, None, 'FAVICON_LINK' if Favicon is not None else None, None, None
+
 		WinnerPossibility = max(PossibleLogo, key=lambda x: x[1])
 
 		if WinnerPossibility == PossibleLogoSvg:
@@ -184,23 +444,73 @@ class Fetcher:
 		else:
 			method = 'UNKNOWN'
 
-		return self._InsertLogoIntoDb(RowId, WinnerPossibility[0], method, WinnerPossibility[1])
+		LogoUrl = WinnerPossibility[0]
+		Asset = None
+		if method == 'SVG_TAG':
+			# the SVG goes into svg_assets once, the row only keeps a reference to it
+			Hash, Svg = svgstore.Pack(LogoUrl)
+			Asset = (Hash, len(Svg), Svg)
+			LogoUrl = svgstore.Reference(Hash)
 
-	def _SvgMethod(self, HtmlBody: str, Domain: str) -> Tuple[str, float]:
+		return Favicon, LogoUrl, method, WinnerPossibility[1], Asset
+
+	def _QueueResult(self, RowId: int, Favicon: Optional[str], LogoUrl: Optional[str], Method: Optional[str], Confidence: Optional[float]) -> None:
 		"""
-		Method #1 for logo extraction by converting SVG into URL data methodology using base64.
+		Queue the update of one row and write the queue once it holds `_BatchSize` rows.
+
+		:Parameter: RowId integer representing which row of the database the HTML body is from.
+
+		:Parameter: Favicon URL in string format containing the address to the favicon.
+
+		:Parameter: LogoUrl URL that contains logo image.
+
+		:Parameter: Method methodology used to obtain logo.
 
-		:Parameter: HtmlBody string of the index.html of given domain in database.
+		:Parameter: Confidence score of the logo.
+		"""
+		self._PendingResults.append((Favicon, LogoUrl, Method, Confidence, candidatestore.ExtractorVersion, RowId))
+		if len(self._PendingResults) >= self._BatchSize:
+			self._FlushResults()
+
+	def _FlushResults(self) -> None:
+		"""
+		Write the queued candidates, SVG assets and row updates with `executemany` and commit them. A crash only loses
+		the batch that was in the making. Database errors are left to the caller, which rolls the batch back.
+		"""
+		self._conn.executemany(
+			'INSERT OR IGNORE INTO candidates (html_hash, extractor_version, payload) VALUES (?, ?, ?)',
+			self._PendingCandidates
+		)
+		self._conn.executemany('UPDATE domains SET html_hash = ? WHERE id = ? AND html_hash IS NULL', self._PendingHashes)
+		self._conn.executemany('INSERT OR IGNORE INTO svg_assets (hash, size, svg) VALUES (?, ?, ?)', self._PendingAssets)
+		self._conn.executemany('''
+			UPDATE domains
+			SET favicon_url = ?, logo_url = ?, extraction_method = ?, confidence_score = ?,
+				extracted_at = CURRENT_TIMESTAMP, extractor_version = ?, size_signal = NULL
+			WHERE id = ?
+		''', self._PendingResults)
+		self._conn.commit()
+		self._Written += len(self._PendingResults)
+		if self._PendingResults:
+			print(f'💾 {self._Written} rows written')
+		self._PendingResults = []
+		self._PendingCandidates = []
+		self._PendingHashes = []
+		self._PendingAssets = []
+
+	def _SvgMethod(self, AllSvgs: List[Tuple[str, str]], Domain: str) -> Tuple[str, float]:
+		"""
+		Method #1 for logo extraction by scoring the inline `<svg>` elements. The winning SVG is stored as an
+		asset by `_StoreExtraction`, see `SvgStore`.
+
+		:Parameter: AllSvgs `(Content, Context)` of every `<svg>` element, as found by `_FindAllTags`.
 		
 		:Parameter: Domain string containing the landing page/homepage of given domain.
 
-		:Returns: LogoUrl string containing URL of logo image. Returns None if method fails to find logo.
+		:Returns: (Svg, Score) the markup of the best scoring SVG and its score. Returns None if method fails to find logo.
 		"""
 		LogoUrl: Tuple[str, float] = '', 0.0
 		Score: float = 0.0
-		AllSvgs: List[Tuple[str, str]] = []
-
-		AllSvgs = self._FindAllTags(HtmlBody, r'(.{0,200})<svg[^>]*>.*?</svg>(.{0,200})')
 		
 		if not AllSvgs:
 			return None
@@ -218,26 +528,13 @@ class Fetcher:
 		# AI used here: helped with the lambda syntax in max
 		# There's still a chance to have two same score WinnerSvgs
 		WinnerSvg = max(ScoredSvgs, key=lambda x: x[1])
-		LogoUrl = self._SvgToDataUrl(WinnerSvg[0])
-		return (LogoUrl, WinnerSvg[1])
-
-	def _SvgToDataUrl(self, SvgContent: str) -> str:
-		"""
-		Convert SVG to browser-accessible data URL
-
-		:Parameter: SvgContent a string of the HTML SVG tag containing the logo
-
-		:Returns: base64 logo URL
-		"""
-		SvgClean = SvgContent.strip()
-		SvgBytes = SvgClean.encode('utf-8')
-		SvgBase64 = base64.b64encode(SvgBytes).decode('utf-8')
-		return f'data:image/svg+xml;base64,{SvgBase64}'
+		return WinnerSvg
 
 	def _CalculateProbabilityScore(self, Content: str, Context: str) -> float:
 		"""
 		Method to calculate the likelihood that the tag we got contains a logo. The scale
-		goes form zero (0) to one (1).
+		goes form zero (0) to one (1). The indicators and their weights live in `Scoring` and
+		are compiled once when the Fetcher is created.
 
 		:Parameter: Content is a string that contains the content inside the tag.
 		
@@ -245,160 +542,51 @@ class Fetcher:
 
 		:Returns: FinalScore is a float which dictates how fair the extract scored.
 		"""
-		Score: float = 0.0
-		
-		# Make everything lower case to have a standard baseline
-		ContentLowerCase: str = ''
-		ContentLowerCase: str = ''
-		
-		if Content:
-			ContentLowerCase = Content.lower()
-		if Context:
-			ContextLowerCase = Context.lower()
+		return self._Rules.Scorer().Score(Content, Context)
 
-		
-		# AI used: used AI to find a way to structure a scoring point system for the SVGs
-		# so the values are a bit arbitrary. It has been reworked on 29th.
-		PositiveIndicators = {
-			'src="logo': 0.6,           # src="logo.png" 
-			'src="brand': 0.5,          # src="brand.svg"
-			'src="/logo': 0.6,          # src="/logo.png"
-			'src="./logo': 0.6,         # src="./logo.svg"
-			'src="../logo': 0.6,        # src="../logo.png"
-			'href="logo': 0.4,          # href="logo.png" (for <a> tags)
-			'href="/logo': 0.4,         # href="/logo.svg"
-			
-			# Logo in filename patterns
-			'-logo.': 0.5,              # company-logo.png, header-logo.svg
-			'_logo.': 0.5,              # main_logo.png
-			'/logo.': 0.6,              # /logo.png, /logo.svg
-			'logo-': 0.4,               # logo-dark.png, logo-white.svg
-			'logo_': 0.4,               # logo_2024.png
-
-			'class="logo': 0.4,
-			'id="logo': 0.4,
-			'alt="logo': 0.4,
-			'title="logo': 0.3,
-			'aria-label="logo': 0.4,
-			
-			# Brand references
-			'class="brand': 0.3,
-			'id="brand': 0.3,
-			'alt="brand': 0.3,
-			
-			# Structural positioning
-			'header': 0.2,
-			'nav': 0.2,
-			'navbar': 0.2,
-			'top': 0.1,
-			
-			# SVG specific
-			'viewbox=': 0.1,
-		}
-
-		# original point system
-
-		# PositiveIndicators = {
-		# 	# Direct references to logo
-		# 	'logo': 0.4,
-		# 	'brand': 0.3,
-		# 	'company': 0.2,
-
-		# 	# Structural indicators (usually you can see logos in the headers)
-		# 	'header': 0.2,
-		# 	'nav': 0.2,
-		# 	'navbar': 0.2,
-		# 	'top': 0.1,
-
-		# 	# Semantic indicators
-		# 	# 'src=' 0.2 # SVGs apparently cannot do src
-		# 	'aria-label': 0.2,
-		# 	'title=': 0.1,
-		# 	'alt=': 0.1,
-
-		# 	# ID patterns
-		# 	'class="logo': 0.4,
-		# 	'id="logo': 0.4,
-		# 	'class="brand': 0.3,
-		# 	'class="header': 0.2,
-
-		# 	# tag specifics
-    	# 	'src="logo': 0.3, # IMG
-        # 	'src="brand': 0.3, # IMG
-        # 	'href="logo': 0.2, # A TAG
-        # 	'href="#logo': 0.3, # A TAG
-		# 	'alt="logo': 0.3, # IMG
-		# 	'viewbox=': 0.1, # SVG
-		# }
-
-		for indicator, weight in PositiveIndicators.items():
-			if indicator in ContentLowerCase or indicator in ContextLowerCase:
-				# If we find a string in the tag that says "logo", the indicator
-				# will be a string called logo and the indicator will be the corresponding
-				# score of "logo", which is 0.4 in our dictionary.
-				# If there is a match, we add weight into our final score. 
-				Score += weight
-
-		# Use of AI: Also used AI to compile items for the negative indicators list.
-		NegativeIndicators = {
-			'client': 0.4,              # client-logo.png (customer logos)
-			'customer': 0.4,            # customer logos
-			'partner': 0.3,             # partner logos
-			'sponsor': 0.3,             # sponsor logos
-			'portfolio': 0.4,           # portfolio/logo-designs.jpg
-			'gallery': 0.3,             # logo gallery
-			
-			# UI elements
-			'icon': 0.2,
-			'arrow': 0.3,
-			'close': 0.4,
-			'menu': 0.2,
-			'search': 0.3,
-			'social': 0.2,
-			'footer': 0.2,
-			
-			# Size indicators that suggest not main logo
-			'thumb': 0.3,               # thumbnail logos
-			'small': 0.2,               # small logo versions
-			'mini': 0.3,                # mini logos
-		}
-
-		for indicator, penalty in NegativeIndicators.items():
-			if indicator in ContentLowerCase or indicator in ContextLowerCase:
-				# In the same way as we compiled the score with positive indicators, the
-				# negative indicators are meant to keep us clear from false-positives.
-				Score -= penalty
-
-		if not Score:
-			return 0.0
-
-		Result: float = max(0.0, min(1.0, Score))
-
-		return Result
-
-	def _FindAllTags(self, HtmlBody: str, Pattern: str) -> List[Tuple[str, str]]:
-		"""
-		Method for extraction of all tags that match the regex pattern.
-
-		:Parameter: HtmlBody a string that contains the HTML body.
-
-		:Parameter: pattern
-
-		:Returns: AllTags list of tuples with content and context around the tags.
+	def _FindAllTags(self, HtmlBody: str) -> Dict[str, List]:
 		"""
-		AllTags = []
+		Single linear pass over the page that collects the candidates of every extraction method. Only the
+		opening `<svg`, `<img` and `<link` tokens are searched for; from there the end of the tag (and for SVGs
+		the closing `</svg>`) is looked up with plain forward searches, so no character is scanned twice.
 
-		# IGNORECASE - case insensitive
-		# DOTALL - make dot match newlines too
-		matches = re.finditer(Pattern, HtmlBody, re.DOTALL | re.IGNORECASE)
+		:Parameter: HtmlBody a string that contains the HTML body.
 
-		for match in matches:
-			BeforeContext = match.group(1)
-			Content = match.group(0)[len(match.group(1)):-len(match.group(2))]
-			AfterContext = match.group(2)
+		:Returns: AllTags dictionary with `svg` and `img` lists of `(Content, Context)` tuples, where context
+		are the 200 characters around the tag, and a `link` list with the `<link>` tags.
+		"""
+		AllTags: Dict[str, List] = {'svg': [], 'img': [], 'link': []}
+		Position: int = 0
+		# once an <svg> has no closing tag, none of the following ones can have one either
+		SvgCloses: bool = True
+
+		while True:
+			Match = self._TagStartPattern.search(HtmlBody, Position)
+			if Match is None:
+				break
+			Start = Match.start()
+			Name = Match.group(1).lower()
+			TagEnd = HtmlBody.find('>', Match.end())
+			if TagEnd == -1:
+				break
+			End = TagEnd + 1
+
+			if Name == 'svg':
+				Close = self._SvgEndPattern.search(HtmlBody, End) if SvgCloses else None
+				if Close is None:
+					SvgCloses = False
+					Position = End
+					continue
+				End = Close.end()
+			elif Name == 'link':
+				AllTags['link'].append(HtmlBody[Start:End])
+				Position = End
+				continue
 
-			Context = BeforeContext + AfterContext
-			AllTags.append((Content, Context))
+			Content = HtmlBody[Start:End]
+			Context = HtmlBody[max(0, Start - 200):Start] + HtmlBody[End:End + 200]
+			AllTags[Name].append((Content, Context))
+			Position = End
 
 		return AllTags
 
@@ -433,22 +621,18 @@ class Fetcher:
 		
 		return AbsoluteUrl
 
-	def _ImgMethod(self, HtmlBody: str, Domain: str):
+	def _ImgMethod(self, imgs: List[Tuple[str, str]], Domain: str):
 		"""
 		Method #2 for logo extraction looking for `<img>` tags in the HTML body. This method is a first fallback
 		from the SVG method, and maybe not as fruitful as the SvgMethod, but it is better than searching for other
 		different tags. In sum, this method should score less than the SVG, but more than the custom tag method.
 
-		:Parameter: HtmlBody string of the index.html of given domain in database.
+		:Parameter: imgs `(Content, Context)` of every `<img>` tag, as found by `_FindAllTags`.
 		
 		:Parameter: Domain string containing the landing page/homepage of given domain.
 
 		:Returns: LogoUrl string containing URL of logo image. Returns None if method fails to find logo.
 		"""
-		imgs: list[Tuple[str, str]] = []
-
-		imgs = self._FindAllTags(HtmlBody, r'(.{0,200})<img[^>]*>(.{0,200})')
-
 		if not imgs:
 			return None
 
@@ -514,126 +698,111 @@ class Fetcher:
 		
 	# 	return WinnerTag[0], WinnerTag[2]
 
-	def _InsertLogoIntoDb(self, RowId: int, LogoUrl: str, Method: str, Confidence: float) -> None:
-		"""
-		Method that exclusively deals with inserting logos into the database.
-
-		:Parameter: RowId integer representing which row of the database the HTML body is from.
-		
-		:Parameter: LogoUrl URL that contains logo image.
-		
-		:Parameter: Method methodology used to obtain logo.
-		
-		:Returns: None
-		"""
-		try:
-			self._conn.execute('''
-						UPDATE domains
-						SET logo_url = ?, extraction_method = ?, confidence_score = ?
-						WHERE id = ?
-						''', (LogoUrl, Method, Confidence, RowId))
-			return True
-		except sqlite3.IntegrityError as e:
-			print(f"Database integrity error for row {RowId}: {e}")
-			return False
-		except sqlite3.OperationalError as e:
-			print(f"Database operation failed for row {RowId}: {e}")
-			return False
-		except sqlite3.DatabaseError as e:
-			print(f"Database error for row {RowId}: {e}")
-			return False
-		except Exception as e:
-			print(f"Unexpected error updating row {RowId}: {e}")
-			return False
-
-	def _FaviconExtraction(self, HtmlBody: str, Domain: str) -> Optional[str]:
+	def _FaviconExtraction(self, Links: List[str], Domain: str) -> Optional[str]:
 		"""
 		Method to find and extract URL of favicon
 
-		:Parameter: HtmlBody string of the index.html of given domain in database.
+		:Parameter: Links every `<link>` tag of the page, as found by `_FindAllTags`.
 		
 		:Parameter: Domain string containing the landing page/homepage of given domain.
 		
 		:Returns: Favicon URL in string if successful. None is returned in case of failure.
 		"""
 		Favicon: str = ''
-		patterns = [
-			r'<link[^>]*rel=["\'](?:shortcut )?icon["\'][^>]*href=["\']([^"\']+)["\']',
-			r'<link[^>]*href=["\']([^"\']+)["\'][^>]*rel=["\'](?:shortcut )?icon["\']',
-			r'<link[^>]*rel=["\']apple-touch-icon["\'][^>]*href=["\']([^"\']+)["\']'
-		]
-
-		for pattern in patterns:
-			match = re.search(pattern, HtmlBody, re.IGNORECASE)
-			if match:
-				FaviconUrl = match.group(1)
+		TouchIcon: Optional[str] = None
+
+		for Link in Links:
+			Attributes = {Name.lower(): ''.join(Values) for Name, *Values in self._AttributePattern.findall(Link)}
+			Rel = Attributes.get('rel', '').strip().lower()
+			FaviconUrl = Attributes.get('href', '')
+			if not FaviconUrl:
+				continue
+			if Rel in ('icon', 'shortcut icon'):
 				Favicon = self._MakeAbsoluteUrl(FaviconUrl, Domain)
 				return Favicon
+			if Rel == 'apple-touch-icon' and TouchIcon is None:
+				TouchIcon = FaviconUrl
+
+		if TouchIcon is not None:
+			Favicon = self._MakeAbsoluteUrl(TouchIcon, Domain)
+			return Favicon
 
 		# Fallback method (not going to include to the final submission because it may yield false results)
 		ParsedUrl = urlparse(Domain)
 		Favicon = f'{ParsedUrl.scheme}://{ParsedUrl.netloc}/favicon.ico'
 		return Favicon
 
-	
-	def _InsertFavicon(self, RowId: int, Favicon: str, Method: str) -> None:
-		"""
-		Method for insertion of favicon URL into database column favicon_url.
-
-		:Parameter: RowId integer representing which row of the database the HTML body is from.
-
-		:Parameter: Favicon URL in string format containing the address to the favicon.
-
-		:Parameter: Method methodology used to obtain logo.
-		"""
-		try:
-			self._conn.execute('''
-						UPDATE domains
-						SET favicon_url = ?, extraction_method = ?
-						WHERE id = ?
-						''', (Favicon, Method, RowId))
-			print(f'[{RowId}] 🟡 Favicon extracted')
-		except sqlite3.IntegrityError as e:
-			print(f"Database integrity error for row {RowId}: {e}")
-			return False
-		except sqlite3.OperationalError as e:
-			print(f"Database operation failed for row {RowId}: {e}")
-			return False
-		except sqlite3.DatabaseError as e:
-			print(f"Database error for row {RowId}: {e}")
-			return False
-		except Exception as e:
-			print(f"Unexpected error updating row {RowId}: {e}")
-			return False
-
-	def _UnloadDatabaseToCsv(self) -> bool:
+	def _UnloadDatabase(self) -> bool:
 		"""
-		Method to output CSV transcription of resulting database after Fetcher operations are done. Takes no parameters.
+		Method to output the resulting database after Fetcher operations are done, streamed by `Exporter` in the
+		format picked when the Fetcher was created. Takes no parameters.
 
 		:Returns: True is successful. False if it fails.
 		"""
 		try:
-			Cursor = self._conn.cursor()			
-			
-			CsvName = "websites_logos"
-			
-			Cursor.execute('''
-				SELECT domain, logo_url, extraction_method, confidence_score, robots_txt 
-				FROM domains
-				''')
-			data = Cursor.fetchall()
-			Timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-			if not os.path.exists('data'):
-				os.makedirs('data')
-			CsvPath = os.path.join('data', f'{CsvName}_{Timestamp}.csv')
-			with open(CsvPath, 'w', newline='', encoding='utf-8') as csvfile:
-				writer = csv.writer(csvfile)
-				writer.writerow(['domain', 'logo_url', 'extraction_method', 'confidence_score', 'robots_txt'])
-				writer.writerows(data)
-			
-			print(f"Successfully exported to {CsvName}.csv")
-			return True
-			
-		except Exception as e:
+			Exporter = exporter.Exporter(
+				self._conn,
+				Format=self._ExportFormat,
+				Compress=self._ExportCompress,
+				InlineSvg=self._ExportInlineSvg
+			)
+			return Exporter.Export() is not None
+		except ValueError as e:
 			print(f"Export failed: {str(e)}")
 			return False
+
+# Every worker process of `_ProcessRowsParallel` (and of the crawl pipeline) keeps its own database-less Fetcher around
+_WorkerFetcher: Optional[Fetcher] = None
+
+def _InitWorker(RulesPath: str, Rescore: bool) -> None:
+	"""
+	Runs once in every worker process: creates the Fetcher with the settings of the parent.
+	"""
+	global _WorkerFetcher
+	_WorkerFetcher = Fetcher(RulesPath=RulesPath, Rescore=Rescore)
+
+def _ExtractRow(Row: tuple):
+	"""
+	Runs inside a worker process: gets the candidates of one row (decompressing and parsing the page if needed)
+	and scores them.
+
+	:Parameter: Row a row as returned by `Fetcher._FetchRows`.
+
+	:Returns: (RowId, Domain, HtmlHash, Payload, Extracted, Error, Seconds) where HtmlHash and Payload are the candidates
+	to cache (see `Fetcher._LoadCandidates`) and Extracted is the result of `Fetcher._ScoreCandidates`, or None
+	together with the error message if the row could not be processed. Seconds is the time the extraction took,
+	for the metrics of the parent process.
+	"""
+	RowId, Domain, HtmlBody, FinalUrl, HtmlHash = Row[:5]
+	Started = time.perf_counter()
+	try:
+		AllTags, HtmlHash, Payload = _WorkerFetcher._LoadCandidates(Row)
+		Extracted = _WorkerFetcher._ScoreCandidates(AllTags, FinalUrl)
+		return RowId, Domain, HtmlHash, Payload, Extracted, None, time.perf_counter() - Started
+	except Exception as e:
+		return RowId, Domain, HtmlHash, None, None, str(e), time.perf_counter() - Started
+
+def _ExtractPage(Page: tuple):
+	"""
+	Runs inside a worker process of the crawl pipeline: extracts the logo of a page that was just crawled.
+
+	:Parameter: Page `(Domain, FinalUrl, Html, StoreHtml)` where `StoreHtml` asks for the compressed page too.
+
+	:Returns: (Domain, HtmlHash, Blob, Payload, Picked, Error, Seconds) with the page hash, the `(size, body)` of the
+	compressed page or None, the candidates packed by `CandidateStore.Pack` and the result of
+	`Fetcher._PickLogo`, or None together with the error message if the page could not be processed. Seconds is
+	the time the extraction took.
+	"""
+	Domain, FinalUrl, Html, StoreHtml = Page
+	Started = time.perf_counter()
+	try:
+		if StoreHtml:
+			HtmlHash, Size, Body = htmlstore.Pack(Html)
+			Blob = (Size, Body)
+		else:
+			HtmlHash, Blob = htmlstore.HashHtml(Html), None
+		AllTags = _WorkerFetcher._FindAllTags(Html)
+		Picked = _WorkerFetcher._PickLogo(*_WorkerFetcher._ScoreCandidates(AllTags, FinalUrl))
+		return Domain, HtmlHash, Blob, candidatestore.Pack(AllTags), Picked, None, time.perf_counter() - Started
+	except Exception as e:
+		return Domain, None, None, None, None, str(e), time.perf_counter() - Started
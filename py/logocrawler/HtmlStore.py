@@ -0,0 +1,105 @@
+import zlib
+import hashlib
+import sqlite3
+from typing import Tuple
+
+"""
+Content-addressed storage for the crawled index pages. Every page is stored once in `html_blobs`, compressed
+and keyed by the SHA-256 of its text, and `domains.html_hash` points at it. Parked domains and CDN error pages
+that are byte-for-byte identical therefore only take space once.
+
+Only zlib is used since it ships with Python. The `codec` column leaves room for other codecs later on.
+"""
+
+Codec: str = 'zlib'
+# level 6 is zlib's default: most of the gain of level 9 for a fraction of the CPU time
+CompressionLevel: int = 6
+
+def InitTable(conn: sqlite3.Connection) -> None:
+	"""
+	Create the `html_blobs` table if it does not exist yet, and the `domains.html_hash` column
+	pointing at it for databases created before the blob store.
+
+	:Parameter: conn open connection to the database.
+	"""
+	conn.execute('''
+		CREATE TABLE IF NOT EXISTS html_blobs (
+			hash TEXT PRIMARY KEY,
+			codec TEXT,
+			size INTEGER,
+			body BLOB
+		)
+	''')
+	Columns = {row[1] for row in conn.execute('PRAGMA table_info(domains)')}
+	if Columns and 'html_hash' not in Columns:
+		conn.execute('ALTER TABLE domains ADD COLUMN html_hash TEXT')
+
+def HashHtml(Html: str) -> str:
+	"""
+	:Parameter: Html page content.
+
+	:Returns: hex SHA-256 of the UTF-8 encoded page, used as the blob key.
+	"""
+	return hashlib.sha256(Html.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+def Pack(Html: str) -> Tuple[str, int, bytes]:
+	"""
+	Hash and compress a page.
+
+	:Parameter: Html page content.
+
+	:Returns: `(hash, size, body)` where size is the uncompressed size in bytes and body the compressed page.
+	"""
+	Raw = Html.encode('utf-8', errors='surrogatepass')
+	return hashlib.sha256(Raw).hexdigest(), len(Raw), zlib.compress(Raw, CompressionLevel)
+
+def Unpack(BlobCodec: str, Body: bytes) -> str:
+	"""
+	Decompress a page stored by `Pack`.
+
+	:Parameter: BlobCodec codec the blob was stored with.
+
+	:Parameter: Body compressed page.
+
+	:Returns: page content as a string.
+	"""
+	if BlobCodec != Codec:
+		raise ValueError(f'Unknown html codec {BlobCodec}')
+	return zlib.decompress(Body).decode('utf-8', errors='surrogatepass')
+
+def Compact(DbPath: str) -> int:
+	"""
+	Move the pages that older versions stored as plain TEXT in `domains.html_body` into `html_blobs`
+	and reclaim the freed space.
+
+	:Parameter: DbPath path to the database.
+
+	:Returns: number of rows that were moved.
+	"""
+	conn = sqlite3.connect(DbPath)
+	InitTable(conn)
+	Moved: int = 0
+	LastId: int = -1
+	while True:
+		# keyset pagination, so we never update the rows of a statement that is still being read
+		Rows = conn.execute('''
+			SELECT id, html_body FROM domains
+			WHERE html_body IS NOT NULL AND id > ?
+			ORDER BY id LIMIT 500
+		''', (LastId,)).fetchall()
+		if not Rows:
+			break
+		LastId = Rows[-1][0]
+		Blobs = []
+		Updates = []
+		for RowId, Html in Rows:
+			Hash, Size, Body = Pack(Html)
+			Blobs.append((Hash, Codec, Size, Body))
+			Updates.append((Hash, RowId))
+		conn.executemany('INSERT OR IGNORE INTO html_blobs (hash, codec, size, body) VALUES (?, ?, ?, ?)', Blobs)
+		conn.executemany('UPDATE domains SET html_hash = ?, html_body = NULL WHERE id = ?', Updates)
+		conn.commit()
+		Moved += len(Rows)
+	conn.execute('VACUUM')
+	conn.close()
+	return Moved
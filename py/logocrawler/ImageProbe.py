@@ -0,0 +1,534 @@
+import re
+import ssl
+import struct
+import sqlite3
+import asyncio
+import aiohttp
+import Writer as writer
+import SvgStore as svgstore
+import CandidateStore as candidatestore
+from typing import Iterator, Optional, Tuple
+
+"""
+Format and dimensions of images read from their first bytes. Every format the logos come in keeps its size in
+the header: PNG in the IHDR chunk, GIF in the screen descriptor, JPEG in the SOF segment, WebP in its first
+chunk, ICO in the directory and SVG in the width/height or viewBox of the root element. `ImageProber` asks
+for these bytes with a Range request, so a probe costs around a kilobyte instead of the whole file, and the
+dimensions are turned into a size signal that adjusts the confidence of the logo.
+"""
+
+ProbeResult = Tuple[Optional[str], Optional[int], Optional[int]]
+
+# the root element may only follow the XML declaration, comments and the doctype, so HTML pages with an inline
+# <svg> somewhere are not taken for SVG images
+_SvgTagPattern = re.compile(rb'(?:\xef\xbb\xbf)?\s*(?:(?:<\?xml[^>]*>|<!--.*?-->|<!DOCTYPE[^>]*>)\s*)*(<svg\b[^>]*>)', re.IGNORECASE | re.DOTALL)
+_SvgAttributePattern = r'\b%s\s*=\s*["\']\s*([0-9.]+)\s*(?:px)?\s*["\']'
+_SvgWidthPattern = re.compile((_SvgAttributePattern % 'width').encode(), re.IGNORECASE)
+_SvgHeightPattern = re.compile((_SvgAttributePattern % 'height').encode(), re.IGNORECASE)
+_SvgViewBoxPattern = re.compile(rb'\bviewBox\s*=\s*["\']\s*[-0-9.]+[\s,]+[-0-9.]+[\s,]+([0-9.]+)[\s,]+([0-9.]+)', re.IGNORECASE)
+
+# JPEG start-of-frame markers, the ones that carry the image size (C4, C8 and CC are tables)
+_JpegFrameMarkers = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def ProbeHeader(Header: bytes) -> ProbeResult:
+	"""
+	:Parameter: Header first bytes of the image.
+
+	:Returns: `(format, width, height)`. The format is one of `png`, `gif`, `jpeg`, `webp`, `ico` or `svg`, or None
+	if the bytes are none of them. Width and height are None when the header is cut off before the dimensions.
+	"""
+	if Header.startswith(b'\x89PNG\r\n\x1a\n'):
+		if len(Header) >= 24 and Header[12:16] == b'IHDR':
+			return 'png', *struct.unpack('>II', Header[16:24])
+		return 'png', None, None
+	if Header[:6] in (b'GIF87a', b'GIF89a'):
+		if len(Header) >= 10:
+			return 'gif', *struct.unpack('<HH', Header[6:10])
+		return 'gif', None, None
+	if Header.startswith(b'\xff\xd8'):
+		return ('jpeg', *_JpegSize(Header))
+	if Header[:4] == b'RIFF' and Header[8:12] == b'WEBP':
+		return ('webp', *_WebPSize(Header))
+	if Header[:4] in (b'\x00\x00\x01\x00', b'\x00\x00\x02\x00'):
+		return ('ico', *_IcoSize(Header))
+	if _SvgTagPattern.match(Header) is not None:
+		return ('svg', *_SvgSize(Header))
+	return None, None, None
+
+def _JpegSize(Header: bytes) -> Tuple[Optional[int], Optional[int]]:
+	"""
+	Walk the JPEG segments until the start-of-frame segment.
+	"""
+	Offset = 2
+	while Offset + 4 <= len(Header):
+		if Header[Offset] != 0xFF:
+			return None, None
+		Marker = Header[Offset + 1]
+		if Marker == 0xFF:
+			# fill byte in front of the marker
+			Offset += 1
+			continue
+		if Marker in (0x01, 0xD8) or 0xD0 <= Marker <= 0xD7:
+			# markers without a length
+			Offset += 2
+			continue
+		if Marker in _JpegFrameMarkers:
+			if Offset + 9 > len(Header):
+				return None, None
+			Height, Width = struct.unpack('>HH', Header[Offset + 5:Offset + 9])
+			return Width, Height
+		Offset += 2 + struct.unpack('>H', Header[Offset + 2:Offset + 4])[0]
+	return None, None
+
+def _WebPSize(Header: bytes) -> Tuple[Optional[int], Optional[int]]:
+	"""
+	Read the size from the first chunk: lossy (`VP8 `), lossless (`VP8L`) or extended (`VP8X`).
+	"""
+	Chunk = Header[12:16]
+	if Chunk == b'VP8X' and len(Header) >= 30:
+		return int.from_bytes(Header[24:27], 'little') + 1, int.from_bytes(Header[27:30], 'little') + 1
+	if Chunk == b'VP8 ' and len(Header) >= 30:
+		Width, Height = struct.unpack('<HH', Header[26:30])
+		return Width & 0x3FFF, Height & 0x3FFF
+	if Chunk == b'VP8L' and len(Header) >= 25:
+		Bits = int.from_bytes(Header[21:25], 'little')
+		return (Bits & 0x3FFF) + 1, ((Bits >> 14) & 0x3FFF) + 1
+	return None, None
+
+def _IcoSize(Header: bytes) -> Tuple[Optional[int], Optional[int]]:
+	"""
+	Pick the largest image of the icon directory. A size byte of 0 stands for 256.
+	"""
+	if len(Header) < 6:
+		return None, None
+	Count = struct.unpack('<H', Header[4:6])[0]
+	Best = None
+	for Index in range(Count):
+		Entry = 6 + 16 * Index
+		if Entry + 2 > len(Header):
+			break
+		Size = (Header[Entry] or 256, Header[Entry + 1] or 256)
+		if Best is None or Size[0] * Size[1] > Best[0] * Best[1]:
+			Best = Size
+	return Best if Best is not None else (None, None)
+
+def _SvgSize(Header: bytes) -> Tuple[Optional[int], Optional[int]]:
+	"""
+	Absolute `width`/`height` of the root element, falling back to its `viewBox` when they are missing or
+	relative (`100%`, `2em`).
+	"""
+	Tag = _SvgTagPattern.match(Header).group(1)
+	Width, Height = _SvgWidthPattern.search(Tag), _SvgHeightPattern.search(Tag)
+	if Width is not None and Height is not None:
+		return round(float(Width.group(1))), round(float(Height.group(1)))
+	ViewBox = _SvgViewBoxPattern.search(Tag)
+	if ViewBox is not None:
+		return round(float(ViewBox.group(1))), round(float(ViewBox.group(2)))
+	return None, None
+
+def SizeSignal(Width: Optional[int], Height: Optional[int]) -> float:
+	"""
+	Confidence adjustment for a logo of the given size. Tracking pixels, spacers, thin strips and favicon-sized
+	images are unlikely to be the logo, as are very large images, which tend to be banners or photos. Sizes in
+	the usual logo range get a small bonus.
+
+	:Parameter: Width width in pixels, or None if unknown.
+
+	:Parameter: Height height in pixels, or None if unknown.
+
+	:Returns: value added to the confidence score, 0.0 when the size is unknown.
+	"""
+	if not Width or not Height:
+		return 0.0
+	Short, Long = sorted((Width, Height))
+	Ratio = Long / Short
+	if Long <= 2:
+		return -0.5
+	if Long < 16:
+		return -0.3
+	if Ratio > 10:
+		return -0.2
+	if Long <= 32:
+		return -0.1
+	if Long > 2000:
+		return -0.1
+	if 48 <= Long <= 1200 and Ratio <= 6:
+		return 0.1
+	return 0.0
+
+def InitTable(conn: sqlite3.Connection) -> None:
+	"""
+	Create the `image_probes` table if it does not exist yet, together with the `domains.size_signal` column
+	that records the adjustment applied to the confidence of a row and `domains.adjusted_at`, when it was applied.
+
+	:Parameter: conn open connection to the database.
+	"""
+	conn.execute('''
+		CREATE TABLE IF NOT EXISTS image_probes (
+			url TEXT PRIMARY KEY,
+			status INTEGER,
+			image_format TEXT,
+			image_width INTEGER,
+			image_height INTEGER,
+			probed_bytes INTEGER,
+			probed_at DATETIME,
+			error_type TEXT
+		)
+	''')
+	Columns = {row[1] for row in conn.execute('PRAGMA table_info(domains)')}
+	for Column, Type in (('size_signal', 'REAL'), ('adjusted_at', 'DATETIME')):
+		if Columns and Column not in Columns:
+			conn.execute(f'ALTER TABLE domains ADD COLUMN {Column} {Type}')
+
+class ImageProber:
+	def __init__(self, Concurrency: int = 50, PerHost: int = 4, Timeout: float = 15, ProbeBytes: int = 1024,
+				MaxProbeBytes: int = 65536, BatchSize: int = 500, Refresh: bool = False, Fetcher=None):
+		"""
+		Probe stage for the logos and favicons found by `Fetcher`. Every distinct `logo_url`/`favicon_url` is
+		asked for its first `ProbeBytes` bytes only, the format and dimensions go into `image_probes`, and the
+		logos are picked again with the `SizeSignal` of their candidates. Inline SVG logos are probed straight
+		from `svg_assets`.
+
+		:Parameter: Concurrency number of probes in flight at the same time.
+
+		:Parameter: PerHost maximum connections to the same host.
+
+		:Parameter: Timeout seconds a single probe may take.
+
+		:Parameter: ProbeBytes bytes asked for in the first request. Enough for everything but JPEGs with large
+		metadata and SVGs with a long preamble.
+
+		:Parameter: MaxProbeBytes bytes asked for in the second request, when the first one did not reach the
+		dimensions.
+
+		:Parameter: BatchSize rows per transaction of the result writer.
+
+		:Parameter: Refresh probe URLs that are already in `image_probes` again.
+
+		:Parameter: Fetcher database-less `Fetcher` that scores the cached candidates of a page and picks the
+		logo, with the rules the logos were extracted with. None only adjusts the confidence of the logos.
+		"""
+		self._Concurrency: int = max(1, Concurrency)
+		self._PerHost: int = max(1, PerHost)
+		self._Timeout: float = Timeout
+		self._ProbeBytes: int = max(32, ProbeBytes)
+		self._MaxProbeBytes: int = max(self._ProbeBytes, MaxProbeBytes)
+		self._BatchSize: int = BatchSize
+		self._Refresh: bool = Refresh
+		self._Fetcher = Fetcher
+		self._DbPath: str = None
+		self._SuccessCounter: int = 0
+		self._FailedCounter: int = 0
+		self._BytesCounter: int = 0
+
+	def EntryPoint(self, DbPath: str) -> bool:
+		"""
+		Probe the images referenced by the database and adjust the confidence of the logos.
+
+		:Parameter: DbPath path to the database filled by `Crawler` and `Fetcher`.
+
+		:Returns: True once every URL was tried.
+		"""
+		self._DbPath = DbPath
+		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		InitTable(conn)
+		svgstore.InitTable(conn)
+		conn.commit()
+		conn.close()
+		asyncio.run(self._ProbeAll())
+		conn = sqlite3.connect(self._DbPath)
+		try:
+			Adjusted, Changed = self._ApplySizeSignal(conn)
+		finally:
+			conn.close()
+		print(f"\n📐 Adjusted the confidence of {Adjusted} logos by their size, {Changed} of them replaced by another candidate")
+		return True
+
+	async def _ProbeAll(self) -> None:
+		"""
+		Feed the pending URLs to `_Concurrency` workers sharing one session, and queue their results for the writer.
+		"""
+		self._SuccessCounter = 0
+		self._FailedCounter = 0
+		self._BytesCounter = 0
+		Writer = writer.ResultWriter(self._DbPath, BatchSize=self._BatchSize).Start()
+
+		ssl_context = ssl.create_default_context()
+		ssl_context.check_hostname = False
+		ssl_context.verify_mode = ssl.CERT_NONE
+
+		connector = aiohttp.TCPConnector(
+			limit=self._Concurrency,
+			limit_per_host=self._PerHost,
+			ttl_dns_cache=300,
+			ssl=ssl_context
+		)
+		timeout = aiohttp.ClientTimeout(total=self._Timeout, connect=10)
+		headers = {
+			'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+			'Accept': 'image/avif,image/webp,image/svg+xml,image/*,*/*;q=0.8',
+			'Accept-Language': 'en-US,en;q=0.5',
+			# compressed bodies would make the byte range meaningless
+			'Accept-Encoding': 'identity',
+			'Connection': 'keep-alive',
+		}
+
+		Queue: asyncio.Queue = asyncio.Queue(maxsize=self._Concurrency * 2)
+
+		async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+			Workers = [
+				asyncio.create_task(self._ProbeWorker(session, Queue, Writer))
+				for _ in range(self._Concurrency)
+			]
+			try:
+				for Url in self._PendingUrls():
+					await Queue.put(Url)
+				for _ in Workers:
+					await Queue.put(None)
+				await asyncio.gather(*Workers)
+			finally:
+				for Worker in Workers:
+					Worker.cancel()
+
+		Writer.Close()
+		print(f"\nCompleted probing {self._SuccessCounter + self._FailedCounter} images ({self._BytesCounter} bytes read)")
+		print(f"\n✅ Dimensions found: {self._SuccessCounter}")
+		print(f"\n❌ Failed to probe: {self._FailedCounter}")
+
+	def _PendingUrls(self):
+		"""
+		Generator over the distinct logo and favicon URLs that were not probed yet.
+
+		:Returns: iterator of URLs.
+		"""
+		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		# WAL, so the writer thread can commit while this cursor is still open
+		conn.execute('PRAGMA journal_mode=WAL')
+		Skip = '' if self._Refresh else 'WHERE url NOT IN (SELECT url FROM image_probes)'
+		try:
+			Cursor = conn.execute(f'''
+				SELECT url FROM (
+					SELECT logo_url AS url FROM domains WHERE logo_url LIKE 'http%'
+					UNION
+					SELECT favicon_url FROM domains WHERE favicon_url LIKE 'http%'
+				) {Skip}
+			''')
+			while True:
+				Rows = Cursor.fetchmany(500)
+				if not Rows:
+					break
+				for row in Rows:
+					yield row[0]
+			# the IMG candidates that lost to an SVG are probed too, so `_ApplySizeSignal` can weigh both
+			for _, _, Method, _, Svg, Img in self._PendingRows():
+				if Method != 'SVG_TAG' or Img is None:
+					continue
+				if self._Refresh or conn.execute('SELECT 1 FROM image_probes WHERE url = ?', (Img[0],)).fetchone() is None:
+					yield Img[0]
+		finally:
+			conn.close()
+
+	async def _ProbeWorker(self, session: aiohttp.ClientSession, Queue: asyncio.Queue, Writer: writer.ResultWriter) -> None:
+		"""
+		Worker that keeps taking URLs out of the queue until it receives the `None` sentinel.
+
+		:Parameter: session - aiohttp session shared between all workers
+
+		:Parameter: Queue - bounded queue fed by `_ProbeAll`
+
+		:Parameter: Writer - writer stage where the results are queued
+		"""
+		while True:
+			Url = await Queue.get()
+			try:
+				if Url is None:
+					return
+				Status, (Format, Width, Height), Read, ErrorType = await self._ProbeUrl(session, Url)
+				self._BytesCounter += Read
+				await Writer.SubmitAsync('''
+					INSERT OR REPLACE INTO image_probes (
+						url, status, image_format, image_width, image_height, probed_bytes, probed_at, error_type
+					) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+				''', (Url, Status, Format, Width, Height, Read, ErrorType))
+				if Width is not None:
+					self._SuccessCounter += 1
+				else:
+					self._FailedCounter += 1
+					print(f"❌ {Url}: Failed ({ErrorType or Status})")
+			except Exception as e:
+				self._FailedCounter += 1
+				print(f"❌ {Url}: Failed ({e})")
+			finally:
+				Queue.task_done()
+
+	async def _ProbeUrl(self, session: aiohttp.ClientSession, Url: str) -> Tuple[int, ProbeResult, int, Optional[str]]:
+		"""
+		Read the header of one image, first `_ProbeBytes` bytes and, if the dimensions come later in the file,
+		`_MaxProbeBytes` bytes.
+
+		:Parameter: session - aiohttp session to use for the request
+
+		:Parameter: Url - absolute URL of the image
+
+		:Returns: `(status, (format, width, height), bytes read, error_type)`. The status is 0 for network errors
+		and -1 for unresolvable hosts.
+		"""
+		Read = 0
+		for Limit in (self._ProbeBytes, self._MaxProbeBytes):
+			Status, Header, Complete, ErrorType = await self._ReadHeader(session, Url, Limit)
+			Read += len(Header)
+			if ErrorType is not None:
+				return Status, (None, None, None), Read, ErrorType
+			Format, Width, Height = ProbeHeader(Header)
+			# an XML declaration or comment can push the <svg> tag of an SVG past the first request
+			Preamble = Header.lstrip()[:5] in (b'<?xml', b'<!--')
+			if Format is None and (Complete or Limit == self._MaxProbeBytes or not Preamble):
+				return Status, (None, None, None), Read, 'UNKNOWN_FORMAT'
+			if Width is not None or Complete or Limit == self._MaxProbeBytes:
+				break
+		return Status, (Format, Width, Height), Read, None if Width is not None else 'NO_DIMENSIONS'
+
+	async def _ReadHeader(self, session: aiohttp.ClientSession, Url: str, Limit: int) -> Tuple[int, bytes, bool, Optional[str]]:
+		"""
+		Ask for the first `Limit` bytes of the URL. Servers that ignore the Range header send the whole file,
+		in which case the connection is dropped once `Limit` bytes were read.
+
+		:Returns: `(status, header, complete, error_type)` where `complete` tells if the header is the whole file.
+		"""
+		try:
+			async with session.get(Url, allow_redirects=True, headers={'Range': f'bytes=0-{Limit - 1}'}) as response:
+				if response.status not in (200, 206):
+					return response.status, b'', False, 'HTTP_ERROR'
+				Header = bytearray()
+				async for Chunk in response.content.iter_chunked(Limit):
+					Header += Chunk
+					if len(Header) >= Limit:
+						break
+				Complete = len(Header) < Limit
+				if response.status == 206:
+					# Content-Range: bytes 0-1023/<total>
+					Total = response.headers.get('Content-Range', '').rpartition('/')[2]
+					Complete = Total.isdigit() and int(Total) <= len(Header)
+				return response.status, bytes(Header[:Limit]), Complete, None
+		except aiohttp.ClientConnectorError as e:
+			if "No address associated with hostname" in str(e) or "Name or service not known" in str(e):
+				return -1, b'', False, 'DNS_RESOLUTION_FAILED'
+			return 0, b'', False, 'CONNECTION_FAILED'
+		except asyncio.TimeoutError:
+			return 0, b'', False, 'TIMEOUT'
+		except aiohttp.ClientError:
+			return 0, b'', False, 'CONNECTION_FAILED'
+
+	def _PendingRows(self) -> Iterator[tuple]:
+		"""
+		Generator over the logos that were not adjusted since `Fetcher` last scored them (`Fetcher` clears
+		`size_signal` whenever it writes a score), together with the candidates they were picked from.
+
+		:Returns: iterator of `(id, confidence_score, extraction_method, logo_url, Svg, Img)` tuples where `Svg` and
+		`Img` are the best SVG and IMG candidates as scored by `Fetcher._ScoreCandidates`. Both are None when there is
+		no `Fetcher` or the candidates of the page are not cached for the extractor version that picked the logo.
+		"""
+		# a separate connection, so the updates of `_ApplySizeSignal` can be committed while this cursor is open
+		Reader: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		try:
+			Cursor = Reader.execute('''
+				SELECT d.id, d.confidence_score, d.extraction_method, d.logo_url, d.final_url, c.payload
+				FROM domains d
+				LEFT JOIN candidates c ON c.html_hash = d.html_hash AND c.extractor_version = d.extractor_version
+					AND d.extractor_version = ?
+				WHERE d.extraction_method IN ('IMG_TAG', 'SVG_TAG') AND d.size_signal IS NULL
+					AND d.confidence_score IS NOT NULL
+			''', (candidatestore.ExtractorVersion,))
+			while True:
+				Rows = Cursor.fetchmany(self._BatchSize)
+				if not Rows:
+					return
+				for RowId, Confidence, Method, LogoUrl, FinalUrl, Payload in Rows:
+					Svg = Img = None
+					if self._Fetcher is not None and Payload is not None:
+						_, Svg, Img = self._Fetcher._ScoreCandidates(candidatestore.Unpack(Payload), FinalUrl)
+					yield RowId, Confidence, Method, LogoUrl, Svg, Img
+		finally:
+			Reader.close()
+
+	def _ApplySizeSignal(self, conn: sqlite3.Connection) -> Tuple[int, int]:
+		"""
+		Weigh the size of the candidates into the logo of every row `_PendingRows` returns. The best SVG and the best
+		IMG of the page, the two candidates `Fetcher._PickLogo` chooses between, both get their size signal added and
+		the logo is picked again, so a spacer image can lose to the SVG it beat. Rows whose candidates are not cached
+		only get the signal of their logo added. Logos that are images without known dimensions are left for a later
+		run. The updates are committed every `BatchSize` rows.
+
+		:Parameter: conn open connection to the database.
+
+		:Returns: `(adjusted, changed)` number of adjusted rows and how many of them got another logo.
+		"""
+		Adjusted: int = 0
+		Changed: int = 0
+		Updates = []
+		Assets = []
+
+		def Flush() -> None:
+			conn.executemany('INSERT OR IGNORE INTO svg_assets (hash, size, svg) VALUES (?, ?, ?)', Assets)
+			conn.executemany('''
+				UPDATE domains
+				SET logo_url = ?, extraction_method = ?, confidence_score = ?, size_signal = ?, adjusted_at = CURRENT_TIMESTAMP
+				WHERE id = ?
+			''', Updates)
+			conn.commit()
+			Updates.clear()
+			Assets.clear()
+
+		for RowId, Confidence, Method, LogoUrl, Svg, Img in self._PendingRows():
+			LogoSignal = self._UrlSignal(conn, LogoUrl) if Method == 'IMG_TAG' else self._AssetSignal(conn, LogoUrl)
+			if LogoSignal is None:
+				continue
+			if Svg is None and Img is None:
+				Updates.append((LogoUrl, Method, _Clamp(Confidence + LogoSignal), LogoSignal, RowId))
+			else:
+				Signals = {}
+				if Svg is not None:
+					Signals['SVG_TAG'] = _SvgSignal(Svg[0])
+					Svg = (Svg[0], _Clamp(Svg[1] + Signals['SVG_TAG']))
+				if Img is not None:
+					Signals['IMG_TAG'] = self._UrlSignal(conn, Img[0]) or 0.0
+					Img = (Img[0], _Clamp(Img[1] + Signals['IMG_TAG']))
+				_, NewUrl, NewMethod, NewConfidence, Asset = self._Fetcher._PickLogo(None, Svg, Img)
+				if Asset is not None:
+					Assets.append(Asset)
+				Changed += NewUrl != LogoUrl
+				Updates.append((NewUrl, NewMethod, NewConfidence, Signals.get(NewMethod, 0.0), RowId))
+			Adjusted += 1
+			if len(Updates) >= self._BatchSize:
+				Flush()
+		Flush()
+		return Adjusted, Changed
+
+	def _UrlSignal(self, conn: sqlite3.Connection, Url: str) -> Optional[float]:
+		"""
+		:Returns: size signal of a probed image, or None if its dimensions are not known.
+		"""
+		Row = conn.execute(
+			'SELECT image_width, image_height FROM image_probes WHERE url = ? AND image_width IS NOT NULL', (Url,)
+		).fetchone()
+		return SizeSignal(*Row) if Row is not None else None
+
+	def _AssetSignal(self, conn: sqlite3.Connection, LogoUrl: str) -> Optional[float]:
+		"""
+		:Returns: size signal of an inline SVG logo stored in `svg_assets`, or None if the asset is missing.
+		"""
+		Row = conn.execute('SELECT svg FROM svg_assets WHERE hash = ?', (svgstore.HashOf(LogoUrl),)).fetchone()
+		return _SvgSignal(Row[0]) if Row is not None else None
+
+def _SvgSignal(Svg: str) -> float:
+	"""
+	:Returns: size signal of an inline SVG, read from its markup.
+	"""
+	_, Width, Height = ProbeHeader(Svg.encode('utf-8', errors='surrogatepass'))
+	return SizeSignal(Width, Height)
+
+def _Clamp(Confidence: float) -> float:
+	"""
+	:Returns: confidence kept between 0 and 1.
+	"""
+	return min(1.0, max(0.0, Confidence))
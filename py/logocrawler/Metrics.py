@@ -0,0 +1,350 @@
+import os
+import json
+import math
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, List, Optional, Tuple
+
+"""
+Live metrics of the crawl and of the extraction. The stages update the metrics declared at the bottom of this
+module, and a `Reporter` exposes them while the run goes on: as Prometheus text on `http://127.0.0.1:<port>/metrics`
+and as JSON snapshots appended to a file every few seconds. Updating a metric only takes a lock and a dictionary
+lookup, so they are updated whether or not a reporter is running.
+"""
+
+# seconds, from a cached DNS answer up to a request running into the timeout
+DefaultBuckets: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _Metric:
+	Type: str = 'untyped'
+
+	def __init__(self, Name: str, Help: str, Labels: Tuple[str, ...] = ()):
+		"""
+		:Parameter: Name metric name, `logocrawler_` followed by what is measured.
+
+		:Parameter: Help one line description shown by the endpoint.
+
+		:Parameter: Labels names of the labels the samples are split by.
+		"""
+		self.Name: str = Name
+		self.Help: str = Help
+		self._Labels: Tuple[str, ...] = tuple(Labels)
+		self._Lock: threading.Lock = threading.Lock()
+		self._Values: dict = {}
+
+	def Samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+		"""
+		:Returns: `(name, labels, value)` of every sample, in the Prometheus sense.
+		"""
+		with self._Lock:
+			return [(self.Name, self._LabelDict(Key), Value) for Key, Value in self._Values.items()]
+
+	def Snapshot(self) -> list:
+		"""
+		:Returns: `{"labels": ..., "value": ...}` of every label combination, for the JSON snapshots.
+		"""
+		return [{'labels': Labels, 'value': Value} for _, Labels, Value in self.Samples()]
+
+	def _Key(self, Labels: dict) -> tuple:
+		return tuple(str(Labels.get(Label, '')) for Label in self._Labels)
+
+	def _LabelDict(self, Key: tuple) -> Dict[str, str]:
+		return dict(zip(self._Labels, Key))
+
+class Counter(_Metric):
+	Type = 'counter'
+
+	def Inc(self, Amount: float = 1, **Labels) -> None:
+		"""
+		:Parameter: Amount how much to add, never negative.
+
+		:Parameter: Labels values of the labels of the metric.
+		"""
+		Key = self._Key(Labels)
+		with self._Lock:
+			self._Values[Key] = self._Values.get(Key, 0) + Amount
+
+class Gauge(_Metric):
+	Type = 'gauge'
+
+	def __init__(self, Name: str, Help: str, Labels: Tuple[str, ...] = ()):
+		super().__init__(Name, Help, Labels)
+		self._Functions: Dict[tuple, Callable[[], float]] = {}
+
+	def Set(self, Value: float, **Labels) -> None:
+		Key = self._Key(Labels)
+		with self._Lock:
+			self._Values[Key] = Value
+
+	def Inc(self, Amount: float = 1, **Labels) -> None:
+		Key = self._Key(Labels)
+		with self._Lock:
+			self._Values[Key] = self._Values.get(Key, 0) + Amount
+
+	def Dec(self, Amount: float = 1, **Labels) -> None:
+		self.Inc(-Amount, **Labels)
+
+	def Track(self, Function: Optional[Callable[[], float]], **Labels) -> None:
+		"""
+		Read the value from `Function` whenever the metrics are collected, like the size of a queue.
+
+		:Parameter: Function returns the current value. None stops tracking and keeps the last value.
+		"""
+		Key = self._Key(Labels)
+		with self._Lock:
+			if Function is None:
+				Tracked = self._Functions.pop(Key, None)
+				if Tracked is not None:
+					self._Values[Key] = Tracked()
+			else:
+				self._Functions[Key] = Function
+
+	def Samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+		with self._Lock:
+			Values = dict(self._Values)
+			Functions = dict(self._Functions)
+		for Key, Function in Functions.items():
+			try:
+				Values[Key] = Function()
+			except Exception:
+				continue
+		return [(self.Name, self._LabelDict(Key), Value) for Key, Value in Values.items()]
+
+class Histogram(_Metric):
+	Type = 'histogram'
+
+	def __init__(self, Name: str, Help: str, Labels: Tuple[str, ...] = (), Buckets: Tuple[float, ...] = DefaultBuckets):
+		"""
+		:Parameter: Buckets upper bounds of the buckets, `+Inf` is added.
+		"""
+		super().__init__(Name, Help, Labels)
+		self._Buckets: Tuple[float, ...] = tuple(sorted(Buckets)) + (math.inf,)
+
+	def Observe(self, Value: float, **Labels) -> None:
+		"""
+		:Parameter: Value measured value, seconds for the latencies.
+
+		:Parameter: Labels values of the labels of the metric.
+		"""
+		Key = self._Key(Labels)
+		Index = next(Index for Index, Bound in enumerate(self._Buckets) if Value <= Bound)
+		with self._Lock:
+			Entry = self._Values.get(Key)
+			if Entry is None:
+				# per bucket counts, sum, count
+				Entry = self._Values[Key] = [[0] * len(self._Buckets), 0.0, 0]
+			Entry[0][Index] += 1
+			Entry[1] += Value
+			Entry[2] += 1
+
+	def Samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+		Samples = []
+		with self._Lock:
+			Values = [(Key, list(Counts), Sum, Count) for Key, (Counts, Sum, Count) in self._Values.items()]
+		for Key, Counts, Sum, Count in Values:
+			Labels = self._LabelDict(Key)
+			Cumulative = 0
+			for Bound, BucketCount in zip(self._Buckets, Counts):
+				Cumulative += BucketCount
+				Samples.append((f'{self.Name}_bucket', {**Labels, 'le': _FormatValue(Bound)}, Cumulative))
+			Samples.append((f'{self.Name}_sum', Labels, Sum))
+			Samples.append((f'{self.Name}_count', Labels, Count))
+		return Samples
+
+	def Snapshot(self) -> list:
+		with self._Lock:
+			Values = [(Key, list(Counts), Sum, Count) for Key, (Counts, Sum, Count) in self._Values.items()]
+		return [
+			{
+				'labels': self._LabelDict(Key),
+				'count': Count,
+				'sum': Sum,
+				'buckets': {_FormatValue(Bound): BucketCount for Bound, BucketCount in zip(self._Buckets, Counts)}
+			}
+			for Key, Counts, Sum, Count in Values
+		]
+
+class Registry:
+	def __init__(self):
+		"""
+		Collection of metrics that are exposed together.
+		"""
+		self._Metrics: List[_Metric] = []
+
+	def Counter(self, Name: str, Help: str, Labels: Tuple[str, ...] = ()) -> Counter:
+		return self._Add(Counter(Name, Help, Labels))
+
+	def Gauge(self, Name: str, Help: str, Labels: Tuple[str, ...] = ()) -> Gauge:
+		return self._Add(Gauge(Name, Help, Labels))
+
+	def Histogram(self, Name: str, Help: str, Labels: Tuple[str, ...] = (), Buckets: Tuple[float, ...] = DefaultBuckets) -> Histogram:
+		return self._Add(Histogram(Name, Help, Labels, Buckets))
+
+	def Render(self) -> str:
+		"""
+		:Returns: all metrics in the Prometheus text exposition format.
+		"""
+		Lines: List[str] = []
+		for Metric in self._Metrics:
+			Lines.append(f'# HELP {Metric.Name} {Metric.Help}')
+			Lines.append(f'# TYPE {Metric.Name} {Metric.Type}')
+			for Name, Labels, Value in Metric.Samples():
+				LabelText = ','.join(f'{Label}="{_Escape(LabelValue)}"' for Label, LabelValue in Labels.items())
+				Lines.append(f'{Name}{{{LabelText}}} {_FormatValue(Value)}' if LabelText else f'{Name} {_FormatValue(Value)}')
+		return '\n'.join(Lines) + '\n'
+
+	def Snapshot(self) -> dict:
+		"""
+		:Returns: all metrics as a dictionary, keyed by metric name.
+		"""
+		return {Metric.Name: Metric.Snapshot() for Metric in self._Metrics}
+
+	def _Add(self, Metric: _Metric) -> _Metric:
+		self._Metrics.append(Metric)
+		return Metric
+
+	def _AfterFork(self) -> None:
+		"""
+		A child process may have been forked while another thread held the lock of a metric, so it gets new ones.
+		"""
+		for Metric in self._Metrics:
+			Metric._Lock = threading.Lock()
+
+class Reporter:
+	def __init__(self, Port: Optional[int] = None, SnapshotPath: Optional[str] = None, Interval: float = 10.0,
+				Metrics: Optional[Registry] = None):
+		"""
+		Exposes a registry while a run goes on. Nothing is started for the parts that are not asked for.
+
+		:Parameter: Port serve the metrics on `http://127.0.0.1:<Port>/metrics`. None for no endpoint.
+
+		:Parameter: SnapshotPath append a JSON snapshot to this file every `Interval` seconds and once more at
+		the end, one object per line. None for no snapshots.
+
+		:Parameter: Interval seconds between two snapshots.
+
+		:Parameter: Metrics registry to expose, the default one of this module if None.
+		"""
+		self._Port: Optional[int] = Port
+		self._SnapshotPath: Optional[str] = SnapshotPath
+		self._Interval: float = max(0.1, Interval)
+		self._Metrics: Registry = Metrics or Default
+		self._Server: Optional[ThreadingHTTPServer] = None
+		self._Thread: Optional[threading.Thread] = None
+		self._Stop: threading.Event = threading.Event()
+
+	def Start(self) -> 'Reporter':
+		"""
+		Start the endpoint and the snapshot thread. Returns the reporter itself so it can be chained.
+		"""
+		if self._Port is not None:
+			self._Server = ThreadingHTTPServer(('127.0.0.1', self._Port), _MetricsHandler)
+			self._Server.daemon_threads = True
+			self._Server.Metrics = self._Metrics
+			threading.Thread(target=self._Server.serve_forever, name='MetricsServer', daemon=True).start()
+			print(f"📈 Metrics on http://127.0.0.1:{self._Server.server_address[1]}/metrics")
+		if self._SnapshotPath is not None:
+			self._Stop.clear()
+			self._Thread = threading.Thread(target=self._Run, name='MetricsSnapshots', daemon=True)
+			self._Thread.start()
+		return self
+
+	def Close(self) -> None:
+		"""
+		Write the last snapshot and stop the endpoint.
+		"""
+		if self._Thread is not None:
+			self._Stop.set()
+			self._Thread.join()
+			self._Thread = None
+		if self._Server is not None:
+			self._Server.shutdown()
+			self._Server.server_close()
+			self._Server = None
+
+	def ForShard(self, Index: int) -> Tuple[Optional[int], Optional[str], float]:
+		"""
+		Settings of the reporter of a shard process: the port after this one plus the shard number, and the
+		snapshot file with the shard number before its extension.
+
+		:Parameter: Index shard number.
+
+		:Returns: `(Port, SnapshotPath, Interval)` to create the `Reporter` of the shard with.
+		"""
+		Port = None if self._Port is None else self._Port + 1 + Index
+		Path = None
+		if self._SnapshotPath is not None:
+			Base, Extension = os.path.splitext(self._SnapshotPath)
+			Path = f'{Base}.shard-{Index}{Extension}'
+		return Port, Path, self._Interval
+
+	def _Run(self) -> None:
+		"""
+		Body of the snapshot thread.
+		"""
+		while not self._Stop.wait(self._Interval):
+			self._WriteSnapshot()
+		self._WriteSnapshot()
+
+	def _WriteSnapshot(self) -> None:
+		Line = json.dumps({'time': time.time(), 'pid': os.getpid(), 'metrics': self._Metrics.Snapshot()})
+		try:
+			with open(self._SnapshotPath, 'a') as SnapshotFile:
+				SnapshotFile.write(Line + '\n')
+		except OSError as e:
+			print(f"Metrics snapshot failed: {e}")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+	def do_GET(self) -> None:
+		if self.path.split('?')[0] == '/metrics':
+			Body = self.server.Metrics.Render().encode('utf-8')
+			ContentType = 'text/plain; version=0.0.4; charset=utf-8'
+		elif self.path.split('?')[0] == '/metrics.json':
+			Body = json.dumps(self.server.Metrics.Snapshot()).encode('utf-8')
+			ContentType = 'application/json'
+		else:
+			self.send_error(404)
+			return
+		self.send_response(200)
+		self.send_header('Content-Type', ContentType)
+		self.send_header('Content-Length', str(len(Body)))
+		self.end_headers()
+		self.wfile.write(Body)
+
+	def log_message(self, format: str, *args) -> None:
+		# the crawl output is busy enough already
+		pass
+
+def _FormatValue(Value: float) -> str:
+	if Value == math.inf:
+		return '+Inf'
+	if isinstance(Value, float) and Value.is_integer():
+		return str(int(Value)) if abs(Value) < 1e15 else repr(Value)
+	return repr(Value) if isinstance(Value, float) else str(Value)
+
+def _Escape(Value: str) -> str:
+	return Value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+Default: Registry = Registry()
+os.register_at_fork(after_in_child=Default._AfterFork)
+
+# crawler
+RequestsInFlight = Default.Gauge('logocrawler_requests_in_flight', 'Page requests waiting for an answer')
+FetchSeconds = Default.Histogram('logocrawler_fetch_seconds', 'Time of a page request until its body is read, by URL variant', ('variant',))
+Responses = Default.Counter('logocrawler_responses_total', 'Page requests by HTTP status, 0 for network errors, -1 for unresolvable hosts and cancelled for variants that lost the race', ('status',))
+DownloadedBytes = Default.Counter('logocrawler_downloaded_bytes_total', 'Bytes of page bodies read')
+QueueDepth = Default.Gauge('logocrawler_queue_depth', 'Items waiting in a stage of the crawl', ('queue',))
+# resolver
+DnsLookups = Default.Counter('logocrawler_dns_lookups_total', 'getaddrinfo calls by outcome: resolved, not_found or failed', ('result',))
+DnsCacheHits = Default.Counter('logocrawler_dns_cache_hits_total', 'Host lookups answered from the dns_cache')
+# writer
+SqliteBatchSeconds = Default.Histogram('logocrawler_sqlite_batch_seconds', 'Time to write and commit one batch of the result writer')
+SqliteRows = Default.Counter('logocrawler_sqlite_rows_total', 'Rows written by the result writer')
+SqliteErrors = Default.Counter('logocrawler_sqlite_errors_total', 'Rows dropped on a database error or after the writer stopped')
+# extraction
+ExtractionSeconds = Default.Histogram(
+	'logocrawler_extraction_seconds', 'Time to parse and score one page',
+	Buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+Extractions = Default.Counter('logocrawler_extractions_total', 'Pages extracted by outcome: logo, no_logo or error', ('result',))
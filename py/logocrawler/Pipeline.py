@@ -0,0 +1,150 @@
+import os
+import asyncio
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import Crawler as crawler
+import Fetcher as fetcher
+import Writer as writer
+import HtmlStore as htmlstore
+import CandidateStore as candidatestore
+import SvgStore as svgstore
+import Exporter as exporter
+import Scoring as scoring
+import Metrics as metrics
+
+class Pipeline(crawler.Crawler):
+	def __init__(self, Workers: int = None, RulesPath: str = scoring.DefaultRulesPath, StoreHtml: bool = False,
+				ExportFormat: str = 'csv', ExportCompress: bool = False, ExportInlineSvg: bool = False, **Options):
+		"""
+		Crawl and extract in a single pass. Every page the crawler fetches goes straight to a pool of extraction
+		processes running the `Fetcher` scoring, and the domain row is written once, with the crawl and the
+		extraction results together. The pages themselves are only stored when asked for, so the HTML never
+		has to be written to the database and read back by a separate `fetch` run.
+
+		:Parameter: Workers extraction processes, one per CPU core by default.
+
+		:Parameter: RulesPath scoring rules file, see `Scoring`.
+
+		:Parameter: StoreHtml also store the compressed pages in `html_blobs`.
+
+		:Parameter: ExportFormat format of the export written at the end of the run, see `Exporter`.
+
+		:Parameter: ExportCompress gzip the export.
+
+		:Parameter: ExportInlineSvg write SVG logos into the export as data URLs.
+
+		:Parameter: Options the settings of `Crawler`.
+		"""
+		super().__init__(**Options)
+		self._Workers: int = max(1, Workers or os.cpu_count() or 1)
+		self._RulesPath: str = RulesPath
+		self._StoreHtml: bool = StoreHtml
+		self._ExportFormat: str = ExportFormat
+		self._ExportCompress: bool = ExportCompress
+		self._ExportInlineSvg: bool = ExportInlineSvg
+		self._Pool: ProcessPoolExecutor = None
+		self._ExtractedCounter: int = 0
+		self._NoLogoCounter: int = 0
+		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		svgstore.InitTable(conn)
+		conn.commit()
+		conn.close()
+
+	def EntryPoint(self, Domains, mode) -> bool:
+		"""
+		Crawl and extract the domains, then export the results like `Fetcher` does.
+
+		:Parameter: `Domains` If mode (1) is selected, domains contains a csv file, otherwise it is a single domain url.
+
+		:Parameter: `mode` defines if we are working with a csv file (1) or single entry mode (2)
+
+		:Returns: True once the export was written.
+		"""
+		super().EntryPoint(Domains, mode)
+		print(f"\n🟢 Logos extracted: {self._ExtractedCounter}")
+		print(f"\n🔴 Pages without logo: {self._NoLogoCounter}")
+		conn: sqlite3.Connection = sqlite3.connect(self._DbPath)
+		try:
+			Exporter = exporter.Exporter(
+				conn,
+				Format=self._ExportFormat,
+				Compress=self._ExportCompress,
+				InlineSvg=self._ExportInlineSvg
+			)
+			return Exporter.Export() is not None
+		except ValueError as e:
+			print(f"Export failed: {str(e)}")
+			return False
+		finally:
+			conn.close()
+
+	async def _StoreRequests(self) -> bool:
+		"""
+		Run the crawl with the extraction processes alongside.
+		"""
+		self._ExtractedCounter = 0
+		self._NoLogoCounter = 0
+		with ProcessPoolExecutor(max_workers=self._Workers, initializer=fetcher._InitWorker, initargs=(self._RulesPath, False)) as self._Pool:
+			# start the processes now, before the crawl starts its writer and resolver threads
+			self._Pool.submit(int).result()
+			return await super()._StoreRequests()
+
+	async def _StoreResult(self, Writer: writer.ResultWriter, domain: str, StatusCode: int, HtmlContent: str = None,
+						RobotsTxt: int = None, FinalUrl: str = None, ErrorType: str = None, Validators=None) -> None:
+		"""
+		Pages are extracted in the pool and written together with their logo. Failures are stored as by `Crawler`.
+
+		:Parameter: Writer - writer stage where the result is queued
+
+		:Parameter: domain - crawled domain
+
+		:Parameter: StatusCode - HTTP status, 0 for network errors or -1 for unresolvable hosts
+
+		:Returns: None
+		"""
+		if HtmlContent is None:
+			return await super()._StoreResult(Writer, domain, StatusCode, HtmlContent, RobotsTxt, FinalUrl, ErrorType, Validators)
+
+		# the crawl worker waits for its page, so the pool can never fall more than `_Concurrency` pages behind
+		Domain, HtmlHash, Blob, Payload, Picked, Error, Seconds = await asyncio.get_running_loop().run_in_executor(
+			self._Pool, fetcher._ExtractPage, (domain, FinalUrl, HtmlContent, self._StoreHtml)
+		)
+		metrics.ExtractionSeconds.Observe(Seconds)
+		if Error is not None:
+			metrics.Extractions.Inc(result='error')
+			print(f"🔴 {domain}: Extraction failed ({Error})")
+			# the row is still written, a later `fetch` run can extract it if the page was stored
+			Picked = (None, None, None, None, None)
+			if self._StoreHtml:
+				HtmlHash, Size, Body = htmlstore.Pack(HtmlContent)
+				Blob = (Size, Body)
+
+		# without the page a later 304 would leave nothing to extract from, so the validators are only kept with it
+		ETag, LastModified = Validators if Validators and Blob is not None else (None, None)
+		Favicon, LogoUrl, Method, Confidence, Asset = Picked
+		if Blob is not None:
+			await Writer.SubmitAsync('''
+				INSERT OR IGNORE INTO html_blobs (hash, codec, size, body) VALUES (?, ?, ?, ?)
+			''', (HtmlHash, htmlstore.Codec, *Blob))
+		if Payload is not None:
+			await Writer.SubmitAsync('''
+				INSERT OR IGNORE INTO candidates (html_hash, extractor_version, payload) VALUES (?, ?, ?)
+			''', (HtmlHash, candidatestore.ExtractorVersion, Payload))
+		if Asset is not None:
+			await Writer.SubmitAsync('INSERT OR IGNORE INTO svg_assets (hash, size, svg) VALUES (?, ?, ?)', Asset)
+		await Writer.SubmitAsync('''
+			INSERT OR REPLACE INTO domains (
+				domain, robots_txt, fetch_status, final_url, error_type, etag, last_modified, html_hash,
+				favicon_url, logo_url, extraction_method, confidence_score, extracted_at, extractor_version
+			) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CASE WHEN ? THEN CURRENT_TIMESTAMP END, ?)
+		''', (
+			domain, RobotsTxt, StatusCode, FinalUrl, ErrorType, ETag, LastModified, HtmlHash,
+			Favicon, LogoUrl, Method, Confidence, Error is None, candidatestore.ExtractorVersion if Error is None else None
+		))
+		if LogoUrl is not None:
+			self._ExtractedCounter += 1
+			metrics.Extractions.Inc(result='logo')
+		else:
+			self._NoLogoCounter += 1
+			if Error is None:
+				metrics.Extractions.Inc(result='no_logo')
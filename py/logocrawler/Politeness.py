@@ -0,0 +1,314 @@
+import time
+import heapq
+import socket
+import asyncio
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+"""
+Request pacing for the crawler. Every host and every IP address has a token bucket, so neither a single site
+nor a shared hosting server behind many domains gets more than its share of requests. A host that asks for a
+`Crawl-delay` in robots.txt gets exactly that rate, and a host that answers 429 or 503 is left alone for a
+while, longer after every such answer. Pending domains sit in a heap ordered by the time they may be crawled,
+so while one host cools down the workers keep going with the others.
+"""
+
+class TokenBucket:
+	__slots__ = ('Rate', 'Capacity', 'Tokens', 'Updated')
+
+	def __init__(self, Rate: float, Capacity: float):
+		"""
+		:Parameter: Rate tokens added per second.
+
+		:Parameter: Capacity maximum amount of tokens, the size of a burst.
+		"""
+		self.Rate: float = Rate
+		self.Capacity: float = Capacity
+		self.Tokens: float = Capacity
+		self.Updated: float = time.monotonic()
+
+	def Delay(self, Now: float) -> float:
+		"""
+		:Returns: seconds until a token is available, 0.0 if there is one right now.
+		"""
+		self.Tokens = min(self.Capacity, self.Tokens + (Now - self.Updated) * self.Rate)
+		self.Updated = Now
+		return 0.0 if self.Tokens >= 1 else (1 - self.Tokens) / self.Rate
+
+	def Take(self) -> None:
+		"""
+		Use up a token. Call right after `Delay` returned 0.0.
+		"""
+		self.Tokens -= 1
+
+class _Host:
+	__slots__ = ('Bucket', 'BackoffUntil', 'Failures', 'Status')
+
+	def __init__(self, Bucket: TokenBucket):
+		self.Bucket: TokenBucket = Bucket
+		self.BackoffUntil: float = 0.0
+		self.Failures: int = 0
+		# 429 or 503, whatever put the host into backoff last
+		self.Status: Optional[int] = None
+
+class PolitenessScheduler:
+	def __init__(self, HostRate: float = 1.0, HostBurst: float = 5, IpRate: float = 10.0, IpBurst: float = 20,
+				BaseBackoff: float = 2.0, MaxBackoff: float = 300.0, MaxCrawlDelay: float = 30.0, MaxPending: int = 100,
+				Resolve: Optional[Callable[[str], Awaitable[Tuple[str, ...]]]] = None, DnsTtl: float = 300.0):
+		"""
+		Scheduler shared by the crawl workers. Domains go in through `Put` and come out of `Get` once their host
+		may be contacted, and every single request waits in `Acquire` for a token of its host and of its IPs.
+
+		:Parameter: HostRate requests per second to the same host.
+
+		:Parameter: HostBurst requests a host can get at once, enough for robots.txt and the four URL variants.
+
+		:Parameter: IpRate requests per second to the same IP address, over all hosts behind it.
+
+		:Parameter: IpBurst requests an IP address can get at once.
+
+		:Parameter: BaseBackoff seconds a host is left alone after its first 429/503, doubled after every further one.
+
+		:Parameter: MaxBackoff upper limit of the backoff, `Retry-After` included.
+
+		:Parameter: MaxCrawlDelay `Crawl-delay` values above this are capped.
+
+		:Parameter: MaxPending domains `Put` accepts before it waits for the workers to catch up.
+
+		:Parameter: Resolve coroutine returning the IP addresses of a host. Defaults to `getaddrinfo` with a cache.
+
+		:Parameter: DnsTtl seconds the default resolver keeps its answers.
+		"""
+		self._HostRate: float = HostRate
+		self._HostBurst: float = HostBurst
+		self._IpRate: float = IpRate
+		self._IpBurst: float = IpBurst
+		self._BaseBackoff: float = BaseBackoff
+		self._MaxBackoff: float = MaxBackoff
+		self._MaxCrawlDelay: float = MaxCrawlDelay
+		self._MaxPending: int = max(1, MaxPending)
+		self._Resolve = Resolve or self._GetAddrInfo
+		self._DnsTtl: float = DnsTtl
+		self._Hosts: Dict[str, _Host] = {}
+		self._Ips: Dict[str, TokenBucket] = {}
+		self._HostIps: Dict[str, Tuple[Tuple[str, ...], float]] = {}
+		# (ready at, sequence, item, host, attempt); the sequence keeps the order of items ready at the same time
+		self._Heap: List[Tuple[float, int, Any, str, int]] = []
+		self._Sequence: int = 0
+		self._InFlight: int = 0
+		self._Finished: bool = False
+		self._Changed: asyncio.Condition = asyncio.Condition()
+		self.Throttled: int = 0
+
+	async def Put(self, Item: Any, Host: str) -> None:
+		"""
+		Queue a new domain. Waits while `MaxPending` domains are already waiting.
+
+		:Parameter: Item whatever the workers need to crawl the domain.
+
+		:Parameter: Host hostname the domain is crawled on.
+		"""
+		async with self._Changed:
+			await self._Changed.wait_for(lambda: len(self._Heap) < self._MaxPending)
+			self._Push(time.monotonic(), Item, _HostOf(Host), 0)
+			self._Changed.notify_all()
+
+	def Retry(self, Item: Any, Host: str, Attempt: int) -> None:
+		"""
+		Queue a domain again after its host asked us to slow down. It comes out of `Get` once the backoff of
+		the host is over. Must be called before `TaskDone` of the same item, which wakes up the waiting workers.
+
+		:Parameter: Attempt how many times the domain was tried already.
+		"""
+		Host = _HostOf(Host)
+		State = self._HostState(Host)
+		self._Push(max(time.monotonic(), State.BackoffUntil), Item, Host, Attempt)
+
+	async def Finish(self) -> None:
+		"""
+		Tell the scheduler no more domains are coming. `Get` returns None once everything was handed out and done.
+		"""
+		async with self._Changed:
+			self._Finished = True
+			self._Changed.notify_all()
+
+	async def Get(self) -> Optional[Tuple[Any, int]]:
+		"""
+		Wait for a domain whose host may be contacted now. Domains of hosts that are backing off or out of
+		tokens go back into the heap with the time they become ready, and the next domain is tried instead.
+
+		:Returns: `(item, attempt)`, or None when the scheduler is finished and nothing is left.
+		"""
+		async with self._Changed:
+			while True:
+				Now = time.monotonic()
+				while self._Heap and self._Heap[0][0] <= Now:
+					ReadyAt, _, Item, Host, Attempt = heapq.heappop(self._Heap)
+					Delay = self._Delay(Host, Now)
+					if Delay > 0:
+						self._Push(Now + Delay, Item, Host, Attempt)
+						continue
+					self._InFlight += 1
+					self._Changed.notify_all()
+					return Item, Attempt
+				if not self._Heap and self._Finished and self._InFlight == 0:
+					return None
+				Timeout = self._Heap[0][0] - Now if self._Heap else None
+				try:
+					await asyncio.wait_for(self._Changed.wait(), Timeout)
+				except asyncio.TimeoutError:
+					pass
+
+	def Pending(self) -> int:
+		"""
+		:Returns: domains waiting in the scheduler, for the metrics.
+		"""
+		return len(self._Heap)
+
+	async def TaskDone(self) -> None:
+		"""
+		Mark a domain returned by `Get` as done.
+		"""
+		async with self._Changed:
+			self._InFlight -= 1
+			self._Changed.notify_all()
+
+	async def Acquire(self, Url: str) -> Optional[int]:
+		"""
+		Wait until a request to the URL may be sent and take the tokens for it. A host in backoff is not waited
+		for, the worker is better off giving the domain back and crawling another one in the meantime.
+
+		:Parameter: Url the URL about to be requested.
+
+		:Returns: None if the request may be sent, or the status (429/503) the host is backing off for.
+		"""
+		Hostname = (urlparse(Url).hostname or '').lower()
+		Ips = await self._IpsOf(Hostname)
+		State = self._HostState(_HostOf(Url))
+		while True:
+			Now = time.monotonic()
+			if State.BackoffUntil > Now:
+				return State.Status
+			Delay = max(State.Bucket.Delay(Now), *(self._IpBucket(Ip).Delay(Now) for Ip in Ips))
+			if Delay <= 0:
+				break
+			await asyncio.sleep(Delay)
+		State.Bucket.Take()
+		# the connector may use any of the addresses, so every one of them pays for the request
+		for Ip in Ips:
+			self._IpBucket(Ip).Take()
+		return None
+
+	def SetCrawlDelay(self, Host: str, Delay: Optional[float]) -> None:
+		"""
+		Pace the host at one request per `Delay` seconds, as asked for by its robots.txt.
+
+		:Parameter: Host hostname the robots.txt belongs to.
+
+		:Parameter: Delay Crawl-delay in seconds, None or 0 to keep the default rate.
+		"""
+		if not Delay or Delay <= 0:
+			return
+		State = self._HostState(_HostOf(Host))
+		Rate = 1.0 / min(Delay, self._MaxCrawlDelay)
+		if Rate < State.Bucket.Rate:
+			State.Bucket.Rate = Rate
+			State.Bucket.Capacity = 1
+			State.Bucket.Tokens = min(State.Bucket.Tokens, 1)
+
+	def Report(self, Url: str, Status: int, RetryAfter: Optional[str] = None) -> None:
+		"""
+		Feed back the status of a response. 429 and 503 put the host into backoff for `Retry-After` seconds or
+		for the exponential backoff, whatever is longer, up to `MaxBackoff`. Any other answer resets the backoff.
+
+		:Parameter: Url URL that was requested.
+
+		:Parameter: Status HTTP status of the response.
+
+		:Parameter: RetryAfter value of the `Retry-After` header, if any.
+		"""
+		State = self._HostState(_HostOf(Url))
+		if Status not in (429, 503):
+			State.Failures = 0
+			return
+		Backoff = min(self._MaxBackoff, self._BaseBackoff * 2 ** State.Failures)
+		Backoff = min(self._MaxBackoff, max(Backoff, _ParseRetryAfter(RetryAfter)))
+		State.Failures += 1
+		State.Status = Status
+		State.BackoffUntil = max(State.BackoffUntil, time.monotonic() + Backoff)
+		self.Throttled += 1
+
+	def _Push(self, ReadyAt: float, Item: Any, Host: str, Attempt: int) -> None:
+		self._Sequence += 1
+		heapq.heappush(self._Heap, (ReadyAt, self._Sequence, Item, Host, Attempt))
+
+	def _HostState(self, Host: str) -> _Host:
+		State = self._Hosts.get(Host)
+		if State is None:
+			State = self._Hosts[Host] = _Host(TokenBucket(self._HostRate, self._HostBurst))
+		return State
+
+	def _IpBucket(self, Ip: str) -> TokenBucket:
+		Bucket = self._Ips.get(Ip)
+		if Bucket is None:
+			Bucket = self._Ips[Ip] = TokenBucket(self._IpRate, self._IpBurst)
+		return Bucket
+
+	def _Delay(self, Host: str, Now: float) -> float:
+		"""
+		Seconds until a domain of the host may be started, looking at the host and at the IPs resolved so far.
+		"""
+		State = self._HostState(Host)
+		Delays = [State.BackoffUntil - Now, State.Bucket.Delay(Now)]
+		Known = self._HostIps.get(Host)
+		if Known is not None:
+			Delays.extend(self._IpBucket(Ip).Delay(Now) for Ip in Known[0])
+		return max(Delays)
+
+	async def _IpsOf(self, Host: str) -> Tuple[str, ...]:
+		Known = self._HostIps.get(Host)
+		if Known is not None and Known[1] > time.monotonic():
+			return Known[0]
+		Ips = await self._Resolve(Host)
+		self._HostIps[Host] = (Ips, time.monotonic() + self._DnsTtl)
+		return Ips
+
+	async def _GetAddrInfo(self, Host: str) -> Tuple[str, ...]:
+		"""
+		Default resolver. Hosts that do not resolve have no IPs and are only paced per host, the request
+		itself will fail on them anyway.
+		"""
+		try:
+			Infos = await asyncio.get_running_loop().getaddrinfo(Host, 443, type=socket.SOCK_STREAM)
+		except (socket.gaierror, UnicodeError, OSError):
+			return ()
+		return tuple(sorted({Info[4][0] for Info in Infos}))
+
+def _HostOf(Url: str) -> str:
+	"""
+	Key of the host state. `www.` is dropped, so the four URL variants of a domain share their tokens,
+	their backoff and the Crawl-delay of the domain.
+
+	:Parameter: Url a URL, or a bare hostname.
+
+	:Returns: hostname without `www.`.
+	"""
+	Host = (urlparse(Url if '://' in Url else '//' + Url).hostname or '').lower()
+	return Host[4:] if Host.startswith('www.') else Host
+
+def _ParseRetryAfter(Value: Optional[str]) -> float:
+	"""
+	:Parameter: Value `Retry-After` header, either seconds or an HTTP date.
+
+	:Returns: seconds to wait, 0.0 if the header is missing or invalid.
+	"""
+	if not Value:
+		return 0.0
+	Value = Value.strip()
+	if Value.isdigit():
+		return float(Value)
+	try:
+		return max(0.0, parsedate_to_datetime(Value).timestamp() - time.time())
+	except (TypeError, ValueError, IndexError, OverflowError):
+		return 0.0
@@ -0,0 +1,258 @@
+import json
+import time
+import socket
+import sqlite3
+import asyncio
+from collections import OrderedDict
+from aiohttp.abc import AbstractResolver
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from typing import Dict, List, Optional, Tuple
+import Writer as writer
+import Metrics as metrics
+
+"""
+DNS stage of the crawler. Every domain is resolved, apex and `www.` at the same time, before it is handed to
+the fetch workers, so domains that do not exist are written off without ever taking a fetch slot. Answers are
+kept in the `dns_cache` table, found and not found alike, so later runs do not ask again while they are fresh.
+The fetch connection uses the same cache through `CachedResolver`.
+
+`getaddrinfo` does not tell the TTL of the records, so answers are kept for a fixed time instead.
+"""
+
+Address = Tuple[int, str]
+
+# getaddrinfo errors that mean the name does not exist (NXDOMAIN) or has no addresses. Anything else, like
+# EAI_AGAIN, is a temporary failure and is not cached
+_NotFoundErrors = {socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)}
+
+def InitTable(conn: sqlite3.Connection) -> None:
+	"""
+	Create the `dns_cache` table if it does not exist yet.
+
+	:Parameter: conn open connection to the database.
+	"""
+	conn.execute('''
+		CREATE TABLE IF NOT EXISTS dns_cache (
+			host TEXT PRIMARY KEY,
+			addresses TEXT,
+			resolved_at REAL,
+			expires_at REAL
+		)
+	''')
+
+class DnsCache:
+	def __init__(self, DbPath: str, Writer: Optional[writer.ResultWriter] = None, PositiveTtl: float = 3600.0,
+				NegativeTtl: float = 3600.0, Concurrency: int = 64, Timeout: float = 10.0, MaxEntries: int = 100000):
+		"""
+		Cache of resolved hostnames in front of `getaddrinfo`: an in-memory LRU in front of the `dns_cache` table.
+		A host that is not in memory is looked up in the table from a background thread, new answers are queued
+		on `Writer`, so memory stays bounded however many hosts earlier runs resolved.
+
+		:Parameter: DbPath path to the SQLite database.
+
+		:Parameter: Writer writer stage the new answers are queued on, None to keep them in memory only.
+
+		:Parameter: PositiveTtl seconds the addresses of a host are kept.
+
+		:Parameter: NegativeTtl seconds a host that does not exist is remembered.
+
+		:Parameter: Concurrency lookups running at the same time. `getaddrinfo` blocks, so this is the size of
+		the thread pool it runs in.
+
+		:Parameter: Timeout seconds a lookup may take before it counts as a temporary failure.
+
+		:Parameter: MaxEntries how many hosts are kept in memory.
+		"""
+		self._Writer: Optional[writer.ResultWriter] = Writer
+		self._PositiveTtl: float = PositiveTtl
+		self._NegativeTtl: float = NegativeTtl
+		self._Timeout: float = Timeout
+		self._MaxEntries: int = MaxEntries
+		self._Executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max(1, Concurrency), thread_name_prefix='Resolver')
+		# host -> (addresses, expires_at); an empty tuple is a cached "does not exist"
+		self._Entries: OrderedDict = OrderedDict()
+		# lookups in progress, so a host asked for by several workers is only resolved once
+		self._InFlight: Dict[str, asyncio.Future] = {}
+		self.Lookups: int = 0
+		self.Hits: int = 0
+		conn: sqlite3.Connection = sqlite3.connect(DbPath)
+		try:
+			InitTable(conn)
+			conn.commit()
+		finally:
+			conn.close()
+		self._Reader: writer.BackgroundReader = writer.BackgroundReader(DbPath)
+
+	async def Lookup(self, Host: str) -> Optional[Tuple[Address, ...]]:
+		"""
+		:Parameter: Host hostname to resolve.
+
+		:Returns: `(family, ip)` tuples of the host, an empty tuple if it does not exist, or None if the lookup
+		failed for another reason (timeout, no network).
+		"""
+		Family = _AddressFamily(Host)
+		if Family is not None:
+			return ((Family, Host),)
+		Entry = self._Entries.get(Host)
+		if Entry is not None:
+			if Entry[1] > time.time():
+				self._Entries.move_to_end(Host)
+				self.Hits += 1
+				metrics.DnsCacheHits.Inc()
+				return Entry[0]
+			del self._Entries[Host]
+		Pending = self._InFlight.get(Host)
+		if Pending is not None:
+			# asyncio.wait does not pass on the cancellation of the lookup it waits for
+			await asyncio.wait({Pending})
+			return None if Pending.cancelled() else Pending.result()
+		Pending = self._InFlight[Host] = asyncio.get_running_loop().create_future()
+		try:
+			Result = await self._Load(Host)
+			if Result is not None:
+				self.Hits += 1
+				metrics.DnsCacheHits.Inc()
+			else:
+				Result = await self._Resolve(Host)
+		except BaseException:
+			Pending.cancel()
+			raise
+		finally:
+			del self._InFlight[Host]
+		Pending.set_result(Result)
+		return Result
+
+	async def Addresses(self, Host: str) -> Tuple[str, ...]:
+		"""
+		:Parameter: Host hostname to resolve.
+
+		:Returns: IP addresses of the host, empty if it does not resolve. Used by `PolitenessScheduler`.
+		"""
+		return tuple(sorted({Ip for _, Ip in await self.Lookup(Host) or ()}))
+
+	async def DomainExists(self, Domain: str) -> Optional[bool]:
+		"""
+		Resolve the apex and the `www.` name of a domain at the same time.
+
+		:Parameter: Domain domain as given to the crawler, a port is ignored.
+
+		:Returns: True if either name resolves, False if neither exists, None if that could not be told.
+		"""
+		Host = (urlparse('//' + Domain).hostname or '').lower()
+		if not Host or _AddressFamily(Host) is not None:
+			return True
+		Results = await asyncio.gather(self.Lookup(Host), self.Lookup('www.' + Host))
+		if any(Result for Result in Results):
+			return True
+		if all(Result is not None for Result in Results):
+			return False
+		return None
+
+	def Close(self) -> None:
+		"""
+		Stop the lookup threads and close the table.
+		"""
+		self._Executor.shutdown(wait=False, cancel_futures=True)
+		self._Reader.Close()
+
+	async def _Load(self, Host: str) -> Optional[Tuple[Address, ...]]:
+		"""
+		Look a host up in the `dns_cache` table and remember the answer if it is still fresh.
+
+		:Returns: the cached answer, or None if the table has no fresh one or could not be read.
+		"""
+		try:
+			Rows = await self._Reader.Fetch(
+				'SELECT addresses, expires_at FROM dns_cache WHERE host = ? AND expires_at > ?', (Host, time.time())
+			)
+		except sqlite3.Error:
+			return None
+		if not Rows:
+			return None
+		Addresses = tuple((Family, Ip) for Family, Ip in json.loads(Rows[0][0]))
+		self._Remember(Host, Addresses, Rows[0][1])
+		return Addresses
+
+	def _Remember(self, Host: str, Addresses: Tuple[Address, ...], ExpiresAt: float) -> None:
+		"""
+		Insert into the in-memory LRU and evict the least recently used hosts above `MaxEntries`.
+		"""
+		self._Entries[Host] = (Addresses, ExpiresAt)
+		self._Entries.move_to_end(Host)
+		while len(self._Entries) > self._MaxEntries:
+			self._Entries.popitem(last=False)
+
+	async def _Resolve(self, Host: str) -> Optional[Tuple[Address, ...]]:
+		"""
+		Ask `getaddrinfo` and remember the answer, unless it was a temporary failure.
+		"""
+		self.Lookups += 1
+		Loop = asyncio.get_running_loop()
+		try:
+			Infos = await asyncio.wait_for(
+				Loop.run_in_executor(self._Executor, socket.getaddrinfo, Host, 443, 0, socket.SOCK_STREAM),
+				self._Timeout
+			)
+		except socket.gaierror as e:
+			if e.errno not in _NotFoundErrors:
+				metrics.DnsLookups.Inc(result='failed')
+				return None
+			Addresses, Ttl = (), self._NegativeTtl
+			metrics.DnsLookups.Inc(result='not_found')
+		except (asyncio.TimeoutError, UnicodeError, OSError):
+			metrics.DnsLookups.Inc(result='failed')
+			return None
+		else:
+			Addresses = tuple(dict.fromkeys((int(Family), Info[0]) for Family, _, _, _, Info in Infos))
+			Ttl = self._PositiveTtl
+			metrics.DnsLookups.Inc(result='resolved')
+		Now = time.time()
+		self._Remember(Host, Addresses, Now + Ttl)
+		if self._Writer is not None:
+			await self._Writer.SubmitAsync('''
+				INSERT OR REPLACE INTO dns_cache (host, addresses, resolved_at, expires_at) VALUES (?, ?, ?, ?)
+			''', (Host, json.dumps(Addresses), Now, Now + Ttl))
+		return Addresses
+
+class CachedResolver(AbstractResolver):
+	def __init__(self, Cache: DnsCache):
+		"""
+		aiohttp resolver on top of a `DnsCache`, so the connections use the answers of the DNS stage instead
+		of asking again.
+
+		:Parameter: Cache cache filled by the DNS stage.
+		"""
+		self._Cache: DnsCache = Cache
+
+	async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> List[dict]:
+		Addresses = await self._Cache.Lookup(host)
+		Results = [
+			{
+				'hostname': host, 'host': Ip, 'port': port, 'family': Family, 'proto': 0,
+				'flags': socket.AI_NUMERICHOST | socket.AI_NUMERICSERV
+			}
+			for Family, Ip in Addresses or ()
+			if not family or Family == family
+		]
+		if Addresses is None:
+			raise OSError(f'DNS lookup of {host} failed')
+		if not Results:
+			# aiohttp turns this into a ClientConnectorError, with the message the crawler looks for
+			raise OSError('No address associated with hostname')
+		return Results
+
+	async def close(self) -> None:
+		pass
+
+def _AddressFamily(Host: str) -> Optional[int]:
+	"""
+	:Returns: address family if the host is an IPv4 or IPv6 address rather than a name, None otherwise.
+	"""
+	for Family in (socket.AF_INET, socket.AF_INET6):
+		try:
+			socket.inet_pton(Family, Host)
+			return int(Family)
+		except OSError:
+			continue
+	return None
@@ -0,0 +1,255 @@
+import re
+import json
+import time
+import sqlite3
+from collections import OrderedDict
+from typing import Optional, Tuple, List
+import Writer as writer
+
+class RobotsRules:
+	def __init__(self, Groups: Optional[List[dict]] = None):
+		"""
+		Parsed robots.txt of a single host. Every group is a dictionary with the user-agent tokens it
+		applies to (`agents`), its Allow/Disallow rules as `(allowed, path)` pairs (`rules`) and the
+		Crawl-delay if one was given (`delay`).
+
+		:Parameter: Groups list of groups as produced by `Parse`. No groups means everything is allowed.
+		"""
+		self._Groups: List[dict] = Groups or []
+
+	@classmethod
+	def Parse(cls, Text: str) -> 'RobotsRules':
+		"""
+		Parse the content of a robots.txt file into user-agent groups. Consecutive `User-agent` lines
+		share the rules that follow them, unknown fields are ignored.
+
+		:Parameter: Text the raw robots.txt content.
+
+		:Returns: RobotsRules instance.
+		"""
+		Groups: List[dict] = []
+		Current: Optional[dict] = None
+		# a new User-agent line after rules starts a new group, otherwise it joins the current one
+		ReadingAgents: bool = False
+
+		for Line in Text.splitlines():
+			Line = Line.split('#', 1)[0].strip()
+			if ':' not in Line:
+				continue
+			Field, Value = Line.split(':', 1)
+			Field = Field.strip().lower()
+			Value = Value.strip()
+
+			if Field == 'user-agent':
+				if not ReadingAgents:
+					Current = {'agents': [], 'rules': [], 'delay': None}
+					Groups.append(Current)
+					ReadingAgents = True
+				Current['agents'].append(Value.lower())
+				continue
+
+			ReadingAgents = False
+			if Current is None:
+				# rules before any User-agent line do not belong to anybody
+				continue
+			if Field in ('allow', 'disallow'):
+				# an empty Disallow means "allow everything", so it adds no rule
+				if Value:
+					Current['rules'].append((Field == 'allow', Value))
+			elif Field == 'crawl-delay':
+				try:
+					Current['delay'] = float(Value)
+				except ValueError:
+					pass
+
+		return cls(Groups)
+
+	def _GroupFor(self, Agent: str) -> Optional[dict]:
+		"""
+		Find the group that applies to our user agent. The most specific (longest) matching token wins
+		and groups naming the same token are merged, `*` is only used when nothing else matched.
+
+		:Parameter: Agent product token of the crawler.
+
+		:Returns: merged group, or None if no group applies.
+		"""
+		Agent = Agent.lower()
+		Best: Optional[dict] = None
+		BestLength: int = -1
+		for Group in self._Groups:
+			for Token in Group['agents']:
+				Length = 0 if Token == '*' else len(Token)
+				if Token != '*' and Token not in Agent:
+					continue
+				if Length > BestLength:
+					Best = {'rules': list(Group['rules']), 'delay': Group['delay']}
+					BestLength = Length
+				elif Length == BestLength and Best is not None:
+					Best['rules'].extend(Group['rules'])
+					if Best['delay'] is None:
+						Best['delay'] = Group['delay']
+		return Best
+
+	def IsAllowed(self, Path: str, Agent: str) -> bool:
+		"""
+		Check whether `Agent` may fetch `Path`. The longest matching rule decides, and Allow wins a tie.
+
+		:Parameter: Path path (and query) of the URL to check, e.g. `/`.
+
+		:Parameter: Agent product token of the crawler.
+
+		:Returns: True if crawling is allowed, False otherwise.
+		"""
+		Group = self._GroupFor(Agent)
+		if Group is None:
+			return True
+
+		Winner: Tuple[int, bool] = (-1, True)
+		for Allowed, Pattern in Group['rules']:
+			if _PatternMatches(Pattern, Path):
+				Candidate = (len(Pattern), Allowed)
+				if Candidate > Winner:
+					Winner = Candidate
+		return Winner[1]
+
+	def CrawlDelay(self, Agent: str) -> Optional[float]:
+		"""
+		:Parameter: Agent product token of the crawler.
+
+		:Returns: Crawl-delay in seconds for our user agent, or None if the host did not ask for one.
+		"""
+		Group = self._GroupFor(Agent)
+		return Group['delay'] if Group is not None else None
+
+	def ToJson(self) -> str:
+		"""
+		:Returns: the parsed groups serialized as JSON, used to persist the rules.
+		"""
+		return json.dumps(self._Groups)
+
+	@classmethod
+	def FromJson(cls, Data: str) -> 'RobotsRules':
+		"""
+		:Parameter: Data JSON produced by `ToJson`.
+
+		:Returns: RobotsRules instance.
+		"""
+		Groups = json.loads(Data)
+		for Group in Groups:
+			Group['rules'] = [tuple(Rule) for Rule in Group['rules']]
+		return cls(Groups)
+
+_PatternCache: dict = {}
+
+def _PatternMatches(Pattern: str, Path: str) -> bool:
+	"""
+	robots.txt path matching: rules are prefixes, `*` matches any sequence of characters and a trailing
+	`$` anchors the end of the path.
+	"""
+	Compiled = _PatternCache.get(Pattern)
+	if Compiled is None:
+		Anchored = Pattern.endswith('$')
+		Body = Pattern[:-1] if Anchored else Pattern
+		Regex = '.*'.join(re.escape(Part) for Part in Body.split('*'))
+		Compiled = re.compile(Regex + ('$' if Anchored else ''))
+		if len(_PatternCache) < 4096:
+			_PatternCache[Pattern] = Compiled
+	return Compiled.match(Path) is not None
+
+class RobotsCache:
+	def __init__(self, DbPath: str, Writer: Optional[writer.ResultWriter] = None, MaxEntries: int = 10000, Ttl: float = 86400.0):
+		"""
+		Two level cache of parsed robots.txt rules per host: an in-memory LRU in front of the `robots`
+		table, so a recrawl of the same host within `Ttl` seconds does not need to fetch robots.txt again.
+		The table is read from a background thread and written through the writer stage, so the cache
+		never takes the database lock on the event loop.
+
+		:Parameter: DbPath path to the SQLite database where the rules are persisted.
+
+		:Parameter: Writer writer stage the new rules are queued on, None to keep them in memory only.
+
+		:Parameter: MaxEntries how many hosts are kept in memory.
+
+		:Parameter: Ttl seconds a cached robots.txt stays valid.
+		"""
+		self._Writer: Optional[writer.ResultWriter] = Writer
+		self._MaxEntries: int = MaxEntries
+		self._Ttl: float = Ttl
+		self._Memory: OrderedDict = OrderedDict()
+		conn: sqlite3.Connection = sqlite3.connect(DbPath)
+		try:
+			InitTable(conn)
+			conn.commit()
+		finally:
+			conn.close()
+		self._Reader: writer.BackgroundReader = writer.BackgroundReader(DbPath)
+
+	async def Get(self, Host: str) -> Optional[RobotsRules]:
+		"""
+		:Parameter: Host hostname the rules belong to.
+
+		:Returns: cached RobotsRules, or None if the host is unknown or its entry expired.
+		"""
+		Now = time.time()
+		Entry = self._Memory.get(Host)
+		if Entry is not None:
+			Rules, FetchedAt = Entry
+			if Now - FetchedAt < self._Ttl:
+				self._Memory.move_to_end(Host)
+				return Rules
+			del self._Memory[Host]
+
+		Rows = await self._Reader.Fetch(
+			'SELECT rules, fetched_at FROM robots WHERE host = ? AND fetched_at > ?',
+			(Host, Now - self._Ttl)
+		)
+		if not Rows:
+			return None
+		Rules = RobotsRules.FromJson(Rows[0][0])
+		self._Remember(Host, Rules, Rows[0][1])
+		return Rules
+
+	async def Put(self, Host: str, Rules: RobotsRules) -> None:
+		"""
+		Store freshly parsed rules. They are written to SQLite by the writer stage.
+
+		:Parameter: Host hostname the rules belong to.
+
+		:Parameter: Rules parsed robots.txt.
+		"""
+		Now = time.time()
+		self._Remember(Host, Rules, Now)
+		if self._Writer is not None:
+			await self._Writer.SubmitAsync(
+				'INSERT OR REPLACE INTO robots (host, rules, fetched_at) VALUES (?, ?, ?)',
+				(Host, Rules.ToJson(), Now)
+			)
+
+	def _Remember(self, Host: str, Rules: RobotsRules, FetchedAt: float) -> None:
+		"""
+		Insert into the in-memory LRU and evict the least recently used hosts above `MaxEntries`.
+		"""
+		self._Memory[Host] = (Rules, FetchedAt)
+		self._Memory.move_to_end(Host)
+		while len(self._Memory) > self._MaxEntries:
+			self._Memory.popitem(last=False)
+
+	def Close(self) -> None:
+		"""
+		Stop the reader thread. Pending rules are flushed by the writer.
+		"""
+		self._Reader.Close()
+
+def InitTable(conn: sqlite3.Connection) -> None:
+	"""
+	Create the `robots` table if it does not exist yet.
+
+	:Parameter: conn open connection to the database.
+	"""
+	conn.execute('''
+		CREATE TABLE IF NOT EXISTS robots (
+			host TEXT PRIMARY KEY,
+			rules TEXT,
+			fetched_at REAL
+		)
+	''')
@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import time
+import tomllib
+from typing import Dict, List, Optional, Tuple
+
+"""
+Logo scoring for the Fetcher. The indicators and their weights are data, not code: they are read from a
+TOML (or JSON) rules file, `ScoringRules.toml` next to this module by default, and compiled into a
+`LogoScorer` once. `ScoringRules` keeps an eye on the file and recompiles the scorer when it changes.
+"""
+
+DefaultRulesPath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ScoringRules.toml')
+
+def LoadRules(Path: str = DefaultRulesPath) -> Tuple[Dict[str, float], Dict[str, float]]:
+	"""
+	Read a rules file. It needs a `positive` and a `negative` table mapping each indicator to its weight.
+
+	:Parameter: Path path to a `.toml` or `.json` rules file.
+
+	:Returns: (PositiveIndicators, NegativeIndicators) in the order of the file.
+	"""
+	with open(Path, 'rb') as RulesFile:
+		if Path.endswith('.json'):
+			Data = json.load(RulesFile)
+		else:
+			Data = tomllib.load(RulesFile)
+
+	Tables = []
+	for Name in ('positive', 'negative'):
+		Table = Data.get(Name, {})
+		if not isinstance(Table, dict):
+			raise ValueError(f'{Path}: `{Name}` has to be a table of indicator = weight')
+		for Indicator, Weight in Table.items():
+			if isinstance(Weight, bool) or not isinstance(Weight, (int, float)):
+				raise ValueError(f'{Path}: weight of `{Indicator}` is not a number')
+			if Indicator != Indicator.lower():
+				raise ValueError(f'{Path}: indicator `{Indicator}` has to be lower case')
+		Tables.append({Indicator: float(Weight) for Indicator, Weight in Table.items()})
+	return Tables[0], Tables[1]
+
+class ScoringRules:
+	def __init__(self, Path: str = DefaultRulesPath, CheckInterval: float = 2.0):
+		"""
+		Compiled scorer for a rules file that is reloaded when the file changes. The modification time
+		is looked at no more than once every `CheckInterval` seconds, so asking for the scorer on every
+		candidate stays cheap. A file that fails to load (e.g. while it is half saved) keeps the
+		previous rules in place.
+
+		:Parameter: Path path to the rules file.
+
+		:Parameter: CheckInterval seconds between two looks at the modification time.
+		"""
+		self.Path: str = Path
+		self._CheckInterval: float = CheckInterval
+		self._NextCheck: float = 0.0
+		self._Mtime: float = os.stat(Path).st_mtime
+		self._Scorer: LogoScorer = LogoScorer(*LoadRules(Path))
+
+	def Scorer(self) -> 'LogoScorer':
+		"""
+		:Returns: the scorer of the current rules, recompiled first if the file changed.
+		"""
+		Now = time.monotonic()
+		if Now >= self._NextCheck:
+			self._NextCheck = Now + self._CheckInterval
+			self._Reload()
+		return self._Scorer
+
+	def _Reload(self) -> None:
+		"""
+		Recompile the scorer if the modification time of the rules file moved.
+		"""
+		try:
+			Mtime = os.stat(self.Path).st_mtime
+			if Mtime == self._Mtime:
+				return
+			# remembered before loading, so a broken file is only reported once per save
+			self._Mtime = Mtime
+			self._Scorer = LogoScorer(*LoadRules(self.Path))
+			print(f'🔁 Reloaded scoring rules from {self.Path}')
+		except (OSError, ValueError) as e:
+			print(f'Keeping previous scoring rules, could not load {self.Path}: {e}')
+
+class LogoScorer:
+	def __init__(self, Positive: Dict[str, float], Negative: Dict[str, float]):
+		"""
+		Indicator matcher compiled once from the weight tables. The old scoring rebuilt both tables for
+		every candidate and scanned the content and the context separately for each of the ~40 indicators.
+		Here the content and the context are lowered and scanned as one string, and indicators are grouped
+		behind "gates": a substring that all members of a group share (`logo` for `src="logo`, `-logo.`,
+		`class="logo`, ..., or `nav` for `navbar`). A group is only looked at when its gate occurs in the
+		candidate, which skips most of the scans for the typical candidate that has nothing to do with a logo.
+
+		:Parameter: Positive indicators that add their weight to the score.
+
+		:Parameter: Negative indicators that subtract their penalty from the score.
+		"""
+		# (order, indicator, signed weight): the order in the tables is kept so the floats are added up
+		# in exactly the same order as before and give the same score
+		Entries: List[Tuple[int, str, float]] = []
+		for Indicator, Weight in Positive.items():
+			Entries.append((len(Entries), Indicator, Weight))
+		for Indicator, Penalty in Negative.items():
+			Entries.append((len(Entries), Indicator, -Penalty))
+		self._Gates: Dict[str, List[Tuple[int, str, float]]] = {}
+		self._Ungated: List[Tuple[int, str, float]] = []
+		self._Compile(Entries)
+
+	def _Compile(self, Entries: List[Tuple[int, str, float]]) -> None:
+		"""
+		Assign every indicator to a gate. The gate of an indicator is another indicator contained in it,
+		otherwise the word it shares with the most other indicators. Indicators without a shared word
+		are checked on their own.
+
+		:Parameter: Entries `(order, indicator, signed weight)` of every indicator.
+		"""
+		Indicators = [Indicator for _, Indicator, _ in Entries]
+		Words: Dict[str, set] = {}
+		for Indicator in Indicators:
+			for Word in re.findall(r'[a-z]+', Indicator):
+				Words.setdefault(Word, set()).add(Indicator)
+
+		for Entry in Entries:
+			Indicator = Entry[1]
+			Gate: Optional[str] = None
+			Contained = [Other for Other in Indicators if Other != Indicator and Other in Indicator]
+			if Contained:
+				Gate = max(Contained, key=len)
+			else:
+				Shared = [Word for Word in set(re.findall(r'[a-z]+', Indicator))
+						  if len(Words[Word]) > 1 and Word != Indicator]
+				if Shared:
+					Gate = max(Shared, key=lambda Word: (len(Words[Word]), len(Word)))
+			if Gate is None:
+				self._Ungated.append(Entry)
+			else:
+				self._Gates.setdefault(Gate, []).append(Entry)
+
+	def Matches(self, Content: str, Context: str) -> List[Tuple[int, str, float]]:
+		"""
+		:Parameter: Content is a string that contains the content inside the tag.
+
+		:Parameter: Context is a string with the text around the tag.
+
+		:Returns: `(order, indicator, signed weight)` of every indicator found in the content or the context.
+		"""
+		# NUL never occurs in an indicator, so no match can span content and context
+		Text = f'{Content or ""}\0{Context or ""}'.lower()
+		Found = [Entry for Entry in self._Ungated if Entry[1] in Text]
+		for Gate, Members in self._Gates.items():
+			if Gate in Text:
+				Found.extend(Entry for Entry in Members if Entry[1] in Text)
+		return Found
+
+	def Score(self, Content: str, Context: str) -> float:
+		"""
+		Method to calculate the likelihood that the tag we got contains a logo. The scale
+		goes form zero (0) to one (1).
+
+		:Parameter: Content is a string that contains the content inside the tag.
+
+		:Parameter: Context is a string with the text around the tag.
+
+		:Returns: FinalScore is a float which dictates how fair the extract scored.
+		"""
+		Found = self.Matches(Content, Context)
+		if not Found:
+			return 0.0
+		Found.sort()
+		Score: float = 0.0
+		for _, _, Weight in Found:
+			Score += Weight
+
+		if not Score:
+			return 0.0
+
+		return max(0.0, min(1.0, Score))
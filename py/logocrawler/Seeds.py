@@ -0,0 +1,173 @@
+import re
+import csv
+import gzip
+import math
+import hashlib
+from urllib.parse import urlsplit
+from typing import Iterator, Optional, TextIO, Tuple
+
+"""
+Seed input of the crawler. The domain list is read lazily, one row at a time, so a list of millions of domains
+starts crawling right away and never has to fit in memory. Every entry is normalised to the bare host the crawler
+expects (`https://WWW.Example.com/about` becomes `example.com`) and repeated hosts are dropped.
+
+Repeated hosts are remembered in a Bloom filter by default: its size is fixed when the reader is created, whatever
+the length of the list, at the price of a small chance of dropping a host that was not seen before. The `exact`
+mode keeps every host in a set instead, which never drops one but grows with the list.
+"""
+
+_LabelPattern = re.compile(r'[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?')
+
+def NormaliseDomain(Raw: str) -> Optional[str]:
+	"""
+	:Parameter: Raw entry of the seed list, a domain or a URL.
+
+	:Returns: lowercase host without scheme, path, credentials and leading `www.`, internationalised names in their
+	ASCII (IDNA) form, and the port if one was given. None for blank lines, comments and entries that are not a host.
+	"""
+	Raw = Raw.strip()
+	if not Raw or Raw.startswith('#'):
+		return None
+	try:
+		Parts = urlsplit(Raw if '://' in Raw else '//' + Raw)
+		Host = Parts.hostname
+		Port = Parts.port
+	except ValueError:
+		return None
+	if not Host:
+		return None
+	if ':' in Host:
+		# IPv6 address, kept as it was written
+		Host = f'[{Host}]'
+	else:
+		Host = Host.rstrip('.')
+		if Host.startswith('www.') and '.' in Host[4:]:
+			Host = Host[4:]
+		if not Host.isascii():
+			try:
+				Host = Host.encode('idna').decode('ascii')
+			except UnicodeError:
+				return None
+		if len(Host) > 253 or not all(_LabelPattern.fullmatch(Label) for Label in Host.split('.')):
+			return None
+	return Host if Port is None else f'{Host}:{Port}'
+
+def ShardOf(Domain: str, Count: int) -> int:
+	"""
+	:Parameter: Domain normalised host, as returned by `NormaliseDomain`.
+
+	:Parameter: Count number of shards.
+
+	:Returns: shard of the domain, from 0 to `Count - 1`. The hash is stable across processes, machines and Python
+	versions, unlike `hash()`, so every node agrees on where a domain belongs.
+	"""
+	return int.from_bytes(hashlib.blake2b(Domain.encode('utf-8'), digest_size=8).digest(), 'little') % Count
+
+class BloomFilter:
+	def __init__(self, Capacity: int, ErrorRate: float = 1e-6):
+		"""
+		Set membership in a fixed number of bits. Hosts that were added are always found, hosts that were not are
+		wrongly found with a chance of about `ErrorRate` while fewer than `Capacity` hosts were added.
+
+		:Parameter: Capacity number of hosts the filter is sized for.
+
+		:Parameter: ErrorRate chance of a false positive at full capacity.
+		"""
+		Capacity = max(1, Capacity)
+		self._Size: int = max(64, math.ceil(-Capacity * math.log(ErrorRate) / math.log(2) ** 2))
+		self._Hashes: int = max(1, round(self._Size / Capacity * math.log(2)))
+		self._Bits: bytearray = bytearray((self._Size + 7) // 8)
+
+	def Add(self, Key: str) -> bool:
+		"""
+		:Parameter: Key host to add.
+
+		:Returns: True if the host was not in the filter yet.
+		"""
+		# the positions are derived from one 128 bit digest (Kirsch-Mitzenmacher), cheaper than k separate hashes
+		Digest = hashlib.blake2b(Key.encode('utf-8'), digest_size=16).digest()
+		First = int.from_bytes(Digest[:8], 'little')
+		Step = int.from_bytes(Digest[8:], 'little') | 1
+		New = False
+		for Index in range(self._Hashes):
+			Bit = (First + Index * Step) % self._Size
+			Mask = 1 << (Bit & 7)
+			if not self._Bits[Bit >> 3] & Mask:
+				self._Bits[Bit >> 3] |= Mask
+				New = True
+		return New
+
+	def Bytes(self) -> int:
+		"""
+		:Returns: memory taken by the bits.
+		"""
+		return len(self._Bits)
+
+class SeedReader:
+	def __init__(self, Path: str, Dedup: str = 'bloom', Capacity: int = 10_000_000, ErrorRate: float = 1e-6,
+				Shard: Optional[Tuple[int, int]] = None):
+		"""
+		Iterable over the normalised, unique hosts of a seed file. The file may be a CSV file, of which the first
+		column is read, or plain text with one domain per line, and either may be gzip compressed. Lines starting
+		with `#` are skipped.
+
+		:Parameter: Path path to the seed file.
+
+		:Parameter: Dedup `bloom` to remember the hosts in a `BloomFilter`, `exact` to keep them in a set.
+
+		:Parameter: Capacity number of distinct hosts the Bloom filter is sized for.
+
+		:Parameter: ErrorRate chance of the Bloom filter dropping a host it has not seen, at full capacity.
+
+		:Parameter: Shard `(index, count)` to only read the hosts of one shard, see `ShardOf`. None reads them all.
+		"""
+		if Dedup not in ('bloom', 'exact'):
+			raise ValueError(f'unknown dedup mode {Dedup!r}, expected bloom or exact')
+		self._Path: str = Path
+		self._Dedup: str = Dedup
+		self._Capacity: int = Capacity
+		self._ErrorRate: float = ErrorRate
+		self._Shard: Optional[Tuple[int, int]] = Shard
+		self.Rows: int = 0
+		self.Duplicates: int = 0
+		self.Invalid: int = 0
+
+	def __iter__(self) -> Iterator[str]:
+		self.Rows = 0
+		self.Duplicates = 0
+		self.Invalid = 0
+		if self._Dedup == 'bloom':
+			Seen = BloomFilter(self._Capacity, self._ErrorRate)
+			IsNew = Seen.Add
+		else:
+			Hosts = set()
+			def IsNew(Host: str) -> bool:
+				if Host in Hosts:
+					return False
+				Hosts.add(Host)
+				return True
+		with _OpenText(self._Path) as SeedFile:
+			for Row in csv.reader(SeedFile):
+				if not Row or Row[0].lstrip().startswith('#'):
+					continue
+				self.Rows += 1
+				Host = NormaliseDomain(Row[0])
+				if Host is None:
+					self.Invalid += 1
+				elif self._Shard is not None and ShardOf(Host, self._Shard[1]) != self._Shard[0]:
+					# belongs to another shard, which also takes care of its duplicates
+					continue
+				elif not IsNew(Host):
+					self.Duplicates += 1
+				else:
+					yield Host
+
+def _OpenText(Path: str) -> TextIO:
+	"""
+	Open a seed file as text, decompressing it on the fly when it starts with the gzip magic bytes.
+	"""
+	with open(Path, 'rb') as RawFile:
+		Magic = RawFile.read(2)
+	if Magic == b'\x1f\x8b':
+		return gzip.open(Path, 'rt', encoding='utf-8-sig', errors='replace', newline='')
+	return open(Path, 'r', encoding='utf-8-sig', errors='replace', newline='')
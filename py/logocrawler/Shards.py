@@ -0,0 +1,202 @@
+import os
+import re
+import glob
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import Crawler as crawler
+import Metrics as metrics
+
+"""
+Sharded crawl. The seed list is split by a stable hash of every domain (`Seeds.ShardOf`) into N shards, and each
+shard is crawled by its own `Crawler` into its own SQLite file, `logos.shard-<i>-of-<N>.db` next to the main
+database. Shards share nothing, neither the event loop nor the writer, so they can run as processes of one machine
+(`CrawlShards`) or on separate nodes that each read the same seed list. `Merge` then folds the shard files into
+the main database.
+"""
+
+# tables that only describe the shard database itself and are not merged
+_LocalTables = {'exports'}
+# tables whose rows are only replaced by a newer version: table -> (key column, timestamp column)
+_NewestWins = {
+	'domains': ('domain', 'fetch_timestamp'),
+	'robots': ('host', 'fetched_at'),
+	'dns_cache': ('host', 'resolved_at'),
+}
+_ShardPattern = re.compile(r'\.shard-(\d+)-of-(\d+)\.db$')
+
+def ShardPath(DbPath: str, Index: int, Count: int) -> str:
+	"""
+	:Parameter: DbPath main database, `logos.db` by default.
+
+	:Parameter: Index shard number, from 0 to `Count - 1`.
+
+	:Parameter: Count number of shards.
+
+	:Returns: path of the shard database, `logos.shard-<Index>-of-<Count>.db` for `logos.db`.
+	"""
+	Base, Extension = os.path.splitext(DbPath)
+	return f'{Base}.shard-{Index}-of-{Count}{Extension or ".db"}'
+
+def ParseShard(Value: str) -> Tuple[int, int]:
+	"""
+	:Parameter: Value shard given on the command line as `i/N`.
+
+	:Returns: `(index, count)`.
+	"""
+	Index, _, Count = Value.partition('/')
+	if not Index.isdigit() or not Count.isdigit() or not 0 <= int(Index) < int(Count):
+		raise ValueError(f'invalid shard {Value!r}, expected i/N with 0 <= i < N')
+	return int(Index), int(Count)
+
+def FindShards(DbPath: str, Count: Optional[int] = None) -> List[str]:
+	"""
+	Shard databases of one crawl found next to the main database. Files of an earlier crawl with another shard
+	count are left out, so stale shards can never be merged together with the current ones.
+
+	:Parameter: DbPath main database.
+
+	:Parameter: Count number of shards of the crawl. None picks the largest count of which every shard is there.
+
+	:Returns: shard databases in shard order, fewer than `Count` if some are missing.
+	"""
+	Base, Extension = os.path.splitext(DbPath)
+	Found: Dict[int, Dict[int, str]] = {}
+	for Path in glob.glob(f'{glob.escape(Base)}.shard-*-of-*{Extension or ".db"}'):
+		Match = _ShardPattern.search(Path)
+		if Match:
+			Found.setdefault(int(Match.group(2)), {})[int(Match.group(1))] = Path
+	if Count is None:
+		Complete = [Total for Total, Shards in Found.items() if len(Shards) == Total]
+		if not Complete:
+			return []
+		Count = max(Complete)
+	Shards = Found.get(Count, {})
+	return [Shards[Index] for Index in sorted(Shards)]
+
+def CrawlShards(SeedPath: str, Count: int, DbPath: str = 'logos.db', Settings: dict = None,
+				Reporter: metrics.Reporter = None) -> int:
+	"""
+	Crawl all shards of the seed list at the same time, one process per shard, and merge them into `DbPath`.
+
+	:Parameter: SeedPath seed file, see `Seeds.SeedReader`.
+
+	:Parameter: Count number of shards.
+
+	:Parameter: DbPath main database the shards are merged into.
+
+	:Parameter: Settings keyword arguments of `Crawler`, applied to every shard. Concurrency and rates are per shard.
+
+	:Parameter: Reporter metrics reporter of this process. Every shard process gets its own, see `Reporter.ForShard`.
+
+	:Returns: number of domain rows merged.
+	"""
+	Settings = dict(Settings or {})
+	# every shard only remembers its own part of the list
+	Settings['SeedCapacity'] = max(1, Settings.get('SeedCapacity', 10_000_000) // Count)
+	with ProcessPoolExecutor(max_workers=Count) as Pool:
+		Futures = [
+			Pool.submit(_CrawlShard, SeedPath, Index, Count, DbPath, Settings, Reporter.ForShard(Index) if Reporter else None)
+			for Index in range(Count)
+		]
+		Paths = [Future.result() for Future in Futures]
+	return Merge(DbPath, Paths)
+
+def Merge(DbPath: str, Paths: List[str]) -> int:
+	"""
+	Fold shard databases into the main one. Tables and columns the main database does not have yet are created from
+	the shard. Domains, robots.txt rules and DNS answers only replace a row of the main database when they are at
+	least as recent (`fetch_timestamp`, `fetched_at`, `resolved_at`), so the newest crawl of a domain wins whatever
+	order the shards are merged in. Rows of the other tables are copied with `INSERT OR REPLACE`. Merging the same
+	shard twice changes nothing. Every shard is merged in its own transaction.
+
+	:Parameter: DbPath main database, created if it does not exist.
+
+	:Parameter: Paths shard databases, see `FindShards`.
+
+	:Returns: number of domain rows merged.
+	"""
+	conn: sqlite3.Connection = sqlite3.connect(DbPath, isolation_level=None)
+	conn.execute('PRAGMA journal_mode=WAL')
+	Merged: int = 0
+	try:
+		for Path in Paths:
+			conn.execute('ATTACH DATABASE ? AS shard', (Path,))
+			try:
+				conn.execute('BEGIN')
+				Rows = _MergeShard(conn)
+				conn.execute('COMMIT')
+			except BaseException:
+				conn.execute('ROLLBACK')
+				raise
+			finally:
+				conn.execute('DETACH DATABASE shard')
+			Merged += Rows
+			print(f"🧩 {Path}: {Rows} domains merged")
+	finally:
+		conn.close()
+	print(f"\n🧩 Merged {len(Paths)} shards, {Merged} domains, into {DbPath}")
+	return Merged
+
+def _MergeShard(conn: sqlite3.Connection) -> int:
+	"""
+	Copy the tables of the attached `shard` database into `main`.
+
+	:Returns: number of domain rows copied.
+	"""
+	Schema = conn.execute('''
+		SELECT type, name, tbl_name, sql FROM shard.sqlite_master
+		WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+		ORDER BY type = 'index'
+	''').fetchall()
+	Existing = {row[0] for row in conn.execute('SELECT name FROM main.sqlite_master')}
+	DomainRows: int = 0
+	for Type, Name, Table, Sql in Schema:
+		if Table in _LocalTables:
+			continue
+		if Name not in Existing:
+			conn.execute(Sql)
+		if Type != 'table':
+			continue
+		ShardColumns = conn.execute(f'PRAGMA shard.table_info("{Name}")').fetchall()
+		MainColumns = {row[1] for row in conn.execute(f'PRAGMA main.table_info("{Name}")')}
+		for _, Column, ColumnType, _, _, _ in ShardColumns:
+			if Column not in MainColumns:
+				conn.execute(f'ALTER TABLE main."{Name}" ADD COLUMN "{Column}" {ColumnType}')
+		# INTEGER PRIMARY KEY columns are row ids, which every shard counts from 1, so the main database assigns its own
+		Copied = [
+			Column for _, Column, ColumnType, _, _, PrimaryKey in ShardColumns
+			if not (PrimaryKey and ColumnType.upper() == 'INTEGER')
+		]
+		Columns = ', '.join(f'"{Column}"' for Column in Copied)
+		if Name in _NewestWins:
+			Key, Timestamp = _NewestWins[Name]
+			Updates = ', '.join(f'"{Column}" = excluded."{Column}"' for Column in Copied if Column != Key)
+			# `WHERE true` keeps SQLite from reading ON CONFLICT as a join constraint of the SELECT
+			Cursor = conn.execute(f'''
+				INSERT INTO main."{Name}" ({Columns}) SELECT {Columns} FROM shard."{Name}" WHERE true
+				ON CONFLICT ("{Key}") DO UPDATE SET {Updates}
+				WHERE main."{Name}"."{Timestamp}" IS NULL OR excluded."{Timestamp}" >= main."{Name}"."{Timestamp}"
+			''')
+		else:
+			Cursor = conn.execute(f'INSERT OR REPLACE INTO main."{Name}" ({Columns}) SELECT {Columns} FROM shard."{Name}"')
+		if Name == 'domains':
+			DomainRows = Cursor.rowcount
+	return DomainRows
+
+def _CrawlShard(SeedPath: str, Index: int, Count: int, DbPath: str, Settings: dict, Reporting: tuple = None) -> str:
+	"""
+	Worker process of `CrawlShards`.
+
+	:Parameter: Reporting `(Port, SnapshotPath, Interval)` of the metrics reporter of the shard, None for none.
+
+	:Returns: path of the shard database.
+	"""
+	Path = ShardPath(DbPath, Index, Count)
+	Reporter = metrics.Reporter(*Reporting).Start() if Reporting else None
+	try:
+		crawler.Crawler(DbPath=Path, Shard=(Index, Count), **Settings).EntryPoint(SeedPath, 1)
+	finally:
+		if Reporter is not None:
+			Reporter.Close()
+	return Path
@@ -0,0 +1,118 @@
+import re
+import base64
+import hashlib
+import sqlite3
+from typing import Optional, Tuple
+
+"""
+Content-addressed storage for inline `<svg>` logos. The minified SVG is stored once in `svg_assets`, keyed by
+the SHA-256 of its text, and `domains.logo_url` holds a `svg-asset://<hash>` reference instead of a base64 data
+URL. Sites built on the same template share their icons, so the same SVG only takes space once, and the
+reference is a fraction of the size of the data URL. Exports turn references back into data URLs on demand.
+"""
+
+Scheme: str = 'svg-asset://'
+
+# regions whose whitespace can matter when rendering, and comments, which are dropped. Comments are matched here
+# too, so one inside a CDATA section or a <style> is left alone
+_KeptPattern = re.compile(
+	r'<!\[CDATA\[.*?\]\]>|<(text|style|script|foreignObject)\b[^>]*?(?<!/)>.*?</\1\s*>|<!--.*?-->',
+	re.DOTALL | re.IGNORECASE
+)
+_PreserveSpacePattern = re.compile(r'xml:space\s*=\s*["\']preserve["\']', re.IGNORECASE)
+_BetweenTagsPattern = re.compile(r'>\s+<')
+_WhitespacePattern = re.compile(r'\s+')
+
+def InitTable(conn: sqlite3.Connection) -> None:
+	"""
+	Create the `svg_assets` table if it does not exist yet.
+
+	:Parameter: conn open connection to the database.
+	"""
+	conn.execute('''
+		CREATE TABLE IF NOT EXISTS svg_assets (
+			hash TEXT PRIMARY KEY,
+			size INTEGER,
+			svg TEXT
+		)
+	''')
+
+def Minify(Svg: str) -> str:
+	"""
+	Drop comments and the whitespace between tags, and collapse every other run of whitespace in the markup into a
+	single space. The content of `<text>`, `<style>`, `<script>` and `<foreignObject>` elements and of CDATA
+	sections is kept as it is, since the space between two `<tspan>`s or inside a CSS string shows up in the image.
+	An SVG that asks for `xml:space="preserve"` anywhere is only trimmed.
+
+	:Parameter: Svg the `<svg>...</svg>` element.
+
+	:Returns: minified SVG.
+	"""
+	if _PreserveSpacePattern.search(Svg):
+		return Svg.strip()
+	Parts = []
+	Loose: str = ''
+	End: int = 0
+	for Match in _KeptPattern.finditer(Svg):
+		Loose += Svg[End:Match.start()]
+		End = Match.end()
+		if Match.group(0).startswith('<!--'):
+			continue
+		Parts.append(_Collapse(Loose, '>' if Parts else '', '<'))
+		Parts.append(Match.group(0))
+		Loose = ''
+	Parts.append(_Collapse(Loose + Svg[End:], '>' if Parts else '', ''))
+	return ''.join(Parts).strip()
+
+def _Collapse(Markup: str, Before: str, After: str) -> str:
+	"""
+	Whitespace handling of `Minify` for markup outside the kept regions.
+
+	:Parameter: Markup markup between two kept regions.
+
+	:Parameter: Before `>` if a kept region comes before, so the whitespace after it counts as between tags.
+
+	:Parameter: After `<` if a kept region follows.
+
+	:Returns: collapsed markup.
+	"""
+	Markup = _WhitespacePattern.sub(' ', _BetweenTagsPattern.sub('><', Before + Markup + After))
+	return Markup[len(Before):len(Markup) - len(After)]
+
+def Pack(Svg: str) -> Tuple[str, str]:
+	"""
+	:Parameter: Svg the `<svg>...</svg>` element as found in the page.
+
+	:Returns: `(hash, svg)` with the hex SHA-256 of the minified SVG and the minified SVG itself.
+	"""
+	Minified = Minify(Svg)
+	return hashlib.sha256(Minified.encode('utf-8', errors='surrogatepass')).hexdigest(), Minified
+
+def Reference(Hash: str) -> str:
+	"""
+	:Parameter: Hash hash returned by `Pack`.
+
+	:Returns: the `svg-asset://<hash>` reference stored in `logo_url`.
+	"""
+	return Scheme + Hash
+
+def HashOf(Url: Optional[str]) -> Optional[str]:
+	"""
+	:Parameter: Url a `logo_url` value.
+
+	:Returns: hash of the referenced asset, or None if the URL is not an asset reference.
+	"""
+	if Url is None or not Url.startswith(Scheme):
+		return None
+	return Url[len(Scheme):]
+
+def DataUrl(Svg: str) -> str:
+	"""
+	Convert SVG to browser-accessible data URL
+
+	:Parameter: Svg a string of the SVG.
+
+	:Returns: base64 logo URL
+	"""
+	SvgBase64 = base64.b64encode(Svg.encode('utf-8', errors='surrogatepass')).decode('ascii')
+	return f'data:image/svg+xml;base64,{SvgBase64}'
@@ -0,0 +1,290 @@
+import time
+import queue
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, List
+import Metrics as metrics
+
+class ResultWriter:
+	def __init__(self, DbPath: str, BatchSize: int = 500, FlushInterval: float = 1.0, MaxQueue: int = 10000):
+		"""
+		Dedicated writer stage for the crawl results. Statements are queued by the producers and a single
+		background thread flushes them with `executemany` in batches of `BatchSize` rows or every
+		`FlushInterval` seconds, whatever happens first. Every batch is its own transaction, so a crash only
+		loses the batch that was in the making. A locked database is retried with a growing pause, and a batch that
+		still fails is written row by row so only the rows that cannot be written are dropped. If the thread stops
+		on any other error, `Submit`, `SubmitAsync` and `Close` raise it in the producer.
+
+		:Parameter: DbPath path to the SQLite database.
+
+		:Parameter: BatchSize maximum amount of rows written per transaction.
+
+		:Parameter: FlushInterval maximum seconds a queued row waits before it is written.
+
+		:Parameter: MaxQueue how many rows can be waiting before `Submit` starts to block.
+		"""
+		self._DbPath: str = DbPath
+		self._BatchSize: int = max(1, BatchSize)
+		self._FlushInterval: float = FlushInterval
+		self._Queue: queue.Queue = queue.Queue(maxsize=MaxQueue)
+		self._Thread: Optional[threading.Thread] = None
+		self._Failure: Optional[BaseException] = None
+		# attempts at a statement while the database is locked, and the pause before the first retry
+		self._Retries: int = 5
+		self._RetryDelay: float = 0.05
+		self.Rows: int = 0
+		self.Batches: int = 0
+		self.Errors: int = 0
+		self._StartedAt: float = 0.0
+		self._StoppedAt: Optional[float] = None
+		self._LastReport: float = 0.0
+		# seconds between the progress lines printed by the writer thread
+		self._ReportInterval: float = 10.0
+
+	def Start(self) -> 'ResultWriter':
+		"""
+		Start the background thread. Returns the writer itself so it can be chained.
+		"""
+		self._StartedAt = time.monotonic()
+		self._LastReport = self._StartedAt
+		self._Thread = threading.Thread(target=self._Run, name='ResultWriter', daemon=True)
+		self._Thread.start()
+		return self
+
+	def Submit(self, Sql: str, Params: tuple) -> None:
+		"""
+		Queue a statement for writing. Blocks while the queue is full.
+
+		:Parameter: Sql statement to execute.
+
+		:Parameter: Params parameters of the statement.
+		"""
+		self._RaiseFailure()
+		self._Queue.put((Sql, Params))
+
+	async def SubmitAsync(self, Sql: str, Params: tuple) -> None:
+		"""
+		Same as `Submit`, but waits for room in the queue without blocking the event loop.
+		"""
+		self._RaiseFailure()
+		try:
+			self._Queue.put_nowait((Sql, Params))
+		except queue.Full:
+			await asyncio.to_thread(self._Queue.put, (Sql, Params))
+
+	def Close(self) -> None:
+		"""
+		Flush everything that is still queued, stop the thread and print the write statistics. Raises the error
+		the thread stopped on, if any.
+		"""
+		if self._Thread is None:
+			return
+		self._Queue.put(None)
+		self._Thread.join()
+		self._Thread = None
+		print(f"\n💾 Wrote {self.Rows} rows in {self.Batches} batches ({self.RowsPerSecond():.0f} rows/s)")
+		self._RaiseFailure()
+
+	def Pending(self) -> int:
+		"""
+		:Returns: rows waiting to be written.
+		"""
+		return self._Queue.qsize()
+
+	def RowsPerSecond(self) -> float:
+		"""
+		:Returns: average amount of rows written per second since the writer started.
+		"""
+		End = self._StoppedAt if self._StoppedAt is not None else time.monotonic()
+		Elapsed = End - self._StartedAt
+		return self.Rows / Elapsed if Elapsed > 0 else 0.0
+
+	def _Connect(self) -> sqlite3.Connection:
+		"""
+		Open the writer connection with pragmas tuned for a single bulk writer.
+		"""
+		conn = sqlite3.connect(self._DbPath, timeout=30)
+		# WAL lets readers (robots cache, resume lookups) carry on while we write. Switching to it needs the
+		# database to itself and does not wait for the busy timeout, so it is retried
+		self._Retry(conn, lambda: conn.execute('PRAGMA journal_mode=WAL'))
+		# with WAL, NORMAL only syncs at checkpoints and is still safe against application crashes
+		conn.execute('PRAGMA synchronous=NORMAL')
+		conn.execute('PRAGMA temp_store=MEMORY')
+		conn.execute('PRAGMA cache_size=-65536')
+		conn.execute('PRAGMA wal_autocheckpoint=10000')
+		return conn
+
+	def _Run(self) -> None:
+		"""
+		Body of the writer thread: collect a batch, write it, repeat until the `None` sentinel arrives.
+		"""
+		Done: bool = False
+		Batch: List[Tuple[str, tuple]] = []
+		try:
+			conn = self._Connect()
+			try:
+				while not Done:
+					Batch = []
+					Deadline = time.monotonic() + self._FlushInterval
+					while len(Batch) < self._BatchSize:
+						Remaining = Deadline - time.monotonic()
+						try:
+							Item = self._Queue.get(timeout=Remaining) if Remaining > 0 else self._Queue.get_nowait()
+						except queue.Empty:
+							break
+						if Item is None:
+							Done = True
+							break
+						Batch.append(Item)
+					if Batch:
+						self._Flush(conn, Batch)
+			finally:
+				conn.close()
+		except BaseException as e:
+			self._Failure = e
+			print(f"💾 Writer stopped on {type(e).__name__}: {e}")
+			self.Errors += len(Batch)
+			metrics.SqliteErrors.Inc(len(Batch))
+			# keep emptying the queue, so producers waiting for room wake up and see the error
+			while not Done:
+				Item = self._Queue.get()
+				if Item is None:
+					Done = True
+				else:
+					self.Errors += 1
+					metrics.SqliteErrors.Inc()
+		finally:
+			self._StoppedAt = time.monotonic()
+
+	def _Flush(self, conn: sqlite3.Connection, Batch: List[Tuple[str, tuple]]) -> None:
+		"""
+		Write one batch in a single transaction. Rows that share the same statement go through one `executemany`
+		call. Statements run in the order they first show up in the batch, and rows of the same statement keep
+		the order they were submitted in.
+
+		:Parameter: conn writer connection.
+
+		:Parameter: Batch list of `(Sql, Params)` tuples.
+		"""
+		Started = time.monotonic()
+		Grouped: dict = {}
+		for Sql, Params in Batch:
+			Grouped.setdefault(Sql, []).append(Params)
+
+		def Write() -> None:
+			for Sql, Rows in Grouped.items():
+				conn.executemany(Sql, Rows)
+			conn.commit()
+
+		try:
+			self._Retry(conn, Write)
+			Written = len(Batch)
+		except sqlite3.DatabaseError as e:
+			print(f"Batch of {len(Batch)} rows rolled back on database error: {e}, writing it row by row")
+			Written = self._FlushRows(conn, Batch)
+		metrics.SqliteBatchSeconds.Observe(time.monotonic() - Started)
+		metrics.SqliteRows.Inc(Written)
+		self.Rows += Written
+		self.Batches += 1
+		if time.monotonic() - self._LastReport >= self._ReportInterval:
+			self._LastReport = time.monotonic()
+			print(f"💾 {self.Rows} rows written ({self.RowsPerSecond():.0f} rows/s)")
+
+	def _FlushRows(self, conn: sqlite3.Connection, Batch: List[Tuple[str, tuple]]) -> int:
+		"""
+		Write a batch that failed as a whole one row at a time, each in its own transaction, dropping the rows that
+		fail on their own.
+
+		:Parameter: conn writer connection.
+
+		:Parameter: Batch list of `(Sql, Params)` tuples.
+
+		:Returns: number of rows written.
+		"""
+		Written: int = 0
+		for Sql, Params in Batch:
+			def Write() -> None:
+				conn.execute(Sql, Params)
+				conn.commit()
+			try:
+				self._Retry(conn, Write)
+				Written += 1
+			except sqlite3.DatabaseError as e:
+				self.Errors += 1
+				metrics.SqliteErrors.Inc()
+				# the first parameter is the key (domain, host, hash) in every statement of the crawler
+				print(f"Dropped row {Params[0] if Params else None!r} on database error: {e}: {' '.join(Sql.split())[:80]}")
+		return Written
+
+	def _Retry(self, conn: sqlite3.Connection, Action) -> None:
+		"""
+		Run `Action`, rolling back and trying again with a doubling pause while the database is locked or busy.
+
+		:Parameter: conn writer connection.
+
+		:Parameter: Action callable doing the work, including the commit.
+		"""
+		Delay = self._RetryDelay
+		for Attempt in range(self._Retries):
+			try:
+				Action()
+				return
+			except sqlite3.OperationalError as e:
+				conn.rollback()
+				Message = str(e).lower()
+				if Attempt == self._Retries - 1 or ('locked' not in Message and 'busy' not in Message):
+					raise
+				time.sleep(Delay)
+				Delay *= 2
+			except sqlite3.DatabaseError:
+				conn.rollback()
+				raise
+
+	def _RaiseFailure(self) -> None:
+		"""
+		Raise the error the writer thread stopped on in the calling thread, if it stopped on one.
+		"""
+		if self._Failure is not None:
+			raise self._Failure
+
+class BackgroundReader:
+	def __init__(self, DbPath: str):
+		"""
+		Read side of the writer stage: a single thread with its own connection that runs lookups for the event
+		loop, so a slow or busy database never blocks the workers. With WAL, the reads do not wait for the
+		writer either.
+
+		:Parameter: DbPath path to the SQLite database.
+		"""
+		self._DbPath: str = DbPath
+		self._Executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='BackgroundReader')
+		self._conn: Optional[sqlite3.Connection] = None
+
+	async def Fetch(self, Sql: str, Params: tuple = ()) -> List[tuple]:
+		"""
+		:Parameter: Sql query to run.
+
+		:Parameter: Params parameters of the query.
+
+		:Returns: all rows of the result.
+		"""
+		return await asyncio.get_running_loop().run_in_executor(self._Executor, self._Fetch, Sql, Params)
+
+	def Close(self) -> None:
+		"""
+		Close the connection and stop the thread.
+		"""
+		self._Executor.submit(self._CloseConnection)
+		self._Executor.shutdown(wait=True)
+
+	def _Fetch(self, Sql: str, Params: tuple) -> List[tuple]:
+		if self._conn is None:
+			self._conn = sqlite3.connect(self._DbPath, timeout=30)
+		return self._conn.execute(Sql, Params).fetchall()
+
+	def _CloseConnection(self) -> None:
+		if self._conn is not None:
+			self._conn.close()
+			self._conn = None
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py', 'logocrawler'))
+import Scoring as scoring
+
+"""
+Micro-benchmark of the candidate scoring. It compares the compiled LogoScorer with the
+dictionary scan the Fetcher used before, checks that both give the exact same scores and
+prints how many candidates per second each one gets through.
+
+Usage: python tests/ScoreBenchmark.py [candidates]
+"""
+
+PositiveIndicators, NegativeIndicators = scoring.LoadRules()
+
+def LegacyScore(Content, Context):
+	"""
+	The scoring loop as it was in Fetcher._CalculateProbabilityScore before the scorer was compiled.
+	"""
+	Score = 0.0
+	ContentLowerCase = Content.lower() if Content else ''
+	ContextLowerCase = Context.lower() if Context else ''
+	for indicator, weight in PositiveIndicators.items():
+		if indicator in ContentLowerCase or indicator in ContextLowerCase:
+			Score += weight
+	for indicator, penalty in NegativeIndicators.items():
+		if indicator in ContentLowerCase or indicator in ContextLowerCase:
+			Score -= penalty
+	if not Score:
+		return 0.0
+	return max(0.0, min(1.0, Score))
+
+def MakeCandidates(Amount, Seed=42):
+	"""
+	Synthetic img/svg candidates shaped like the ones _FindAllTags returns: the tag and the
+	200 characters on each side of it. Most of them are the usual photos, icons and banners,
+	some look like a logo.
+	"""
+	Rng = random.Random(Seed)
+	Words = list(PositiveIndicators) + list(NegativeIndicators)
+	Filler = ['<div class="container">', '<p>Lorem ipsum dolor sit amet</p>', '<a href="/about">About us</a>',
+			  '<span>', '</span>', '<li class="item">', '</li>', '<section id="hero">', 'Welcome to our website']
+	Candidates = []
+	for _ in range(Amount):
+		Name = Rng.choice(['logo', 'brand', 'client-logo', 'Logo_Main', 'banner', 'hero', 'icon-arrow', 'photo',
+						   'team', 'product-1', 'avatar', 'cover', 'slide-2', 'map', 'chart', 'spinner'])
+		if Rng.random() < 0.5:
+			Content = f'<img src="/assets/{Name}.png" alt="{Rng.choice(["Logo", "Company", "Photo", ""])}">'
+		else:
+			Content = f'<svg viewBox="0 0 24 24" class="{Name}"><path d="M0 0h24v24H0z"/></svg>'
+		Before = ''.join(Rng.choice(Filler) for _ in range(12))[-200:]
+		After = ''.join(Rng.choice(Filler) for _ in range(12))[:200]
+		if Rng.random() < 0.3:
+			Before = Before[:-20] + Rng.choice(Words)
+		Candidates.append((Content, Before + After))
+	return Candidates
+
+def Measure(Function, Candidates, Rounds=3):
+	"""
+	:Returns: best candidates/sec out of `Rounds` runs.
+	"""
+	Best = 0.0
+	for _ in range(Rounds):
+		Start = time.perf_counter()
+		for Content, Context in Candidates:
+			Function(Content, Context)
+		Elapsed = time.perf_counter() - Start
+		Best = max(Best, len(Candidates) / Elapsed)
+	return Best
+
+def main():
+	Amount = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+	Candidates = MakeCandidates(Amount)
+	Scorer = scoring.LogoScorer(PositiveIndicators, NegativeIndicators)
+
+	Mismatches = 0
+	for Content, Context in Candidates:
+		if LegacyScore(Content, Context) != Scorer.Score(Content, Context):
+			Mismatches += 1
+	print(f"Checked {Amount} candidates, {Mismatches} score mismatches")
+
+	Before = Measure(LegacyScore, Candidates)
+	After = Measure(Scorer.Score, Candidates)
+	print(f"Before: {Before:,.0f} candidates/s")
+	print(f"After:  {After:,.0f} candidates/s ({After / Before:.2f}x)")
+
+	return 1 if Mismatches else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,129 @@
+import sys
+import time
+import signal
+import struct
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+"""
+Local stand-in for the hosts the asset stages talk to, so they can be tried without touching the internet.
+Point `logo_url`/`favicon_url` of a test database at http://127.0.0.1:<port>/... and run the stage against it.
+
+Paths:
+	/logo.png /logo.jpg /logo.gif /logo.webp /favicon.ico /logo.svg   small images of known dimensions
+	/pixel.gif                                                        a 1x1 tracking pixel
+	/photo.jpg                                                        a JPEG with 12 KB of Exif before its size
+	/copy.png                                                         same bytes as /logo.png
+	/big.png                                                          a 6 MB PNG
+	/status/<code>                                                    answers with that status
+	/slow/<seconds>/<path>                                            waits before answering <path>
+
+Range requests are honoured, so partial downloads can be checked too. The server counts requests and bytes
+sent per path and prints them when it is stopped.
+
+Usage: python tests/StandInServer.py [port]
+"""
+
+def Png(Width, Height, Padding=2048):
+	Header = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>IIBBBBB', Width, Height, 8, 6, 0, 0, 0)
+	return Header + b'\x00' * 4 + b'\x00' * Padding
+
+def Jpeg(Width, Height, Padding=2048, Metadata=0):
+	App0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+	if Metadata:
+		# Exif segment in front of the frame header, as written by cameras and photo editors
+		App0 += b'\xff\xe1' + struct.pack('>H', Metadata + 2) + b'Exif\x00\x00' + b'\x00' * (Metadata - 6)
+	Sof = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, Height, Width, 1) + b'\x01\x11\x00'
+	return b'\xff\xd8' + App0 + Sof + b'\x00' * Padding + b'\xff\xd9'
+
+def Gif(Width, Height, Padding=1024):
+	return b'GIF89a' + struct.pack('<HH', Width, Height) + b'\x00' * Padding
+
+def WebP(Width, Height, Padding=1024):
+	Vp8x = b'VP8X' + struct.pack('<I', 10) + b'\x00' * 4 + (Width - 1).to_bytes(3, 'little') + (Height - 1).to_bytes(3, 'little')
+	Body = b'WEBP' + Vp8x + b'\x00' * Padding
+	return b'RIFF' + struct.pack('<I', len(Body)) + Body
+
+def Ico(Width, Height, Padding=1024):
+	return struct.pack('<HHH', 0, 1, 1) + struct.pack('<BBBBHHII', Width % 256, Height % 256, 0, 0, 1, 32, Padding, 22) + b'\x00' * Padding
+
+Svg = b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="180" height="48" viewBox="0 0 180 48"><rect width="180" height="48"/></svg>'
+
+Files = {
+	'/logo.png': (Png(240, 80), 'image/png'),
+	'/copy.png': (Png(240, 80), 'image/png'),
+	'/logo.jpg': (Jpeg(320, 100), 'image/jpeg'),
+	'/logo.gif': (Gif(88, 31), 'image/gif'),
+	'/pixel.gif': (Gif(1, 1, Padding=32), 'image/gif'),
+	'/photo.jpg': (Jpeg(1600, 1200, Metadata=12000), 'image/jpeg'),
+	'/logo.webp': (WebP(200, 60), 'image/webp'),
+	'/favicon.ico': (Ico(32, 32), 'image/x-icon'),
+	'/logo.svg': (Svg, 'image/svg+xml'),
+	'/big.png': (Png(4000, 4000, Padding=6 * 1024 * 1024), 'image/png'),
+}
+
+Stats = {}
+StatsLock = threading.Lock()
+
+class Handler(BaseHTTPRequestHandler):
+	def do_GET(self):
+		Path = self.path.split('?', 1)[0]
+		if Path.startswith('/slow/'):
+			_, _, Seconds, Rest = Path.split('/', 3)
+			time.sleep(float(Seconds))
+			Path = '/' + Rest
+		if Path.startswith('/status/'):
+			Code = int(Path.rsplit('/', 1)[1])
+			self.send_response(Code)
+			if Code in (429, 503):
+				self.send_header('Retry-After', '1')
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return self._Count(Path, 0)
+		if Path not in Files:
+			self.send_error(404)
+			return self._Count(Path, 0)
+
+		Body, ContentType = Files[Path]
+		Range = self.headers.get('Range')
+		if Range and Range.startswith('bytes='):
+			Start, _, End = Range[6:].partition('-')
+			Start = int(Start or 0)
+			End = min(int(End) if End else len(Body) - 1, len(Body) - 1)
+			Part = Body[Start:End + 1]
+			self.send_response(206)
+			self.send_header('Content-Range', f'bytes {Start}-{End}/{len(Body)}')
+		else:
+			Part = Body
+			self.send_response(200)
+		self.send_header('Content-Type', ContentType)
+		self.send_header('Content-Length', str(len(Part)))
+		self.end_headers()
+		try:
+			self.wfile.write(Part)
+		except (BrokenPipeError, ConnectionResetError):
+			pass
+		self._Count(Path, len(Part))
+
+	def _Count(self, Path, Sent):
+		with StatsLock:
+			Requests, Bytes = Stats.get(Path, (0, 0))
+			Stats[Path] = (Requests + 1, Bytes + Sent)
+
+	def log_message(self, format, *args):
+		pass
+
+def main():
+	Port = int(sys.argv[1]) if len(sys.argv) > 1 else 8900
+	Server = ThreadingHTTPServer(('127.0.0.1', Port), Handler)
+	print(f'Stand-in server listening on http://127.0.0.1:{Port}', flush=True)
+	signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+	try:
+		Server.serve_forever()
+	except (KeyboardInterrupt, SystemExit):
+		pass
+	for Path, (Requests, Bytes) in sorted(Stats.items()):
+		print(f'{Path}: {Requests} requests, {Bytes} bytes', flush=True)
+
+if __name__ == "__main__":
+	main()
@@ -3,6 +3,10 @@ import os
 import csv
 import random
 import glob
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py', 'logocrawler'))
+import HtmlStore as htmlstore
 
 """
 I wanted to use pytest, but given the task I was given it would've taken far too much
@@ -38,9 +42,10 @@ def TestDatabaseContent(db_path):
 	
 	print("\nSample domains (first 5 with HTML):")
 	cursor.execute("""
-		SELECT domain, final_url, LENGTH(html_body) as html_size 
-		FROM domains 
-		WHERE fetch_status = 200 AND html_body IS NOT NULL
+		SELECT d.domain, d.final_url, COALESCE(LENGTH(d.html_body), b.size) as html_size 
+		FROM domains d
+		LEFT JOIN html_blobs b ON b.hash = d.html_hash
+		WHERE d.fetch_status = 200 AND (d.html_body IS NOT NULL OR b.body IS NOT NULL)
 		LIMIT 5
 	""")
 	for row in cursor.fetchall():
@@ -57,9 +62,10 @@ def TestSpecificDomain(DbPath, Domain):
 	cursor = conn.cursor()
 	
 	cursor.execute("""
-		SELECT id, html_body, final_url 
-		FROM domains 
-		WHERE domain = ? AND fetch_status = 200
+		SELECT d.id, d.html_body, d.final_url, b.codec, b.body
+		FROM domains d
+		LEFT JOIN html_blobs b ON b.hash = d.html_hash
+		WHERE d.domain = ? AND d.fetch_status = 200
 	""", (Domain,))
 	
 	result = cursor.fetchone()
@@ -68,7 +74,9 @@ def TestSpecificDomain(DbPath, Domain):
 		conn.close()
 		return
 	
-	RowId, HtmlBody, FinalUrl = result
+	RowId, HtmlBody, FinalUrl, Codec, Blob = result
+	if HtmlBody is None and Blob is not None:
+		HtmlBody = htmlstore.Unpack(Codec, Blob)
 	print(f"\nTesting {Domain} (ID: {RowId}):")
 	print(f"Final URL: {FinalUrl}")
 	print(f"HTML size: {len(HtmlBody)} bytes")
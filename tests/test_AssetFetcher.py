@@ -0,0 +1,96 @@
+import os
+import sys
+import glob
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py', 'logocrawler'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import AssetFetcher as assetfetcher
+import StandInServer as standin
+
+"""
+Self-checking test of the `assets` stage against `StandInServer`: the files end up under their SHA-256 in the
+content-addressed layout, identical images are stored once, no temporary file is left behind and every URL gets
+its row in the `assets` table. Runs with pytest, or on its own with `python tests/test_AssetFetcher.py`.
+"""
+
+def _Serve():
+	"""
+	Start the stand-in server on a free port in a background thread.
+
+	:Returns: (Server, BaseUrl)
+	"""
+	Server = ThreadingHTTPServer(('127.0.0.1', 0), standin.Handler)
+	threading.Thread(target=Server.serve_forever, daemon=True).start()
+	return Server, f'http://127.0.0.1:{Server.server_address[1]}'
+
+def _MakeDb(DbPath: str, Base: str) -> None:
+	"""
+	Create a `domains` table whose logos and favicons point at the stand-in server.
+	"""
+	conn = sqlite3.connect(DbPath)
+	conn.execute('CREATE TABLE domains (id INTEGER PRIMARY KEY, domain TEXT UNIQUE, logo_url TEXT, favicon_url TEXT)')
+	conn.executemany('INSERT INTO domains (domain, logo_url, favicon_url) VALUES (?, ?, ?)', [
+		('a.com', f'{Base}/logo.png', f'{Base}/favicon.ico'),
+		# same bytes as /logo.png from another URL, and the same favicon again
+		('b.com', f'{Base}/copy.png', f'{Base}/favicon.ico'),
+		('c.com', f'{Base}/status/404', None),
+		('d.com', f'{Base}/big.png', None),
+		# inline SVGs are already stored and never downloaded
+		('e.com', 'svg-asset://0000', None),
+	])
+	conn.commit()
+	conn.close()
+
+def _Sha256(Path: str) -> str:
+	return hashlib.sha256(standin.Files[Path][0]).hexdigest()
+
+def test_AssetFetcher():
+	Server, Base = _Serve()
+	try:
+		with tempfile.TemporaryDirectory() as Directory:
+			DbPath = os.path.join(Directory, 'logos.db')
+			AssetDir = os.path.join(Directory, 'assets')
+			_MakeDb(DbPath, Base)
+
+			Fetcher = assetfetcher.AssetFetcher(Directory=AssetDir, Concurrency=4, MaxBytes=1024 * 1024)
+			assert Fetcher.EntryPoint(DbPath)
+
+			# content-addressed layout, one file per distinct content, written under a temporary name first
+			Expected = {_Sha256('/logo.png'): '/logo.png', _Sha256('/favicon.ico'): '/favicon.ico'}
+			Stored = sorted(os.path.relpath(Path, AssetDir) for Path in glob.glob(os.path.join(AssetDir, '**', '*'), recursive=True) if os.path.isfile(Path))
+			assert Stored == sorted(os.path.relpath(assetfetcher.AssetPath(Hash, AssetDir), AssetDir) for Hash in Expected)
+			for Hash, Path in Expected.items():
+				assert os.path.dirname(os.path.relpath(assetfetcher.AssetPath(Hash, AssetDir), AssetDir)) == Hash[:2]
+				with open(assetfetcher.AssetPath(Hash, AssetDir), 'rb') as StoredFile:
+					assert StoredFile.read() == standin.Files[Path][0]
+			assert not glob.glob(os.path.join(AssetDir, '**', '*.tmp'), recursive=True)
+
+			conn = sqlite3.connect(DbPath)
+			Rows = {row[0][len(Base):]: row[1:] for row in conn.execute('SELECT url, status, content_type, size, sha256, error_type FROM assets')}
+			conn.close()
+			assert set(Rows) == {'/logo.png', '/copy.png', '/favicon.ico', '/status/404', '/big.png'}
+			Logo = standin.Files['/logo.png'][0]
+			assert Rows['/logo.png'] == (200, 'image/png', len(Logo), _Sha256('/logo.png'), None)
+			assert Rows['/copy.png'] == Rows['/logo.png']
+			assert Rows['/favicon.ico'][0] == 200 and Rows['/favicon.ico'][3] == _Sha256('/favicon.ico')
+			assert Rows['/status/404'][0] == 404 and Rows['/status/404'][3] is None and Rows['/status/404'][4] == 'HTTP_ERROR'
+			assert Rows['/big.png'][3] is None and Rows['/big.png'][4] == 'TOO_LARGE'
+
+			# a second run finds everything in `assets` and asks the server for nothing
+			Requests = sum(Count for Count, _ in standin.Stats.values())
+			Again = assetfetcher.AssetFetcher(Directory=AssetDir, Concurrency=4, MaxBytes=1024 * 1024)
+			assert Again.EntryPoint(DbPath)
+			assert sum(Count for Count, _ in standin.Stats.values()) == Requests
+			assert Again._StoredCounter == 0
+	finally:
+		Server.shutdown()
+		Server.server_close()
+
+if __name__ == "__main__":
+	test_AssetFetcher()
+	print('AssetFetcher test passed')
@@ -0,0 +1,156 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py', 'logocrawler'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import Crawler as crawler
+import Fetcher as fetcher
+import HtmlStore as htmlstore
+import CandidateStore as candidatestore
+import ImageProbe as imageprobe
+import SvgStore as svgstore
+import StandInServer as standin
+
+"""
+Self-checking test of the `probe` stage against `StandInServer`: the format and dimensions of every kind of
+image end up in `image_probes`, the confidence of the logos is adjusted by their size, and a logo that only won
+because its size was not known yet is replaced by the candidate it beat. Runs with pytest, or on its own with
+`python tests/test_ImageProbe.py`.
+"""
+
+# rules for the re-pick test: the tracking pixel scores higher than the SVG until their sizes are known
+_Rules = """
+[positive]
+'pixel' = 0.7
+'brand' = 0.5
+[negative]
+"""
+
+def _Serve():
+	"""
+	Start the stand-in server on a free port in a background thread.
+
+	:Returns: (Server, BaseUrl)
+	"""
+	Server = ThreadingHTTPServer(('127.0.0.1', 0), standin.Handler)
+	threading.Thread(target=Server.serve_forever, daemon=True).start()
+	return Server, f'http://127.0.0.1:{Server.server_address[1]}'
+
+def _Rows(DbPath: str, Sql: str) -> dict:
+	conn = sqlite3.connect(DbPath)
+	try:
+		return {row[0]: row[1:] for row in conn.execute(Sql)}
+	finally:
+		conn.close()
+
+def test_ProbeDimensions():
+	Server, Base = _Serve()
+	try:
+		with tempfile.TemporaryDirectory() as Directory:
+			DbPath = os.path.join(Directory, 'logos.db')
+			crawler.Crawler(DbPath=DbPath)
+			conn = sqlite3.connect(DbPath)
+			svgstore.InitTable(conn)
+			conn.execute("INSERT INTO svg_assets VALUES ('h1', 45, '<svg width=\"180\" height=\"48\"><path/></svg>')")
+			conn.executemany('''
+				INSERT INTO domains (domain, logo_url, favicon_url, extraction_method, confidence_score) VALUES (?, ?, ?, ?, ?)
+			''', [
+				('png.com', f'{Base}/logo.png', f'{Base}/favicon.ico', 'IMG_TAG', 0.5),
+				('gif.com', f'{Base}/logo.gif', None, 'IMG_TAG', 0.5),
+				('jpeg.com', f'{Base}/logo.jpg', None, 'IMG_TAG', 0.5),
+				# the size of this one comes after 12 KB of Exif, past the first request
+				('photo.com', f'{Base}/photo.jpg', None, 'IMG_TAG', 0.5),
+				('webp.com', f'{Base}/logo.webp', None, 'IMG_TAG', 0.5),
+				('svg.com', f'{Base}/logo.svg', None, 'IMG_TAG', 0.5),
+				('pixel.com', f'{Base}/pixel.gif', None, 'IMG_TAG', 0.4),
+				('missing.com', f'{Base}/status/404', None, 'IMG_TAG', 0.5),
+				('inline.com', 'svg-asset://h1', None, 'SVG_TAG', 0.5),
+			])
+			conn.commit()
+			conn.close()
+
+			assert imageprobe.ImageProber(Concurrency=4).EntryPoint(DbPath)
+
+			Probes = _Rows(DbPath, 'SELECT url, status, image_format, image_width, image_height, error_type FROM image_probes')
+			Probes = {Url[len(Base):]: Row for Url, Row in Probes.items()}
+			assert {Path: Row[1:4] for Path, Row in Probes.items() if Row[3] is not None} == {
+				'/logo.png': ('png', 240, 80),
+				'/logo.gif': ('gif', 88, 31),
+				'/logo.jpg': ('jpeg', 320, 100),
+				'/photo.jpg': ('jpeg', 1600, 1200),
+				'/logo.webp': ('webp', 200, 60),
+				'/logo.svg': ('svg', 180, 48),
+				'/favicon.ico': ('ico', 32, 32),
+				'/pixel.gif': ('gif', 1, 1),
+			}
+			assert Probes['/status/404'][0] == 404 and Probes['/status/404'][4] == 'HTTP_ERROR'
+
+			Scores = _Rows(DbPath, 'SELECT domain, round(confidence_score, 2), size_signal, adjusted_at IS NOT NULL FROM domains')
+			assert Scores['png.com'] == (0.6, 0.1, 1)
+			assert Scores['photo.com'] == (0.5, 0.0, 1)
+			assert Scores['pixel.com'] == (0.0, -0.5, 1)
+			assert Scores['inline.com'] == (0.6, 0.1, 1)
+			# no dimensions, left for a later run
+			assert Scores['missing.com'] == (0.5, None, 0)
+	finally:
+		Server.shutdown()
+		Server.server_close()
+
+def test_SizeRepick():
+	Server, Base = _Serve()
+	try:
+		with tempfile.TemporaryDirectory() as Directory:
+			DbPath = os.path.join(Directory, 'logos.db')
+			RulesPath = os.path.join(Directory, 'rules.toml')
+			with open(RulesPath, 'w') as RulesFile:
+				RulesFile.write(_Rules)
+			crawler.Crawler(DbPath=DbPath)
+			Scorer = fetcher.Fetcher(RulesPath=RulesPath)
+
+			# the pixel and the SVG are far enough apart that neither sees the indicator of the other
+			Html = (
+				f'<html><header><img class="logo" src="{Base}/pixel.gif"></header>' + '<p>filler text</p>' * 40 +
+				'<div class="brand"><svg width="180" height="48"><path d="M0 0"/></svg></div></html>'
+			)
+			AllTags = Scorer._FindAllTags(Html)
+			_, LogoUrl, Method, Confidence, _ = Scorer._PickLogo(*Scorer._ScoreCandidates(AllTags, 'https://a.com/'))
+			assert (LogoUrl, Method) == (f'{Base}/pixel.gif', 'IMG_TAG')
+
+			HtmlHash = htmlstore.HashHtml(Html)
+			conn = sqlite3.connect(DbPath)
+			svgstore.InitTable(conn)
+			conn.execute(
+				'INSERT INTO candidates (html_hash, extractor_version, payload) VALUES (?, ?, ?)',
+				(HtmlHash, candidatestore.ExtractorVersion, candidatestore.Pack(AllTags))
+			)
+			conn.execute('''
+				INSERT INTO domains (
+					domain, fetch_status, final_url, html_hash, logo_url, extraction_method, confidence_score,
+					extractor_version
+				) VALUES ('a.com', 200, 'https://a.com/', ?, ?, ?, ?, ?)
+			''', (HtmlHash, LogoUrl, Method, Confidence, candidatestore.ExtractorVersion))
+			conn.commit()
+			conn.close()
+
+			assert imageprobe.ImageProber(Concurrency=4, BatchSize=1, Fetcher=Scorer).EntryPoint(DbPath)
+
+			Row = _Rows(DbPath, 'SELECT domain, logo_url, extraction_method, round(confidence_score, 2), size_signal FROM domains')['a.com']
+			assert Row[0].startswith('svg-asset://') and Row[1:] == ('SVG_TAG', 0.6, 0.1)
+			Assets = _Rows(DbPath, 'SELECT hash, svg FROM svg_assets')
+			assert Row[0][len('svg-asset://'):] in Assets
+
+			# adjusted rows are not adjusted twice
+			assert imageprobe.ImageProber(Concurrency=4, Fetcher=Scorer).EntryPoint(DbPath)
+			assert _Rows(DbPath, 'SELECT domain, logo_url, extraction_method, round(confidence_score, 2), size_signal FROM domains')['a.com'] == Row
+	finally:
+		Server.shutdown()
+		Server.server_close()
+
+if __name__ == "__main__":
+	test_ProbeDimensions()
+	test_SizeRepick()
+	print('ImageProbe tests passed')